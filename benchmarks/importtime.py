@@ -0,0 +1,100 @@
+"""
+Import time of the package entry points, measured with python -X importtime in fresh interpreters.
+
+    python -m benchmarks.importtime [--repeat 9] [--check]
+
+--check exits with status 1 if importing Stats loads the scraping stack or takes longer than the budget, a
+fraction of the import time of numpy on the same machine.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# name, statement
+TARGETS = [
+    ("numpy", "import numpy"),
+    ("golfgenius", "import golfgenius"),
+    ("Stats", "from golfgenius import Stats"),
+    ("golfgenius.parser", "import golfgenius.parser"),
+    ("GGParser", "import golfgenius.parser, golfgenius.scraping"),
+]
+SCRAPING_MODULES = ("selenium", "bs4", "urllib3")
+# Fraction of the numpy import time that importing Stats may take beyond it
+STATS_BUDGET = 0.5
+
+
+def import_profile(statement):
+    """
+    :param statement: python statement to run in a fresh interpreter
+    :return: (seconds, modules) where seconds is the total import time and modules the names of all modules
+        imported
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root] + [p for p in [os.environ.get("PYTHONPATH")] if p]))
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=env, cwd=root,
+                            stderr=subprocess.PIPE, check=True).stderr.decode("utf-8")
+    seconds = 0.0
+    modules = set()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        modules.add(module.strip())
+        # Nested imports are indented and already included in their parent's cumulative time
+        if not module.startswith("  "):
+            seconds += int(cumulative_us) / 1e6
+    return seconds, modules
+
+
+def bench(repeat=9):
+    """
+    :param repeat: fresh interpreters per target, the targets take turns so that they share any load on the
+        machine
+    :return: dict of target -> median import seconds and the scraping modules it loaded
+    """
+    timings = dict((name, []) for name, statement in TARGETS)
+    roots = dict((name, set()) for name, statement in TARGETS)
+    for _ in range(repeat):
+        for name, statement in TARGETS:
+            seconds, modules = import_profile(statement)
+            timings[name].append(seconds)
+            roots[name].update(module.split(".")[0] for module in modules)
+    return dict((name, {"seconds": statistics.median(timings[name]),
+                        "scraping_modules": sorted(roots[name].intersection(SCRAPING_MODULES))})
+                for name, statement in TARGETS)
+
+
+def check(result):
+    """
+    :return: list of problems with the import of Stats
+    """
+    problems = []
+    if result["Stats"]["scraping_modules"]:
+        problems.append("from golfgenius import Stats loads %s" % ", ".join(result["Stats"]["scraping_modules"]))
+    if result["golfgenius.parser"]["scraping_modules"]:
+        problems.append("import golfgenius.parser loads %s"
+                        % ", ".join(result["golfgenius.parser"]["scraping_modules"]))
+    extra = result["Stats"]["seconds"] - result["numpy"]["seconds"]
+    budget = STATS_BUDGET * result["numpy"]["seconds"]
+    if extra > budget:
+        problems.append("from golfgenius import Stats takes %.3fs beyond numpy, the budget is %.3fs (%d%% of numpy)"
+                        % (extra, budget, STATS_BUDGET * 100))
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=9,
+                        help="fresh interpreters per target, the median is reported")
+    parser.add_argument("--check", action="store_true", help="fail if importing Stats loads the scraping stack")
+    args = parser.parse_args()
+    results = bench(args.repeat)
+    for name, statement in TARGETS:
+        print("%-20s %.3fs %s" % (name, results[name]["seconds"], " ".join(results[name]["scraping_modules"])))
+    if args.check:
+        problems = check(results)
+        for problem in problems:
+            print("FAIL: %s" % problem)
+        sys.exit(1 if problems else 0)
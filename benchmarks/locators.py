@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of GGParser.xpath_soup against the LocatorIndex that replaces it.
+
+    python -m benchmarks.locators [saved_page.html]
+
+Without a saved page a large synthetic results page is generated.
+"""
+import itertools
+import sys
+import time
+from bs4 import BeautifulSoup
+from golfgenius.locators import LocatorIndex
+from benchmarks.synthetic import results_page
+
+
+def legacy_xpath_soup(element):
+    """ The original GGParser.xpath_soup """
+    components = []
+    child = element if element.name else element.parent
+    for parent in child.parents:
+        previous = itertools.islice(parent.children, 0, parent.contents.index(child))
+        xpath_tag = child.name
+        xpath_index = sum(1 for i in previous if i.name == xpath_tag) + 1
+        components.append(xpath_tag if xpath_index == 1 else '%s[%d]' % (xpath_tag, xpath_index))
+        child = parent
+    components.reverse()
+    return '/%s' % '/'.join(components)
+
+
+def bench(page):
+    soup = BeautifulSoup(page, "html.parser")
+    elements = soup.find_all(["option", "a", "td"])
+
+    start = time.perf_counter()
+    legacy = [legacy_xpath_soup(e) for e in elements]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = LocatorIndex(soup)
+    indexed = [index.xpath(e) for e in elements]
+    indexed_elapsed = time.perf_counter() - start
+
+    assert legacy == indexed, "LocatorIndex xpaths differ from xpath_soup"
+    return {
+        "elements": len(elements),
+        "xpath_soup_seconds": legacy_elapsed,
+        "locator_index_seconds": indexed_elapsed,
+        "speedup": legacy_elapsed / indexed_elapsed if indexed_elapsed else None
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as fp:
+            page = fp.read()
+    else:
+        page = results_page()
+    result = bench(page)
+    print("%(elements)d elements: xpath_soup %(xpath_soup_seconds).3fs, "
+          "LocatorIndex %(locator_index_seconds).3fs (%(speedup).1fx)" % result)
@@ -0,0 +1,178 @@
+"""
+Timed benchmarks of Stats and the scorecard parsing on synthetic leagues of several sizes, and of the imports.
+
+    python -m benchmarks.run [--sizes small,medium,large] [--output results.json]
+
+Results are written as json, by default to benchmarks/results/<version>.json, to compare releases.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import numpy as np
+from golfgenius.archive import HoleArchive
+from golfgenius.cache import CACHE_NAME
+from golfgenius.capture import atomic_write
+from golfgenius.stats import Stats
+from golfgenius.streams import RoundStreamWriter, STREAM_NAMES
+from benchmarks import importtime, locators, scorecard
+from benchmarks.synthetic import league_rounds, results_page, scorecard_page, write_league
+
+# players, rounds
+SIZES = {
+    "small": (40, 30),
+    "medium": (120, 80),
+    "large": (200, 150)
+}
+RANKINGS = [
+    ("scoring_averages", lambda s: s.scoring_averages(min_rounds=4)),
+    ("birdies_or_better_averages", lambda s: s.birdies_or_better_averages(n_rounds=8, weighted_rounds=3)),
+    ("par_averages", lambda s: s.par_averages(n_rounds=8, weighted_rounds=3)),
+    ("weighted_sanitized_scoring_averages", lambda s: s.weighted_sanitized_scoring_averages()),
+    ("player_scores", lambda s: s.player_scores()),
+    ("iter_player_data", lambda s: list(s.iter_player_data())),
+    ("all_players", lambda s: s.all_players())
+]
+
+
+def package_version():
+    try:
+        from importlib.metadata import version
+        return version("golfgenius")
+    except Exception:
+        return "dev"
+
+
+def best_time(func, repeat=3, setup=None):
+    """
+    :return: fastest of repeat timed calls of func, setup runs untimed before each call
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_stats(directory, repeat=3):
+    cache_path = os.path.join(directory, CACHE_NAME)
+
+    def remove_cache():
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    result = {
+        "init_no_cache_seconds": best_time(lambda: Stats(directory, cache=False), repeat),
+        "init_cold_cache_seconds": best_time(lambda: Stats(directory), repeat, setup=remove_cache),
+    }
+    Stats(directory)
+    result["init_warm_cache_seconds"] = best_time(lambda: Stats(directory), repeat)
+    stats = Stats(directory)
+    # Each ranking is timed from an empty player index, as on a fresh Stats
+    result["rankings_seconds"] = dict((name, best_time(lambda: ranking(stats), repeat, setup=stats.invalidate))
+                                      for name, ranking in RANKINGS)
+    return result
+
+
+def disk_usage(paths):
+    """
+    :return: bytes allocated on disk for the files
+    """
+    return sum(os.stat(path).st_blocks * 512 for path in paths)
+
+
+def bench_streams(directory, players, rounds, repeat=3):
+    """ Disk usage and Stats() load time of the json files of directory against the round streams """
+    json_files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".json")]
+    result = {"json": {"bytes": disk_usage(json_files), "files": len(json_files)}}
+    for fmt, name in sorted(STREAM_NAMES.items()):
+        path = os.path.join(directory, name)
+        with RoundStreamWriter(path, fsync=False) as stream:
+            for round_name, round_data in league_rounds(players=players, rounds=rounds):
+                stream.write(round_data)
+        result[fmt] = {"bytes": disk_usage([path]), "files": 1,
+                       "init_seconds": best_time(lambda: Stats(path), repeat)}
+    return result
+
+
+def bench_archive(directory, repeat=3):
+    """ Open, window and player query times of a HoleArchive of the json files of directory """
+    path = os.path.join(directory, "archive")
+    archive = HoleArchive(path)
+    archive.append_results(directory, cache=False)
+    player = archive.players[0]
+    last = int(archive.dates.max())
+    return {
+        "bytes": disk_usage([os.path.join(path, f) for f in os.listdir(path)]),
+        "open_seconds": best_time(lambda: HoleArchive(path), repeat),
+        "last_rounds_seconds": best_time(lambda: HoleArchive(path).last_rounds(player, 10), repeat),
+        "stats_last_year_seconds": best_time(lambda: Stats(path, timedelta=datetime.date.today() - (
+            datetime.date.fromordinal(last) - datetime.timedelta(days=365))), repeat),
+        "stats_all_seconds": best_time(lambda: Stats(path), repeat)
+    }
+
+
+def bench_size(players, rounds, repeat=3):
+    directory = tempfile.mkdtemp(prefix="golfgenius-bench-")
+    try:
+        write_league(directory, players=players, rounds=rounds)
+        result = {"players": players, "rounds": rounds, "stats": bench_stats(directory, repeat)}
+        result["streams"] = bench_streams(directory, players, rounds, repeat)
+        result["archive"] = bench_archive(directory, repeat)
+    finally:
+        shutil.rmtree(directory)
+    pages = [scorecard_page(r) for name, r in league_rounds(players=players, rounds=min(rounds, 10))]
+    result["scorecard"] = scorecard.bench(pages)
+    result["locators"] = locators.bench(results_page(rounds=rounds, bets=players // 4, players=players))
+    return result
+
+
+def run(sizes, repeat=3):
+    return {
+        "version": package_version(),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "sizes": dict((size, bench_size(*SIZES[size], repeat=repeat)) for size in sizes),
+        "imports": importtime.bench(repeat)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma separated sizes of %s" % ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions, the fastest is reported")
+    parser.add_argument("--output", help="json file to write, defaults to benchmarks/results/<version>.json")
+    args = parser.parse_args()
+    results = run(args.sizes.split(","), args.repeat)
+    if args.output is None:
+        args.output = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                   "%s.json" % results["version"])
+    if not os.path.exists(os.path.dirname(os.path.abspath(args.output))):
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)))
+    atomic_write(args.output, json.dumps(results, indent=4).encode("utf-8"))
+    for size, result in results["sizes"].items():
+        print("%s (%d players x %d rounds): Stats() %.3fs (warm cache %.3fs, binary stream %.3fs), "
+              "scorecards %.1f/s, locators %.1fx" % (
+                  size, result["players"], result["rounds"], result["stats"]["init_no_cache_seconds"],
+                  result["stats"]["init_warm_cache_seconds"], result["streams"]["binary"]["init_seconds"],
+                  result["scorecard"]["scorecards_per_second"], result["locators"]["speedup"]))
+        print("    disk: json files %d bytes, jsonl %d bytes, binary %d bytes" % (
+            result["streams"]["json"]["bytes"], result["streams"]["jsonl"]["bytes"],
+            result["streams"]["binary"]["bytes"]))
+        print("    archive: open %.4fs, last 10 rounds of a player %.4fs, Stats() of the last year %.3fs" % (
+            result["archive"]["open_seconds"], result["archive"]["last_rounds_seconds"],
+            result["archive"]["stats_last_year_seconds"]))
+    print("imports: golfgenius %.3fs, Stats %.3fs, GGParser %.3fs" % (
+        results["imports"]["golfgenius"]["seconds"], results["imports"]["Stats"]["seconds"],
+        results["imports"]["GGParser"]["seconds"]))
+    print("Saved %s" % args.output)
@@ -0,0 +1,88 @@
+"""
+Throughput of the scorecard extraction, in scorecards per second.
+
+    python -m benchmarks.scorecard [saved_scorecard.html ...]
+
+Compares the original full-page parse and hole loop of iter_rounds with parse_scorecard and
+extract_scorecard. Without saved pages synthetic scorecard pages are used. The extractor's results are
+covered by tests/test_scorecard.py.
+"""
+import sys
+import time
+from bs4 import BeautifulSoup
+from golfgenius.scorecard import extract_scorecard, parse_scorecard
+from benchmarks.synthetic import league_rounds, scorecard_page
+
+
+def legacy_extract(page_source):
+    """ The hole score loop of iter_rounds before the shared extractor. It resets a player's scores on every
+    page and fails on score cells without a single-score div.
+    """
+    results = {"teams": [], "scores": {}}
+    table = BeautifulSoup(page_source, "html.parser").find('table', {"class": "scorecard"})
+    teams = [[x.strip() for x in tr.attrs["data-aggregate-name"].split("+")] for tr in table.find_all(
+        "tr", {"class": "aggregate_score", "data-aggregate-name": True})]
+    if teams:
+        results["teams"] = teams
+    for player_row in [tr for tr in table.find_all('tr', {"class": "net-line"})
+                       if tr.attrs.get("data-net-name") is not None]:
+        player_name = player_row.attrs["data-net-name"].strip()
+        if player_name not in results["scores"]:
+            results["scores"][player_name] = {}
+        results["scores"][player_name]["scores"] = {}
+        for score in player_row.find_all('td', {'class': 'score'}):
+            hole, value_int, score_type = None, None, None
+            hole_list = [a for a in score.attrs["class"] if a.startswith('hole')]
+            if len(hole_list) == 1:
+                hole = hole_list[0].replace("hole", "")
+            value = score.find('div', {"class": "single-score"}).text.strip()
+            if value.isdigit():
+                value_int = int(value)
+            type_list = [a for a in score.attrs["class"] if a.endswith('-hole')]
+            if len(type_list) == 1:
+                score_type = type_list[0].replace('-hole', '')
+            if hole is not None and value_int is not None and score_type is not None:
+                if hole not in results["scores"][player_name]["scores"]:
+                    results["scores"][player_name]["scores"][hole] = {"score": value_int, "type": score_type}
+    return results
+
+
+def extract(page_source, features="html.parser"):
+    results = {"teams": [], "scores": {}}
+    extract_scorecard(parse_scorecard(page_source, features)).merge_into(results)
+    return results
+
+
+def throughput(func, pages, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(pages) / best
+
+
+def bench(pages):
+    tables = [parse_scorecard(page) for page in pages]
+    return {
+        "scorecards": len(pages),
+        "legacy_scorecards_per_second": throughput(legacy_extract, pages),
+        "scorecards_per_second": throughput(extract, pages),
+        "extract_only_scorecards_per_second": throughput(extract_scorecard, tables)
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sys.argv[1:]:
+            with open(path) as fp:
+                pages.append(fp.read())
+    else:
+        pages = [scorecard_page(result) for name, result in league_rounds(players=40, rounds=10)]
+    result = bench(pages)
+    print("%(scorecards)d scorecards: original %(legacy_scorecards_per_second).1f/s, "
+          "parse_scorecard + extract_scorecard %(scorecards_per_second).1f/s, "
+          "extract_scorecard only %(extract_only_scorecards_per_second).1f/s" % result)
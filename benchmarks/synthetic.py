@@ -0,0 +1,130 @@
+"""
+Synthetic league data for the benchmarks.
+
+    python -m benchmarks.synthetic output_dir [players] [rounds]
+
+Rounds have the shape GGParser.iter_rounds yields and to_json writes, scorecard pages use the class
+names extract_scorecard reads.
+"""
+import datetime
+import json
+import os
+import random
+import sys
+from golfgenius.capture import atomic_write
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+SCORE_TYPES = {-2: "eagle", -1: "birdie", 0: "par", 1: "plus1", 2: "plus2", 3: "plus3"}
+# Strokes over par and how often they occur
+SCORE_WEIGHTS = [(-2, 1), (-1, 12), (0, 45), (1, 30), (2, 9), (3, 3)]
+PARS = [4, 4, 3, 5, 4, 4, 3, 4, 5, 4, 3, 4, 5, 4, 4, 3, 5, 4]
+
+
+def round_name(number, date):
+    """
+    :return: round name in the format Stats parses the date from
+    """
+    return "Round %d (%s, %s %d)" % (number, DAYS[date.weekday()], MONTHS[date.month - 1], date.day)
+
+
+def league_rounds(players=40, rounds=30, team_size=2, attendance=0.75, missing_holes=0.02, seed=1,
+                  start=datetime.date(2020, 5, 1)):
+    """ Generates a league season, one weekly round at a time
+    :param players: number of players in the league
+    :param rounds: number of rounds
+    :param team_size: players per team
+    :param attendance: share of the players playing each round
+    :param missing_holes: probability of a hole without a score
+    :param seed: random seed
+    :param start: date of the first round, round numbers continue past 60 into the next year
+    :return: iterator of (round name, round dict) tuples like GGParser.iter_rounds
+    """
+    rnd = random.Random(seed)
+    names = ["Player %d" % i for i in range(1, players + 1)]
+    skill = dict((name, rnd.gauss(0, 0.25)) for name in names)
+    overs, weights = zip(*SCORE_WEIGHTS)
+    for r in range(rounds):
+        date = start + datetime.timedelta(days=7 * r)
+        number = r + 1 if date.year == start.year else 61 + r
+        name = round_name(number, date)
+        playing = rnd.sample(names, max(team_size, int(players * attendance)))
+        teams = [playing[i:i + team_size] for i in range(0, len(playing), team_size)]
+        scores = {}
+        for player in playing:
+            holes = {}
+            for hole, par in enumerate(PARS, 1):
+                if rnd.random() < missing_holes:
+                    continue
+                over = rnd.choices(overs, weights)[0] + (1 if rnd.random() < skill[player] else 0)
+                over = min(over, max(SCORE_TYPES))
+                holes[str(hole)] = {"score": par + over, "type": SCORE_TYPES[over]}
+            scores[player] = {"scores": holes}
+        events = [{"event_id": str(1000 * number + k), "spec_id": str(k), "text": "Bet %d" % k}
+                  for k in range(1, len(teams) + 1)]
+        yield name, {"name": name, "results": {"teams": teams, "scores": scores}, "events": events,
+                     "complete": True}
+
+
+def write_league(directory, **kwargs):
+    """ Writes a synthetic season as round json files like GGParser.to_json
+    :param directory: output directory
+    :param kwargs: league_rounds arguments
+    :return: number of rounds written
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    written = 0
+    for name, result in league_rounds(**kwargs):
+        atomic_write(os.path.join(directory, "%s.json" % name), json.dumps(result, indent=4).encode("utf-8"))
+        written += 1
+    return written
+
+
+def scorecard_page(result, extra_rows=0):
+    """ Scorecard page of a round, one table.scorecard holding every team
+    :param result: round dict as yielded by league_rounds
+    :param extra_rows: rows of unrelated page content before the table, to make the page realistically large
+    :return: html
+    """
+    scores = result["results"]["scores"]
+    rows = []
+    for team in result["results"]["teams"]:
+        rows.append('<tr class="aggregate_score" data-aggregate-name="%s"><td>%s</td></tr>'
+                    % (" + ".join(team), " + ".join(team)))
+        for player in team:
+            cells = []
+            for hole in range(1, len(PARS) + 1):
+                h = scores[player]["scores"].get(str(hole))
+                if h is None:
+                    cells.append('<td class="score hole%d"><div class="single-score"></div></td>' % hole)
+                else:
+                    cells.append('<td class="score hole%d %s-hole"><div class="single-score">%d</div></td>'
+                                 % (hole, h["type"], h["score"]))
+            rows.append('<tr class="net-line" data-net-name="%s"><td class="name">%s</td>%s</tr>'
+                        % (player, player, "".join(cells)))
+    filler = "".join('<div class="leaderboard-row"><span>%d</span><span>Filler</span></div>' % i
+                     for i in range(extra_rows))
+    return ('<html><head><title>%s</title></head><body><div class="content">%s'
+            '<table class="scorecard"><tbody>%s</tbody></table></div></body></html>'
+            % (result["name"], filler, "\n".join(rows)))
+
+
+def results_page(rounds=300, bets=40, players=40):
+    """ Round selection page with a round select, bet links and a scorecard, for locator benchmarks """
+    options = "".join('<option value="%d">Round %d</option>\n' % (i, i) for i in range(rounds))
+    anchors = "".join('<a class="expand-tournament" data-tournament-event-id="%d" data-tournament-spec-id="%d">'
+                      'Bet %d</a>\n' % (i, i, i) for i in range(bets))
+    cells = "".join('<td class="score hole%d par-hole"><div class="single-score">4</div></td>' % h
+                    for h in range(1, 19))
+    rows = "".join('<tr class="net-line" data-net-name="Player %d">%s</tr>\n' % (i, cells) for i in range(players))
+    return ('<html><body><div><div><select id="round">%s</select></div>%s'
+            '<table class="scorecard"><tbody>%s</tbody></table></div></body></html>' % (options, anchors, rows))
+
+
+if __name__ == '__main__':
+    output_dir = sys.argv[1]
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    print("Wrote %d rounds to %s" % (write_league(output_dir, players=players, rounds=rounds), output_dir))
@@ -1,4 +1,22 @@
-from golfgenius.parser import GGParser
-from golfgenius.stats import Stats
+import importlib
 __version__ = '2.0.0'
 __all__ = ['GGParser', 'Stats']
+
+# Imported on first access, so Stats users do not load selenium and bs4 with the package
+_LAZY = {
+    'GGParser': 'golfgenius.parser',
+    'Stats': 'golfgenius.stats'
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
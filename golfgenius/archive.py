@@ -0,0 +1,272 @@
+import io
+import json
+import logging
+import os
+import numpy as np
+from golfgenius.cache import RoundTable, load_results
+from golfgenius.capture import atomic_write
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+ARCHIVE_INDEX = "archive.npz"
+ARCHIVE_VERSION = 1
+ROW_DTYPE = np.dtype([("player", "<i4"), ("round", "<i4"), ("hole", "i1"), ("score", "i1"), ("type", "i1")])
+
+
+def is_archive(path):
+    return os.path.isfile(os.path.join(path, ARCHIVE_INDEX))
+
+
+class HoleArchive(object):
+    """
+    On-disk archive of hole scores for many seasons.
+
+    Hole rows are fixed-width (player, round, hole, score, type) records in a flat file that is memory-mapped
+    read-only, so a query only pages in the rows it touches. The rows of a round are contiguous. A small
+    sidecar index holds the players and type_names vocabularies and per round the name, date ordinal, teams,
+    first row and row count and the ids of its players, so player and date queries find their rounds without
+    reading any rows.
+
+    Rounds are appended: rows are written and fsynced before the sidecar is replaced atomically, so a crash
+    leaves at most unreferenced rows that the next append overwrites. A round appended again supersedes its
+    earlier rows, compact() drops them.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: archive directory, created on the first append
+        """
+        self.path = os.path.abspath(path)
+        self.index_path = os.path.join(self.path, ARCHIVE_INDEX)
+        self._rows = None
+        self._load_index()
+
+    def _load_index(self):
+        self.players = []
+        self.type_names = []
+        self.names = []
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.dates = np.zeros(0, dtype=np.int64)
+        self.teams = []
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.player_offsets = np.zeros(1, dtype=np.int64)
+        self.round_players = np.zeros(0, dtype=np.int32)
+        self.n_rows = 0
+        self.next_id = 0
+        self.rows_file = "holes-0.bin"
+        if os.path.isfile(self.index_path):
+            with np.load(self.index_path, allow_pickle=False) as data:
+                if int(data["version"]) != ARCHIVE_VERSION:
+                    raise ValueError("Unsupported hole archive version %d in %s" % (int(data["version"]), self.path))
+                self.players = data["players"].tolist()
+                self.type_names = data["type_names"].tolist()
+                self.names = data["names"].tolist()
+                self.ids = data["ids"]
+                self.dates = data["dates"]
+                self.teams = data["teams"].tolist()
+                self.starts = data["starts"]
+                self.counts = data["counts"]
+                self.player_offsets = data["player_offsets"]
+                self.round_players = data["round_players"]
+                self.n_rows = int(data["n_rows"])
+                self.next_id = int(data["next_id"])
+                self.rows_file = str(data["rows_file"])
+        self.round_index = dict((name, k) for k, name in enumerate(self.names))
+        self.player_index = dict((name, i) for i, name in enumerate(self.players))
+        self._rows = None
+
+    def _save_index(self):
+        data = io.BytesIO()
+        # Compressed, the fixed-width string arrays of names and teams are mostly padding
+        np.savez_compressed(
+            data, version=np.array(ARCHIVE_VERSION), players=np.array(self.players, dtype=str),
+            type_names=np.array(self.type_names, dtype=str), names=np.array(self.names, dtype=str), ids=self.ids,
+            dates=self.dates, teams=np.array(self.teams, dtype=str), starts=self.starts, counts=self.counts,
+            player_offsets=self.player_offsets, round_players=self.round_players, n_rows=np.array(self.n_rows),
+            next_id=np.array(self.next_id), rows_file=np.array(self.rows_file))
+        atomic_write(self.index_path, data.getvalue())
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def rows(self):
+        """
+        :return: read-only memmap of the hole rows, mapped on first use
+        """
+        if self._rows is None:
+            if not self.n_rows:
+                self._rows = np.zeros(0, dtype=ROW_DTYPE)
+            else:
+                rows_path = os.path.join(self.path, self.rows_file)
+                size = os.path.getsize(rows_path)
+                if size < self.n_rows * ROW_DTYPE.itemsize:
+                    raise ValueError("Hole archive %s holds %d of its %d rows in %s" % (
+                        self.path, size // ROW_DTYPE.itemsize, self.n_rows, self.rows_file))
+                self._rows = np.memmap(rows_path, dtype=ROW_DTYPE, mode="r", shape=(self.n_rows,))
+        return self._rows
+
+    def round_rows(self, k):
+        """
+        :param k: index of the round
+        :return: hole rows of round k, a view of the memmap
+        """
+        return self.rows[self.starts[k]:self.starts[k] + self.counts[k]]
+
+    def window(self, start=None, end=None):
+        """
+        :param start: first date ordinal to include
+        :param end: last date ordinal to include
+        :return: indices of the rounds dated within start and end, in date order
+        """
+        selected = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            selected &= self.dates >= start
+        if end is not None:
+            selected &= self.dates <= end
+        rounds = np.flatnonzero(selected)
+        return rounds[np.argsort(self.dates[rounds], kind="stable")]
+
+    def player_rounds(self, player):
+        """
+        :param player: player name
+        :return: indices of the rounds the player has an entry in, in date order
+        """
+        i = self.player_index.get(player)
+        if i is None:
+            return np.zeros(0, dtype=np.int64)
+        entries = np.flatnonzero(self.round_players == i)
+        rounds = np.searchsorted(self.player_offsets, entries, side="right") - 1
+        return rounds[np.argsort(self.dates[rounds], kind="stable")]
+
+    def last_rounds(self, player, n):
+        """ The player's most recent rounds, reading only the rows of those rounds
+        :param player: player name
+        :param n: number of rounds
+        :return: list of (round name, date ordinal, rows) oldest first, rows holding the player's hole rows
+        """
+        rounds = self.player_rounds(player)[-n:] if n else []
+        i = self.player_index.get(player)
+        result = []
+        for k in rounds:
+            rows = self.round_rows(k)
+            result.append((self.names[k], int(self.dates[k]), np.array(rows[rows["player"] == i])))
+        return result
+
+    def table(self, rounds=None):
+        """
+        :param rounds: indices of the rounds to read, defaults to all in archive order
+        :return: RoundTable of the rounds, paging in only their rows. The file of a round is
+            "archive#<round name>", its mtime and size are its first row and row count.
+        """
+        rounds = np.arange(len(self.names)) if rounds is None else np.asarray(rounds, dtype=np.int64)
+        counts = self.counts[rounds]
+        if len(rounds):
+            rows = np.concatenate([self.round_rows(k) for k in rounds])
+        else:
+            rows = np.zeros(0, dtype=ROW_DTYPE)
+        return RoundTable(["archive#%s" % self.names[k] for k in rounds], self.starts[rounds].astype(np.float64),
+                          counts.copy(), [self.names[k] for k in rounds], self.dates[rounds].copy(),
+                          [json.loads(self.teams[k]) for k in rounds],
+                          np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), rows["player"].copy(),
+                          rows["hole"].copy(), rows["score"].copy(), rows["type"].copy(), self.players,
+                          self.type_names)
+
+    def append(self, table):
+        """ Appends the rounds of a RoundTable, replacing archived rounds of the same name
+        :param table: RoundTable, e.g. from load_results
+        :return: number of rounds appended
+        """
+        if not len(table):
+            return 0
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        player_codes = dict((name, i) for i, name in enumerate(self.players))
+        type_codes = dict((name, i) for i, name in enumerate(self.type_names))
+
+        def code(codes, vocab, name):
+            if name not in codes:
+                codes[name] = len(vocab)
+                vocab.append(name)
+            return codes[name]
+
+        player_map = np.array([code(player_codes, self.players, p) for p in table.players], dtype=np.int32)
+        type_map = np.array([code(type_codes, self.type_names, t) for t in table.type_names] + [-1], dtype=np.int8)
+        ids = np.arange(self.next_id, self.next_id + len(table), dtype=np.int64)
+        lengths = np.diff(table.offsets)
+        rows = np.zeros(len(table.player), dtype=ROW_DTYPE)
+        rows["player"] = player_map[table.player]
+        rows["round"] = np.repeat(ids, lengths)
+        rows["hole"] = table.hole
+        rows["score"] = table.score
+        rows["type"] = type_map[table.type]
+
+        # Drop the superseded rounds, later rounds of the table replace earlier ones of the same name
+        replaced = set(table.names)
+        keep = [k for k, name in enumerate(self.names) if name not in replaced]
+        last = dict((name, k) for k, name in enumerate(table.names))
+        new = [k for k, name in enumerate(table.names) if last[name] == k]
+        round_players = [self.round_players[self.player_offsets[k]:self.player_offsets[k + 1]] for k in keep]
+        round_players.extend(np.unique(rows["player"][table.offsets[k]:table.offsets[k + 1]]) for k in new)
+
+        rows_path = os.path.join(self.path, self.rows_file)
+        self._rows = None
+        with open(rows_path, "ab") as fp:
+            # Rows past n_rows were left by an interrupted append
+            fp.truncate(self.n_rows * ROW_DTYPE.itemsize)
+            fp.seek(0, os.SEEK_END)
+            fp.write(rows.tobytes())
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        self.names = [self.names[k] for k in keep] + [table.names[k] for k in new]
+        self.ids = np.concatenate([self.ids[keep], ids[new]])
+        self.dates = np.concatenate([self.dates[keep], np.asarray(table.dates)[new]]).astype(np.int64)
+        self.teams = [self.teams[k] for k in keep] + [json.dumps(table.teams[k]) for k in new]
+        self.starts = np.concatenate([self.starts[keep], self.n_rows + table.offsets[new]]).astype(np.int64)
+        self.counts = np.concatenate([self.counts[keep], lengths[new]]).astype(np.int64)
+        self.player_offsets = np.concatenate([[0], np.cumsum([len(p) for p in round_players])]).astype(np.int64)
+        self.round_players = np.concatenate(round_players).astype(np.int32) if round_players else \
+            np.zeros(0, dtype=np.int32)
+        self.n_rows += len(rows)
+        self.next_id += len(table)
+        self._save_index()
+        self.round_index = dict((name, k) for k, name in enumerate(self.names))
+        self.player_index = dict((name, i) for i, name in enumerate(self.players))
+        logger.debug("Appended %d rounds (%d rows) to hole archive %s" % (len(new), len(rows), self.path))
+        return len(new)
+
+    def append_results(self, results_dir, cache=True):
+        """
+        :param results_dir: directory of round json files or round streams, or a round stream
+        :return: number of rounds appended
+        """
+        return self.append(load_results(results_dir, cache=cache))
+
+    def compact(self):
+        """ Rewrites the rows without superseded rounds into a new rows file, then switches the sidecar to it
+        :return: number of rows dropped
+        """
+        live = int(self.counts.sum())
+        if live == self.n_rows:
+            return 0
+        dropped = self.n_rows - live
+        old_file = self.rows_file
+        rows = self.rows
+        generation = int(old_file[len("holes-"):-len(".bin")]) + 1
+        self.rows_file = "holes-%d.bin" % generation
+        starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]]).astype(np.int64)
+        with open(os.path.join(self.path, self.rows_file), "wb") as fp:
+            for k in range(len(self.names)):
+                fp.write(rows[self.starts[k]:self.starts[k] + self.counts[k]].tobytes())
+            fp.flush()
+            os.fsync(fp.fileno())
+        self.starts = starts
+        self.n_rows = live
+        self._save_index()
+        self._rows = None
+        del rows
+        os.remove(os.path.join(self.path, old_file))
+        return dropped
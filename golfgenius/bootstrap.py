@@ -0,0 +1,83 @@
+import numpy as np
+
+CHUNK_SIZE = 250
+
+
+def _resample_chunk(values, weights, starts, counts, size, seed):
+    """ Draws size resamples of every row of a ragged matrix
+    :param values: float array of the entries of all rows, row by row
+    :param weights: float array of the weight of each entry position
+    :param starts: int array of the first entry of each row, rows have at least one entry
+    :param counts: int array of the entries per row
+    :param size: number of resamples
+    :param seed: numpy SeedSequence of the chunk
+    :return: float array size x rows of the weighted averages of the resampled rows
+    """
+    rng = np.random.default_rng(seed)
+    row_of = np.repeat(np.arange(len(counts)), counts)
+    n = counts[row_of]
+    # Every entry position of a row draws one of the row's entries
+    draws = (rng.random((size, len(values)), dtype=np.float32) * n).astype(np.int64)
+    picks = starts[row_of] + np.minimum(draws, n - 1)
+    sums = np.add.reduceat(values[picks] * weights, starts, axis=1)
+    return sums / np.add.reduceat(weights, starts)
+
+
+def bootstrap_averages(values, weights, n_resamples=1000, seed=None, workers=None, chunk_size=CHUNK_SIZE):
+    """ Bootstrap distribution of the weighted row averages of values
+    Each resample redraws a row's weighted entries with replacement from the row's entries and keeps the weights
+    of the positions, so recency weighting carries over to the resampled averages.
+    :param values: float array rows x columns
+    :param weights: float array rows x columns, entries with weight 0 are ignored
+    :param n_resamples: number of resamples
+    :param seed: seed for reproducible resamples, the same seed gives the same result for any number of workers
+    :param workers: number of processes to spread the resample chunks over
+    :param chunk_size: resamples drawn per chunk, bounds the memory of one chunk to about
+        chunk_size x weighted entries values
+    :return: float array n_resamples x rows, nan for rows without weight
+    """
+    valid = np.asarray(weights) > 0
+    counts = valid.sum(axis=1)
+    sampled = np.flatnonzero(counts)
+    samples = np.full((n_resamples, len(counts)), np.nan)
+    if not len(sampled) or not n_resamples:
+        return samples
+    flat_values = np.asarray(values, dtype=np.float64)[sampled][valid[sampled]]
+    flat_weights = np.asarray(weights, dtype=np.float64)[sampled][valid[sampled]]
+    starts = np.concatenate([[0], np.cumsum(counts[sampled])[:-1]])
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(flat_values, flat_weights, starts, counts[sampled], size, chunk_seed)
+            for size, chunk_seed in zip(sizes, seeds)]
+    if workers and len(args) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_resample_chunk, *zip(*args)))
+    else:
+        chunks = [_resample_chunk(*chunk_args) for chunk_args in args]
+    samples[:, sampled] = np.concatenate(chunks)
+    return samples
+
+
+def confidence_intervals(samples, confidence=0.95):
+    """
+    :param samples: float array resamples x rows
+    :param confidence: coverage of the intervals
+    :return: (low, high) float arrays of the percentile interval of each row
+    """
+    tail = (1.0 - confidence) / 2 * 100
+    with np.errstate(invalid="ignore"):
+        low, high = np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+    return low, high
+
+
+def rank_probabilities(samples, top=(1, 3, 10), reverse=False):
+    """
+    :param samples: float array resamples x rows, nan rows rank last
+    :param top: values of k
+    :param reverse: rank the highest averages first
+    :return: dict of k -> float array of the probability of each row ranking in the top k
+    """
+    keys = np.where(np.isnan(samples), np.inf, -samples if reverse else samples)
+    ranks = np.argsort(np.argsort(keys, axis=1, kind="stable"), axis=1, kind="stable")
+    return dict((k, (ranks < k).mean(axis=0)) for k in top)
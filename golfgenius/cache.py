@@ -0,0 +1,279 @@
+import io
+import json
+import logging
+import os
+import numpy as np
+from golfgenius.capture import atomic_write
+from golfgenius.rounds import parse_round_date
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+CACHE_NAME = ".golfgenius-stats.npz"
+CACHE_VERSION = 1
+
+
+def round_record(data):
+    """ Flattens a round json document into hole rows
+    :param data: round dict with name and results
+    :return: dict with name, date ordinal (0 when the name has no date), teams, the round's players with
+        their number of rows, and the hole, score and type code (into type_names) of every recorded hole.
+        Players without any hole get a single row with hole 0 and type -1.
+    """
+    players, counts, holes, scores, types = [], [], [], [], []
+    type_names, type_codes = [], {}
+    for player, player_data in data["results"]["scores"].items():
+        players.append(player)
+        recorded = 0
+        for hole, h in player_data["scores"].items():
+            if not hole.isdigit():
+                continue
+            code = type_codes.get(h["type"])
+            if code is None:
+                code = type_codes[h["type"]] = len(type_names)
+                type_names.append(h["type"])
+            holes.append(int(hole))
+            scores.append(h["score"])
+            types.append(code)
+            recorded += 1
+        if not recorded:
+            holes.append(0)
+            scores.append(0)
+            types.append(-1)
+            recorded = 1
+        counts.append(recorded)
+    date = parse_round_date(data["name"])
+    return {
+        "name": data["name"],
+        "date": date.toordinal() if date is not None else 0,
+        "teams": data["results"].get("teams", []),
+        "players": players,
+        "counts": counts,
+        "holes": holes,
+        "scores": scores,
+        "types": types,
+        "type_names": type_names
+    }
+
+
+def read_round_file(path):
+    with open(path, 'r') as fp:
+        return round_record(json.load(fp))
+
+
+class RoundTable(object):
+    """
+    Columnar form of a set of round files.
+
+    Per round: file, mtime, size, name, date ordinal (0 = unknown) and teams. Per hole row: player and type
+    codes into the players and type_names vocabularies, hole (0 for a player without holes) and score.
+    The rows of round k are rows offsets[k]:offsets[k + 1].
+    """
+    ROW_FIELDS = ("player", "hole", "score", "type")
+
+    def __init__(self, files, mtimes, sizes, names, dates, teams, offsets, player, hole, score, type,
+                 players, type_names):
+        self.files = files
+        self.mtimes = mtimes
+        self.sizes = sizes
+        self.names = names
+        self.dates = dates
+        self.teams = teams
+        self.offsets = offsets
+        self.player = player
+        self.hole = hole
+        self.score = score
+        self.type = type
+        self.players = players
+        self.type_names = type_names
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, sources, players=None, type_names=None):
+        """
+        :param sources: list of (file, mtime, size, record) where record is either a round_record dict or a
+            (table, k) reference to round k of another RoundTable
+        :param players: initial players vocabulary
+        :param type_names: initial type vocabulary
+        :return: RoundTable
+        """
+        players = list(players or [])
+        type_names = list(type_names or [])
+        player_codes = dict((name, i) for i, name in enumerate(players))
+        type_codes = dict((name, i) for i, name in enumerate(type_names))
+
+        def code(codes, vocab, name):
+            if name not in codes:
+                codes[name] = len(vocab)
+                vocab.append(name)
+            return codes[name]
+
+        maps = {}
+        names, dates, teams, offsets = [], [], [], [0]
+        columns = dict((field, []) for field in cls.ROW_FIELDS)
+        for fname, mtime, size, record in sources:
+            if isinstance(record, dict):
+                names.append(record["name"])
+                dates.append(record["date"])
+                teams.append(record["teams"])
+                player_map = np.array([code(player_codes, players, p) for p in record["players"]], dtype=np.int32)
+                type_map = np.array([code(type_codes, type_names, t) for t in record["type_names"]] + [-1],
+                                    dtype=np.int8)
+                columns["player"].append(np.repeat(player_map, record["counts"]))
+                columns["hole"].append(np.array(record["holes"], dtype=np.int8))
+                columns["score"].append(np.array(record["scores"], dtype=np.int8))
+                columns["type"].append(type_map[np.array(record["types"], dtype=np.int64)])
+            else:
+                table, k = record
+                rows = slice(table.offsets[k], table.offsets[k + 1])
+                names.append(table.names[k])
+                dates.append(table.dates[k])
+                teams.append(table.teams[k])
+                if id(table) not in maps:
+                    maps[id(table)] = (
+                        np.array([code(player_codes, players, p) for p in table.players], dtype=np.int32),
+                        np.array([code(type_codes, type_names, t) for t in table.type_names] + [-1], dtype=np.int8))
+                player_map, type_map = maps[id(table)]
+                columns["player"].append(player_map[table.player[rows]])
+                columns["hole"].append(table.hole[rows])
+                columns["score"].append(table.score[rows])
+                columns["type"].append(type_map[table.type[rows]])
+            offsets.append(offsets[-1] + len(columns["hole"][-1]))
+        dtypes = {"player": np.int32, "hole": np.int8, "score": np.int8, "type": np.int8}
+        rows = dict((field, np.concatenate(columns[field]) if columns[field] else np.zeros(0, dtype=dtypes[field]))
+                    for field in cls.ROW_FIELDS)
+        return cls([s[0] for s in sources], np.array([s[1] for s in sources], dtype=np.float64),
+                   np.array([s[2] for s in sources], dtype=np.int64), names, np.array(dates, dtype=np.int64),
+                   teams, np.array(offsets, dtype=np.int64), rows["player"], rows["hole"], rows["score"],
+                   rows["type"], players, type_names)
+
+    def round_scores(self, k):
+        """
+        :param k: index of the round
+        :return: dict of player -> {"scores": {hole: {"score", "type"}}} of round k
+        """
+        scores = {}
+        for row in range(self.offsets[k], self.offsets[k + 1]):
+            holes = scores.setdefault(self.players[self.player[row]], {"scores": {}})["scores"]
+            if self.hole[row] > 0:
+                holes[str(self.hole[row])] = {"score": int(self.score[row]),
+                                              "type": self.type_names[self.type[row]]}
+        return scores
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        :param results: dict of round name -> round results with teams and scores
+        :return: RoundTable with one round per entry
+        """
+        return cls.build([(None, 0.0, 0, round_record({"name": name, "results": round_results}))
+                          for name, round_results in results.items()])
+
+    def save(self, path):
+        data = io.BytesIO()
+        np.savez(data, version=np.array(CACHE_VERSION), files=np.array(self.files, dtype=str),
+                 mtimes=self.mtimes, sizes=self.sizes, names=np.array(self.names, dtype=str), dates=self.dates,
+                 teams=np.array([json.dumps(t) for t in self.teams], dtype=str), offsets=self.offsets,
+                 player=self.player, hole=self.hole, score=self.score, type=self.type,
+                 players=np.array(self.players, dtype=str), type_names=np.array(self.type_names, dtype=str))
+        atomic_write(path, data.getvalue())
+
+    @classmethod
+    def load(cls, path):
+        """
+        :return: RoundTable saved at path, or None if it is missing or from another version
+        """
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != CACHE_VERSION:
+                    return None
+                return cls(data["files"].tolist(), data["mtimes"], data["sizes"], data["names"].tolist(),
+                           data["dates"], [json.loads(t) for t in data["teams"]], data["offsets"], data["player"],
+                           data["hole"], data["score"], data["type"], data["players"].tolist(),
+                           data["type_names"].tolist())
+        except (ValueError, KeyError, OSError):
+            logger.warning("Ignoring unreadable results cache %s" % path)
+            return None
+
+
+def load_stream(path, fname=None):
+    """ Loads a .jsonl or .ggr round stream written by GGParser.iter_to_json
+    :param path: round stream file
+    :param fname: name the rounds are filed under, defaults to the file name
+    :return: RoundTable with one round per round name, the file of a round is "<fname>#<round name>" and its
+        mtime and size are the offset and length of the round's record
+    """
+    from golfgenius.streams import stream_records
+    fname = fname or os.path.basename(path)
+    return RoundTable.build([("%s#%s" % (fname, record["name"]), offset, length, record)
+                             for offset, length, record in stream_records(path)])
+
+
+def load_results(results_dir, cache=True, workers=None):
+    """ Loads the round json files and round streams of a directory, reusing a compiled cache for unchanged
+    json files
+    :param results_dir: directory of round json files, or a .jsonl or .ggr round stream
+    :param cache: read and update the cache file in results_dir
+    :param workers: number of processes to decode changed json files with
+    :return: RoundTable in directory listing order, followed by the rounds of the streams, which replace json
+        files of the same round name
+    """
+    if os.path.isfile(results_dir):
+        return load_stream(results_dir)
+    table = _load_files(results_dir, cache, workers)
+    streams = sorted(f for f in os.listdir(results_dir) if f.endswith((".jsonl", ".ggr")))
+    if not streams:
+        return table
+    # Later sources replace earlier rounds of the same name
+    sources = {}
+    for source in [table] + [load_stream(os.path.join(results_dir, f), f) for f in streams]:
+        for k, name in enumerate(source.names):
+            sources.pop(name, None)
+            sources[name] = (source.files[k], source.mtimes[k], source.sizes[k], (source, k))
+    return RoundTable.build(list(sources.values()))
+
+
+def _load_files(results_dir, cache, workers):
+    cache_path = os.path.join(results_dir, CACHE_NAME)
+    cached = RoundTable.load(cache_path) if cache else None
+    cached_files = {}
+    if cached is not None:
+        cached_files = dict((fname, k) for k, fname in enumerate(cached.files))
+    sources = []
+    changed = []
+    for f in os.listdir(results_dir):
+        if f.endswith('.json'):
+            st = os.stat(os.path.join(results_dir, f))
+            k = cached_files.pop(f, None)
+            if k is not None and cached.mtimes[k] == st.st_mtime and cached.sizes[k] == st.st_size:
+                sources.append([f, st.st_mtime, st.st_size, (cached, k)])
+            else:
+                sources.append([f, st.st_mtime, st.st_size, None])
+                changed.append(sources[-1])
+    if cached is not None and not changed and not cached_files and [s[0] for s in sources] == cached.files:
+        return cached
+    if changed:
+        paths = [os.path.join(results_dir, source[0]) for source in changed]
+        if workers and len(paths) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                records = list(executor.map(read_round_file, paths, chunksize=16))
+        else:
+            records = [read_round_file(path) for path in paths]
+        for source, record in zip(changed, records):
+            source[3] = record
+    table = RoundTable.build([tuple(source) for source in sources],
+                             cached.players if cached is not None else None,
+                             cached.type_names if cached is not None else None)
+    if cache and (changed or cached_files or cached is None):
+        logger.debug("Updating results cache %s (%d files decoded)" % (cache_path, len(changed)))
+        try:
+            table.save(cache_path)
+        except OSError as exc:
+            # The cache only speeds up the next load, a read-only results directory still loads
+            logger.warning("Unable to write results cache %s: %s" % (cache_path, exc))
+    return table
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+INDEX_NAME = ".golfgenius-index"
+INDEX_VERSION = 1
+
+
+def atomic_write(path, data):
+    """ Writes bytes to path through a temporary file so readers never see a partial file
+    :param path: destination path
+    :param data: bytes
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CaptureIndex(object):
+    """
+    On-disk index of the round files already captured in a results directory.
+
+    Each entry records the round name, the event and spec ids whose scorecards were loaded, whether the
+    round was complete, and the path, mtime, size and content hash of its file. The index is stored next
+    to the results as one small file and refreshed only for round files that were added or changed since
+    it was written. Rounds of .jsonl and .ggr round streams are indexed per round under "<stream>#<round name>"
+    with the offset of their last record.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: results directory holding round json files
+        """
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, INDEX_NAME)
+        self.entries = {}
+
+    def load(self):
+        """ Loads the index, re-reading only round files that are new or changed
+        :return: self
+        """
+        entries = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path) as fp:
+                    data = json.load(fp)
+                if data.get("version") == INDEX_VERSION:
+                    entries = data["entries"]
+            except (ValueError, KeyError):
+                logger.warning("Ignoring unreadable capture index %s" % self.path)
+        self.entries = {}
+        changed = False
+        for root, dirs, files in os.walk(self.directory):
+            for f in files:
+                if f.endswith((".jsonl", ".ggr")):
+                    changed |= self._load_stream(os.path.relpath(os.path.join(root, f), self.directory), entries)
+                    continue
+                if not f.endswith(".json"):
+                    continue
+                relpath = os.path.relpath(os.path.join(root, f), self.directory)
+                entry = entries.pop(relpath, None)
+                st = os.stat(os.path.join(self.directory, relpath))
+                if entry is None or entry["mtime"] != st.st_mtime or entry["size"] != st.st_size:
+                    entry = self._read_entry(relpath)
+                    changed = True
+                if entry is not None:
+                    self.entries[relpath] = entry
+        if entries:
+            # Round files that were removed
+            changed = True
+        if changed:
+            self.save()
+        logger.info("Loaded capture index of %d rounds from %s" % (len(self.entries), self.directory))
+        return self
+
+    def _load_stream(self, relpath, entries):
+        """ Moves the entries of a round stream from entries, re-reading the stream if it changed
+        :return: True if the stream was re-read
+        """
+        from golfgenius.streams import iter_stream
+        st = os.stat(os.path.join(self.directory, relpath))
+        keys = [key for key, entry in entries.items() if entry["path"] == relpath]
+        if keys and all(entries[key]["mtime"] == st.st_mtime and entries[key]["size"] == st.st_size for key in keys):
+            for key in keys:
+                self.entries[key] = entries.pop(key)
+            return False
+        for key in keys:
+            del entries[key]
+        for offset, raw, result in iter_stream(os.path.join(self.directory, relpath)):
+            self.entries["%s#%s" % (relpath, result.get("name"))] = self._entry(relpath, result, raw, offset)
+        return True
+
+    def _read_entry(self, relpath):
+        fpath = os.path.join(self.directory, relpath)
+        with open(fpath, "rb") as fp:
+            raw = fp.read()
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            logger.warning("Unable to read round file %s" % fpath)
+            return None
+        return self._entry(relpath, data, raw)
+
+    def _entry(self, relpath, result, raw, offset=None):
+        st = os.stat(os.path.join(self.directory, relpath))
+        events = result.get("events", [])
+        entry = {
+            "name": result.get("name"),
+            "event_ids": [e["event_id"] for e in events],
+            "spec_ids": [e["spec_id"] for e in events],
+            "complete": result.get("complete", "error" not in result),
+            "path": relpath,
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "sha1": hashlib.sha1(raw).hexdigest()
+        }
+        if offset is not None:
+            entry["offset"] = offset
+        return entry
+
+    def save(self):
+        atomic_write(self.path, json.dumps({"version": INDEX_VERSION, "entries": self.entries}).encode("utf-8"))
+
+    def record(self, fpath, result, raw, save=True, offset=None):
+        """ Adds or replaces the entry of a round file that was just written
+        :param fpath: path of the round file, or of the round stream the round was appended to
+        :param result: round dict that was written
+        :param raw: bytes that were written
+        :param save: write the index to disk
+        :param offset: offset of the record when the round was appended to a round stream
+        """
+        relpath = os.path.relpath(os.path.abspath(fpath), self.directory)
+        if offset is None:
+            self.entries[relpath] = self._entry(relpath, result, raw)
+        else:
+            entry = self.entries["%s#%s" % (relpath, result.get("name"))] = self._entry(relpath, result, raw, offset)
+            # The other rounds of the stream are unchanged by the append
+            for other in self.entries.values():
+                if other["path"] == relpath:
+                    other["mtime"], other["size"] = entry["mtime"], entry["size"]
+        if save:
+            self.save()
+
+    def find(self, round_name):
+        """
+        :param round_name: name of the round
+        :return: index entry of the round or None
+        """
+        for entry in self.entries.values():
+            if entry["name"] == round_name:
+                return entry
+        return None
+
+    def rounds(self):
+        return set(entry["name"] for entry in self.entries.values())
+
+    def complete_rounds(self):
+        return set(entry["name"] for entry in self.entries.values() if entry["complete"])
+
+    def event_ids(self):
+        return set(event_id for entry in self.entries.values() for event_id in entry["event_ids"])
+
+    def read(self, round_name):
+        """
+        :param round_name: name of the round
+        :return: round dict stored for the round or None
+        """
+        entry = self.find(round_name)
+        if entry is None:
+            return None
+        if "offset" in entry:
+            from golfgenius.streams import read_round
+            return read_round(os.path.join(self.directory, entry["path"]), entry["offset"])
+        with open(os.path.join(self.directory, entry["path"])) as fp:
+            return json.load(fp)
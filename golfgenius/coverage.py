@@ -0,0 +1,34 @@
+HOLES = [str(x) for x in range(1, 19)]
+
+
+class RoundCoverage(object):
+    """
+    Tracks which team players of a round still have holes without a recorded score.
+
+    Team players come from the data-aggregate-name rows of the scorecards, scores from the data-net-name
+    rows. Once every team player has all 18 holes the remaining bet pages of the round add nothing.
+    """
+
+    def __init__(self, results):
+        """
+        :param results: round results dict with teams and scores, updated as scorecards are recorded
+        """
+        self.results = results
+
+    def players(self):
+        return set(player for team in self.results["teams"] for player in team)
+
+    def missing(self):
+        """
+        :return: dict of team player -> list of holes without a recorded score
+        """
+        missing = {}
+        for player in self.players():
+            recorded = self.results["scores"].get(player, {}).get("scores", {})
+            holes = [hole for hole in HOLES if hole not in recorded]
+            if holes:
+                missing[player] = holes
+        return missing
+
+    def complete(self):
+        return bool(self.results["teams"]) and not self.missing()
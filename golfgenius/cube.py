@@ -0,0 +1,389 @@
+import datetime
+import numpy as np
+from golfgenius.cache import RoundTable
+
+HOLES = 18
+HOLE_NAMES = [str(x) for x in range(1, HOLES + 1)]
+
+
+class ScoreCube(object):
+    """
+    Dense columnar store of hole scores.
+
+    scores and types are players x rounds x 18 int8 arrays, mask marks the holes with a recorded score.
+    Score types are stored as codes into type_names, 0 meaning no score. Rounds keep the order they were
+    added in, players are sorted by name when the cube is built and appended as they first appear after.
+
+    Hole counts, totals and per-type tallies of every player and round are kept up to date as rounds are
+    added, so adding a round costs O(holes) plus an occasional doubling of the buffers.
+    """
+
+    def __init__(self, players, rounds, dates, teams, scores, types, mask, type_names, present=None):
+        """
+        :param players: list of player names
+        :param rounds: list of round names
+        :param dates: int array of round date ordinals
+        :param teams: list with the teams of each round
+        :param scores: int8 array players x rounds x 18
+        :param types: int8 array players x rounds x 18 of codes into type_names (1-based)
+        :param mask: bool array players x rounds x 18
+        :param type_names: list of score type names
+        :param present: bool array players x rounds of the players with an entry in a round's scores,
+            defaults to the players with any recorded hole
+        """
+        self.players = list(players)
+        self.rounds = list(rounds)
+        self.teams = list(teams)
+        self.type_names = list(type_names)
+        self._scores = scores
+        self._types = types
+        self._mask = mask
+        self._present = mask.any(axis=2) if present is None else present
+        self._dates = np.array(dates, dtype=np.int64)
+        self._counts = mask.sum(axis=2, dtype=np.int8)
+        self._totals = scores.sum(axis=2, dtype=np.int32)
+        self._tallies = np.stack([(types == c).sum(axis=2, dtype=np.int8)
+                                  for c in range(1, len(self.type_names) + 1)], axis=2) if self.type_names else \
+            np.zeros(scores.shape[:2] + (0,), dtype=np.int8)
+        self._team_player = np.zeros(len(self.players), dtype=bool)
+        self.player_index = dict((name, i) for i, name in enumerate(self.players))
+        self.round_index = dict((name, j) for j, name in enumerate(self.rounds))
+        team_players = set(player for round_teams in self.teams for team in round_teams for player in team)
+        self._team_player[:] = [name in team_players for name in self.players]
+        self._order = sorted(range(len(self.rounds)), key=lambda j: self._dates[j])
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        :param results: dict of round name -> round results with teams, scores and date
+        :return: ScoreCube
+        """
+        table = RoundTable.from_results(results)
+        dates = [r["date"].toordinal() for r in results.values()]
+        return cls.from_table(table, range(len(table)), dates)
+
+    @classmethod
+    def from_table(cls, table, rounds, dates):
+        """
+        :param table: RoundTable
+        :param rounds: indices of the table rounds to include, in order
+        :param dates: date ordinal of each included round
+        :return: ScoreCube
+        """
+        rounds = list(rounds)
+        offsets = table.offsets
+        lengths = np.array([offsets[k + 1] - offsets[k] for k in rounds], dtype=np.int64)
+        rows = np.concatenate([np.arange(offsets[k], offsets[k + 1]) for k in rounds]) if rounds else \
+            np.zeros(0, dtype=np.int64)
+        round_of_row = np.repeat(np.arange(len(rounds)), lengths)
+        teams = [table.teams[k] for k in rounds]
+
+        player_codes = np.unique(table.player[rows])
+        names = set(table.players[c] for c in player_codes)
+        names.update(player for round_teams in teams for team in round_teams for player in team)
+        players = sorted(names)
+        player_index = dict((name, i) for i, name in enumerate(players))
+        player_map = np.full(len(table.players), -1, dtype=np.int64)
+        for c in player_codes:
+            player_map[c] = player_index[table.players[c]]
+
+        type_codes = np.unique(table.type[rows])
+        type_codes = type_codes[type_codes >= 0]
+        type_names = sorted(table.type_names[c] for c in type_codes)
+        type_map = np.zeros(len(table.type_names) + 1, dtype=np.int8)
+        for c in type_codes:
+            type_map[c] = type_names.index(table.type_names[c]) + 1
+
+        shape = (len(players), len(rounds), HOLES)
+        scores = np.zeros(shape, dtype=np.int8)
+        types = np.zeros(shape, dtype=np.int8)
+        mask = np.zeros(shape, dtype=bool)
+        present = np.zeros(shape[:2], dtype=bool)
+        p = player_map[table.player[rows]]
+        present[p, round_of_row] = True
+        holes = table.hole[rows].astype(np.int64) - 1
+        recorded = (holes >= 0) & (holes < HOLES)
+        p, j, k = p[recorded], round_of_row[recorded], holes[recorded]
+        scores[p, j, k] = table.score[rows][recorded]
+        types[p, j, k] = type_map[table.type[rows][recorded]]
+        mask[p, j, k] = True
+        return cls(players, [table.names[k] for k in rounds], dates, teams, scores, types, mask, type_names,
+                   present)
+
+    @property
+    def scores(self):
+        return self._scores[:len(self.players), :len(self.rounds)]
+
+    @property
+    def types(self):
+        return self._types[:len(self.players), :len(self.rounds)]
+
+    @property
+    def mask(self):
+        return self._mask[:len(self.players), :len(self.rounds)]
+
+    @property
+    def present(self):
+        return self._present[:len(self.players), :len(self.rounds)]
+
+    @property
+    def dates(self):
+        return self._dates[:len(self.rounds)]
+
+    @property
+    def team_player(self):
+        return self._team_player[:len(self.players)]
+
+    def _reserve(self, n_players, n_rounds, n_types):
+        """ Grows the buffers to hold n_players x n_rounds and n_types tallies, at least doubling their capacity """
+        capacity = self._tallies.shape
+        if n_players <= capacity[0] and n_rounds <= capacity[1] and n_types <= capacity[2]:
+            return
+        size = tuple(n if n <= c else max(n, c * 2) for n, c in zip((n_players, n_rounds), capacity[:2]))
+        used = (len(self.players), len(self.rounds))
+
+        def grown(buf, shape):
+            copy = np.zeros(shape, dtype=buf.dtype)
+            index = (slice(0, used[0]), slice(0, used[1])) + tuple(slice(0, n) for n in buf.shape[2:])
+            copy[index] = buf[index]
+            return copy
+
+        for name in ("_scores", "_types", "_mask"):
+            setattr(self, name, grown(getattr(self, name), size + (HOLES,)))
+        for name in ("_present", "_counts", "_totals"):
+            setattr(self, name, grown(getattr(self, name), size))
+        self._tallies = grown(self._tallies, size + (max(n_types, capacity[2]),))
+        dates = np.zeros(size[1], dtype=np.int64)
+        dates[:used[1]] = self._dates[:used[1]]
+        self._dates = dates
+        team_player = np.zeros(size[0], dtype=bool)
+        team_player[:used[0]] = self._team_player[:used[0]]
+        self._team_player = team_player
+
+    def add_round(self, name, date, teams, round_scores):
+        """ Appends a round, replacing a round of the same name
+        :param name: round name
+        :param date: round date ordinal
+        :param teams: list of teams of the round
+        :param round_scores: dict of player -> {"scores": {hole: {"score", "type"}}}
+        :return: index of the round
+        """
+        if name in self.round_index:
+            self.remove_round(name)
+        new_players = [player for player in round_scores if player not in self.player_index]
+        new_players.extend(player for team in teams for player in team
+                           if player not in self.player_index and player not in new_players)
+        new_types = sorted(set(h["type"] for player_data in round_scores.values()
+                               for hole, h in player_data["scores"].items()
+                               if hole.isdigit() and h["type"] not in self.type_names))
+        self._reserve(len(self.players) + len(new_players), len(self.rounds) + 1,
+                      len(self.type_names) + len(new_types))
+        for player in new_players:
+            self.player_index[player] = len(self.players)
+            self.players.append(player)
+        self.type_names.extend(new_types)
+        j = len(self.rounds)
+        self.rounds.append(name)
+        self.round_index[name] = j
+        self.teams.append(teams)
+        self._dates[j] = date
+        type_codes = dict((type_name, c) for c, type_name in enumerate(self.type_names, 1))
+        present, rows, holes, scores, codes = [], [], [], [], []
+        for player, player_data in round_scores.items():
+            i = self.player_index[player]
+            present.append(i)
+            for hole, h in player_data["scores"].items():
+                if hole.isdigit() and 1 <= int(hole) <= HOLES:
+                    rows.append(i)
+                    holes.append(int(hole) - 1)
+                    scores.append(h["score"])
+                    codes.append(type_codes[h["type"]])
+        rows, holes = np.array(rows, dtype=np.int64), np.array(holes, dtype=np.int64)
+        scores, codes = np.array(scores, dtype=np.int8), np.array(codes, dtype=np.int8)
+        self._present[present, j] = True
+        self._scores[rows, j, holes] = scores
+        self._types[rows, j, holes] = codes
+        self._mask[rows, j, holes] = True
+        np.add.at(self._counts[:, j], rows, 1)
+        np.add.at(self._totals[:, j], rows, scores)
+        np.add.at(self._tallies[:, j], (rows, codes.astype(np.int64) - 1), 1)
+        for team in teams:
+            for player in team:
+                self._team_player[self.player_index[player]] = True
+        position = len(self._order)
+        while position and self._dates[self._order[position - 1]] > date:
+            position -= 1
+        self._order.insert(position, j)
+        return j
+
+    def remove_round(self, name):
+        """ Removes a round, shifting the later rounds down by one
+        :param name: round name
+        """
+        j = self.round_index[name]
+        n_rounds = len(self.rounds)
+        for buf in (self._scores, self._types, self._mask, self._present, self._counts, self._totals,
+                    self._tallies):
+            buf[:, j:n_rounds - 1] = buf[:, j + 1:n_rounds]
+            buf[:, n_rounds - 1] = 0
+        self._dates[j:n_rounds - 1] = self._dates[j + 1:n_rounds]
+        del self.rounds[j]
+        del self.teams[j]
+        self.round_index = dict((round_name, k) for k, round_name in enumerate(self.rounds))
+        self._order = [k - 1 if k > j else k for k in self._order if k != j]
+        team_players = set(player for round_teams in self.teams for team in round_teams for player in team)
+        self._team_player[:len(self.players)] = [player in team_players for player in self.players]
+
+    def chronological(self):
+        """
+        :return: int array of round indices sorted by date, rounds of the same date in the order they were added
+        """
+        return np.array(self._order, dtype=np.int64)
+
+    def type_codes(self, names):
+        """
+        :param names: score type names
+        :return: list of codes of the names that occur in the cube
+        """
+        return [self.type_names.index(name) + 1 for name in names if name in self.type_names]
+
+    def hole_counts(self):
+        """
+        :return: int array players x rounds of holes with a recorded score
+        """
+        return self._counts[:len(self.players), :len(self.rounds)]
+
+    def complete(self):
+        """
+        :return: bool array players x rounds, True where all 18 holes have a score
+        """
+        return self.hole_counts() == HOLES
+
+    def totals(self):
+        """
+        :return: int array players x rounds of summed hole scores
+        """
+        return self._totals[:len(self.players), :len(self.rounds)]
+
+    def type_counts(self, names):
+        """
+        :param names: score type names
+        :return: int array players x rounds counting holes with one of the types
+        """
+        codes = [c - 1 for c in self.type_codes(names)]
+        return self._tallies[:len(self.players), :len(self.rounds), codes].sum(axis=2)
+
+    def date(self, j):
+        return datetime.date.fromordinal(int(self.dates[j]))
+
+    def hole_data(self, i, j):
+        """
+        :return: dict of hole -> {"score", "type"} of player i in round j
+        """
+        return dict((HOLE_NAMES[k], {"score": int(self.scores[i, j, k]),
+                                     "type": self.type_names[self.types[i, j, k] - 1]})
+                    for k in np.flatnonzero(self.mask[i, j]))
+
+    def to_results(self):
+        """
+        :return: dict of round name -> round results with teams, scores and date
+        """
+        results = {}
+        for j, name in enumerate(self.rounds):
+            results[name] = {
+                "teams": self.teams[j],
+                "scores": dict((self.players[i], {"scores": self.hole_data(i, j)})
+                               for i in np.flatnonzero(self.present[:, j])),
+                "date": self.date(j)
+            }
+        return results
+
+    def holes_of_type(self, i, j, name):
+        """
+        :return: list of holes where player i scored a name type in round j
+        """
+        codes = self.type_codes([name])
+        if not codes:
+            return []
+        return [HOLE_NAMES[k] for k in np.flatnonzero(self.types[i, j] == codes[0])]
+
+
+def right_align(values, valid):
+    """ Packs the valid entries of each row to the right of a padded matrix, keeping their order
+    :param values: array rows x columns
+    :param valid: bool array rows x columns
+    :return: (matrix, valid) with the valid entries of each row right aligned
+    """
+    counts = valid.sum(axis=1)
+    width = int(counts.max()) if counts.size else 0
+    matrix = np.zeros((values.shape[0], width), dtype=values.dtype)
+    aligned = np.zeros((values.shape[0], width), dtype=bool)
+    rows, cols = np.nonzero(valid)
+    positions = np.cumsum(valid, axis=1)[rows, cols] - 1 + (width - counts)[rows]
+    matrix[rows, positions] = values[rows, cols]
+    aligned[rows, positions] = True
+    return matrix, aligned
+
+
+def recency_weights(keep, weighted_rounds):
+    """ Weights for averaging the kept entries of each row, the last weighted_rounds entries of a row are
+    weighted 1.5, 2.25, ... and all earlier entries 1. Rows with no more than weighted_rounds entries get
+    equal weights.
+    :param keep: bool array rows x columns of entries to average, in chronological order
+    :param weighted_rounds: number of recent entries to weigh up
+    :return: float array of weights, 0 where keep is False
+    """
+    counts = keep.sum(axis=1)
+    from_end = np.cumsum(keep[:, ::-1], axis=1)[:, ::-1]
+    weights = np.where(from_end <= weighted_rounds, np.power(1.5, weighted_rounds - from_end + 1.0), 1.0)
+    weights[counts <= weighted_rounds] = 1.0
+    return np.where(keep, weights, 0.0)
+
+
+def weighted_averages(values, weights):
+    """
+    :return: row averages of values weighted by weights, nan for rows without weight
+    """
+    total = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (values * weights).sum(axis=1) / total
+
+
+class PlayerIndex(object):
+    """
+    Per-player view of a ScoreCube shared by the Stats rankings.
+
+    Holds the team players, their complete rounds in chronological order and per-round totals. Type counts
+    are computed once per set of score types. Build a new index when the cube changes.
+    """
+
+    def __init__(self, cube):
+        """
+        :param cube: ScoreCube
+        """
+        self.cube = cube
+        self.rows = np.flatnonzero(cube.team_player)
+        self.players = [cube.players[i] for i in self.rows]
+        self.positions = dict((name, i) for i, name in enumerate(self.players))
+        self.order = cube.chronological()
+        self.complete = cube.complete()[self.rows]
+        self.totals = cube.totals()[self.rows]
+        self._type_counts = {}
+
+    def rounds(self, player):
+        """
+        :param player: player name
+        :return: indices of the player's complete rounds in chronological order
+        """
+        i = self.positions[player]
+        return self.order[self.complete[i, self.order]]
+
+    def type_counts(self, types):
+        """
+        :param types: score type names
+        :return: int array team players x rounds counting holes with one of the types
+        """
+        key = tuple(sorted(types))
+        if key not in self._type_counts:
+            self._type_counts[key] = self.cube.type_counts(key)[self.rows]
+        return self._type_counts[key]
@@ -0,0 +1,103 @@
+import logging
+import re
+import urllib3
+from bs4 import BeautifulSoup
+from golfgenius.scorecard import DEFAULT_FEATURES, parse_scorecard
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+BASE_URL = 'https://www.golfgenius.com/'
+SCORECARD_PATH = "tournaments2/details?adjusting=false&event_id=%s"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:84.0) Gecko/20100101 Firefox/84.0"
+
+
+class FetchError(Exception):
+    pass
+
+
+class HTTPFetcher(object):
+    """
+    Selenium-free fetch backend for scorecard pages.
+
+    Pages are requested over a pooled keep-alive connection and parsed straight from the response body.
+    """
+
+    def __init__(self, base_url=BASE_URL, maxsize=4, timeout=30, retries=3, features=DEFAULT_FEATURES,
+                 headers=None):
+        """
+        :param base_url: Site root, override to point the fetcher at a local stand-in server
+        :param maxsize: Number of keep-alive connections to keep per host
+        :param timeout: Connect/read timeout in seconds
+        :param retries: Number of retries for connection errors and 5xx responses
+        :param features: BeautifulSoup tree builder
+        :param headers: Extra request headers
+        """
+        if not base_url.endswith('/'):
+            base_url += '/'
+        self.base_url = base_url
+        self.features = features
+        self.headers = {"User-Agent": USER_AGENT}
+        if headers:
+            self.headers.update(headers)
+        self.pages_fetched = 0
+        self.bytes_fetched = 0
+        self.retries = 0
+        self.pool = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=maxsize,
+            block=False,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)))
+
+    def scorecard_url(self, event_id):
+        return self.base_url + SCORECARD_PATH % event_id
+
+    def load_cookies(self, driver):
+        """ Reuses the cookies of a signed in webdriver session for subsequent requests
+        :param driver: selenium webdriver
+        """
+        cookies = "; ".join("%s=%s" % (c["name"], c["value"]) for c in driver.get_cookies())
+        if cookies:
+            self.headers["Cookie"] = cookies
+
+    def get(self, url):
+        """
+        :param url: absolute url or path relative to base_url
+        :return: response body as text
+        """
+        if not re.match(r'https?://', url):
+            url = self.base_url + url.lstrip('/')
+        logger.debug("Fetching %s" % url)
+        response = self.pool.request("GET", url, headers=self.headers)
+        if response.retries is not None:
+            self.retries += len(response.retries.history)
+        if response.status != 200:
+            raise FetchError("GET %s returned HTTP %d" % (url, response.status))
+        self.pages_fetched += 1
+        self.bytes_fetched += len(response.data)
+        charset = "utf-8"
+        m = re.search(r'charset=([\w-]+)', response.headers.get("Content-Type", ""))
+        if m:
+            charset = m.group(1)
+        return response.data.decode(charset, errors="replace")
+
+    def soup(self, url):
+        return BeautifulSoup(self.get(url), self.features)
+
+    def scorecard(self, event_id):
+        """
+        :param event_id: data-tournament-event-id of the bet
+        :return: table.scorecard element or None if the page has no scorecard
+        """
+        return parse_scorecard(self.get(self.scorecard_url(event_id)), self.features)
+
+    def stats(self):
+        return {
+            "pages_fetched": self.pages_fetched,
+            "bytes_fetched": self.bytes_fetched,
+            "retries": self.retries
+        }
+
+    def close(self):
+        self.pool.clear()
@@ -0,0 +1,146 @@
+import numpy as np
+from golfgenius.cube import HOLES, HOLE_NAMES
+
+
+class HoleIndex(object):
+    """
+    Hole-level view of a ScoreCube.
+
+    Per-round field averages and per-player strokes gained are computed once, with every recorded hole of
+    every player counted. Round files carry no course, so course-level results take a caller-supplied
+    mapping of round name to course (or any other group label).
+    """
+
+    def __init__(self, cube):
+        """
+        :param cube: ScoreCube
+        """
+        self.cube = cube
+        mask = cube.mask
+        self.field_counts = mask.sum(axis=0)
+        self.field_sums = np.where(mask, cube.scores, 0).sum(axis=0, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.field = self.field_sums / self.field_counts
+        # Strokes gained against the round's field on each recorded hole
+        gained = np.where(mask, self.field[None, :, :] - cube.scores, 0.0)
+        self.player_counts = mask.sum(axis=1)
+        self.gained_sums = gained.sum(axis=1)
+        self.score_sums = np.where(mask, cube.scores, 0).sum(axis=1, dtype=np.int64)
+
+    def _group_codes(self, groups):
+        """
+        :param groups: dict of round name -> group label
+        :return: (labels, code of each round, -1 for rounds without a group)
+        """
+        labels = sorted(set(groups[name] for name in self.cube.rounds if name in groups))
+        label_codes = dict((label, c) for c, label in enumerate(labels))
+        codes = np.array([label_codes.get(groups.get(name), -1) for name in self.cube.rounds], dtype=np.int64)
+        return labels, codes
+
+    def _group_sum(self, values, groups):
+        """
+        :param values: array rounds x ...
+        :return: (labels, array groups x ... of the values summed per group)
+        """
+        labels, codes = self._group_codes(groups)
+        sums = np.zeros((len(labels),) + values.shape[1:], dtype=values.dtype)
+        grouped = codes >= 0
+        np.add.at(sums, codes[grouped], values[grouped])
+        return labels, sums
+
+    def field_averages(self, groups=None):
+        """
+        :param groups: dict of round name -> course (or other group label), None for per-round averages
+        :return: float array rounds x 18 of the field's average score per hole, or a dict of group label ->
+            float array of 18 when groups are given
+        """
+        if groups is None:
+            return self.field
+        labels, sums = self._group_sum(self.field_sums, groups)
+        labels, counts = self._group_sum(self.field_counts, groups)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = sums / counts
+        return dict(zip(labels, averages))
+
+    def type_distribution(self, groups=None):
+        """
+        :param groups: dict of round name -> course (or other group label), None for per-round counts
+        :return: dict of score type -> int array rounds x 18 counting the holes scored as that type, or
+            dict of group label -> dict of score type -> int array of 18 when groups are given
+        """
+        types = self.cube.types
+        counts = np.stack([(types == code).sum(axis=0) for code in range(1, len(self.cube.type_names) + 1)],
+                          axis=-1) if self.cube.type_names else np.zeros(types.shape[1:] + (0,), dtype=np.int64)
+        if groups is None:
+            return dict((name, counts[:, :, c]) for c, name in enumerate(self.cube.type_names))
+        labels, sums = self._group_sum(counts, groups)
+        return dict((label, dict((name, sums[g, :, c]) for c, name in enumerate(self.cube.type_names)))
+                    for g, label in enumerate(labels))
+
+    def hole_difficulty(self, groups=None):
+        """
+        :param groups: dict of round name -> course, None to rank the holes over all rounds
+        :return: list of (hole, field average) hardest first, or dict of group label -> such a list
+        """
+        if groups is None:
+            counts = self.field_counts.sum(axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                averages = self.field_sums.sum(axis=0) / counts
+            return self._ranked_holes(averages, counts > 0, reverse=True)
+        labels, counts = self._group_sum(self.field_counts, groups)
+        return dict((label, self._ranked_holes(average, counts[g] > 0, reverse=True))
+                    for g, (label, average) in enumerate(self.field_averages(groups).items()))
+
+    @staticmethod
+    def _ranked_holes(values, valid, reverse=False):
+        order = np.argsort(-values if reverse else values, kind="stable")
+        return [(HOLE_NAMES[k], float(values[k])) for k in order if valid[k]]
+
+    def hole_averages(self):
+        """
+        :return: float array players x 18 of each player's average score per hole, nan where never played
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.score_sums / self.player_counts
+
+    def strokes_gained(self):
+        """
+        :return: float array players x 18 of each player's average strokes gained per hole against the field
+            of the rounds played, nan where never played
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.gained_sums / self.player_counts
+
+    def profile(self, player):
+        """
+        :param player: player name
+        :return: dict of hole -> {"rounds", "average", "strokes_gained"} of the holes the player has played
+        """
+        i = self.cube.player_index[player]
+        averages = self.hole_averages()[i]
+        gained = self.strokes_gained()[i]
+        return dict((HOLE_NAMES[k], {"rounds": int(self.player_counts[i, k]),
+                                     "average": float(averages[k]),
+                                     "strokes_gained": float(gained[k])})
+                    for k in range(HOLES) if self.player_counts[i, k])
+
+    def best_holes(self, player, n=3, min_rounds=1):
+        """
+        :param player: player name
+        :param n: number of holes
+        :param min_rounds: only rank holes played at least this often
+        :return: list of (hole, strokes gained) of the player's n best holes
+        """
+        i = self.cube.player_index[player]
+        return self._ranked_holes(self.strokes_gained()[i], self.player_counts[i] >= max(min_rounds, 1),
+                                  reverse=True)[:n]
+
+    def worst_holes(self, player, n=3, min_rounds=1):
+        """
+        :param player: player name
+        :param n: number of holes
+        :param min_rounds: only rank holes played at least this often
+        :return: list of (hole, strokes gained) of the player's n worst holes
+        """
+        i = self.cube.player_index[player]
+        return self._ranked_holes(self.strokes_gained()[i], self.player_counts[i] >= max(min_rounds, 1))[:n]
@@ -0,0 +1,95 @@
+import logging
+import os
+from golfgenius.capture import atomic_write
+from golfgenius.scorecard import Scorecard
+from golfgenius.streams import RoundStreamWriter, encode_round, iter_stream
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+JOURNAL_NAME = ".golfgenius-journal"
+
+
+class ScrapeJournal(object):
+    """
+    Append-only checkpoint journal of the bet scorecards parsed during a scrape.
+
+    Every scorecard is appended as one json line as soon as it is parsed: the round name, the bet's event id,
+    spec id and name, and the scorecard's teams and player hole rows. A restarted parser replays the journal
+    and merges the journaled scorecards into their rounds instead of loading the pages again. Once a round is
+    written its scorecards are discarded, the written round supersedes them. Lines are appended like a json
+    lines round stream, so a line torn by a crash is ignored and truncated on the next write. The journal file
+    should not end in .jsonl, or the results directory would read it as a round stream.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: journal file, replayed if it exists
+        """
+        self.path = os.path.abspath(path)
+        self.rounds = {}
+        self._writer = None
+        if os.path.isfile(self.path):
+            for offset, raw, entry in iter_stream(self.path, "jsonl"):
+                self.rounds.setdefault(entry["round"], {})[entry["event_id"]] = entry
+            logger.info("Replayed %d scorecards of %d rounds from %s" % (len(self), len(self.rounds), self.path))
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.rounds.values())
+
+    def scorecards(self, round_name):
+        """
+        :param round_name: name of the round
+        :return: dict of event id -> Scorecard of the journaled bets of the round
+        """
+        return dict((event_id, Scorecard(entry["teams"], entry["players"]))
+                    for event_id, entry in self.rounds.get(round_name, {}).items())
+
+    def record(self, round_name, bet_name, bet_info, scorecard):
+        """ Appends a parsed scorecard
+        :param round_name: name of the round
+        :param bet_name: name of the bet
+        :param bet_info: dict with the event_id and spec_id of the bet
+        :param scorecard: Scorecard of the bet
+        """
+        entry = {
+            "round": round_name,
+            "event_id": bet_info["event_id"],
+            "spec_id": bet_info["spec_id"],
+            "text": bet_name,
+            "teams": scorecard.teams,
+            "players": scorecard.players
+        }
+        if self._writer is None:
+            self._writer = RoundStreamWriter(self.path, fmt="jsonl")
+        self._writer.write(entry)
+        self.rounds.setdefault(round_name, {})[entry["event_id"]] = entry
+
+    def discard(self, round_name):
+        """ Drops the scorecards of a round by rewriting the journal without them
+        :param round_name: name of the round
+        :return: number of scorecards dropped
+        """
+        entries = self.rounds.pop(round_name, None)
+        if not entries:
+            return 0
+        self.close()
+        if self.rounds:
+            atomic_write(self.path, b"".join(encode_round(entry, "jsonl") for round_entries in self.rounds.values()
+                                             for entry in round_entries.values()))
+        elif os.path.isfile(self.path):
+            os.remove(self.path)
+        logger.debug("Discarded %d journaled scorecards of %s" % (len(entries), round_name))
+        return len(entries)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def clear(self):
+        """ Removes the journal, e.g. once every round has been written """
+        self.close()
+        self.rounds = {}
+        if os.path.isfile(self.path):
+            os.remove(self.path)
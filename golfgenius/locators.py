@@ -0,0 +1,106 @@
+from selenium.webdriver.common.by import By
+
+STABLE_ATTRIBUTES = ("id", "data-tournament-event-id")
+
+
+def xpath_literal(value):
+    """
+    :param value: attribute value
+    :return: value quoted as an XPath string literal
+    """
+    if "'" not in value:
+        return "'%s'" % value
+    if '"' not in value:
+        return '"%s"' % value
+    return "concat(%s)" % ", \"'\", ".join("'%s'" % part for part in value.split("'"))
+
+
+def element_xpath(element):
+    """
+    Absolute XPath of a single soup element, without an index
+    :param element: bs4 text or node
+    :return: xpath as string
+    """
+    components = []
+    child = element if element.name else element.parent
+    while child.parent is not None:
+        xpath_index = 1 + sum(1 for sibling in child.previous_siblings if sibling.name == child.name)
+        components.append(child.name if xpath_index == 1 else '%s[%d]' % (child.name, xpath_index))
+        child = child.parent
+    components.reverse()
+    return '/%s' % '/'.join(components)
+
+
+class LocatorIndex(object):
+    """
+    Locators for the elements of one soup.
+
+    The index is built in a single pass over the tree and records the absolute XPath of every tag together
+    with how often each stable attribute value occurs, so a locator is a dict lookup. Elements with a unique
+    id, data-tournament-event-id or option value are located by that attribute, everything else by XPath.
+    """
+
+    def __init__(self, soup):
+        self.soup = soup
+        self._xpaths = {}
+        self._counts = {}
+        self._build()
+
+    def _build(self):
+        stack = [(self.soup, "")]
+        while stack:
+            node, path = stack.pop()
+            siblings = {}
+            for child in node.contents:
+                if child.name is None:
+                    continue
+                n = siblings.get(child.name, 0) + 1
+                siblings[child.name] = n
+                child_path = "%s/%s" % (path, child.name if n == 1 else "%s[%d]" % (child.name, n))
+                self._xpaths[id(child)] = child_path
+                for attr in STABLE_ATTRIBUTES:
+                    value = child.attrs.get(attr)
+                    if value is not None:
+                        self._count((attr, value))
+                if child.name == "option" and "value" in child.attrs:
+                    self._count((id(node), child.attrs["value"]))
+                if child.contents:
+                    stack.append((child, child_path))
+
+    def _count(self, key):
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _unique(self, key):
+        return self._counts.get(key) == 1
+
+    def xpath(self, element):
+        """
+        :param element: bs4 text or node
+        :return: absolute xpath as string
+        """
+        tag = element if element.name else element.parent
+        xpath = self._xpaths.get(id(tag))
+        if xpath is None:
+            # Element does not belong to the indexed soup
+            xpath = element_xpath(tag)
+        return xpath
+
+    def locate(self, element):
+        """
+        :param element: bs4 text or node
+        :return: (By, value) locator tuple for webdriver find_element and expected conditions
+        """
+        tag = element if element.name else element.parent
+        if id(tag) in self._xpaths:
+            element_id = tag.attrs.get("id")
+            if element_id is not None and self._unique(("id", element_id)):
+                return By.ID, element_id
+            event_id = tag.attrs.get("data-tournament-event-id")
+            if event_id is not None and self._unique(("data-tournament-event-id", event_id)):
+                return By.XPATH, "//%s[@data-tournament-event-id=%s]" % (tag.name, xpath_literal(event_id))
+            if tag.name == "option" and "value" in tag.attrs and self._unique((id(tag.parent), tag.attrs["value"])):
+                select_id = tag.parent.attrs.get("id")
+                if select_id is not None and self._unique(("id", select_id)):
+                    return By.XPATH, "//%s[@id=%s]/option[@value=%s]" % (
+                        tag.parent.name, xpath_literal(select_id), xpath_literal(tag.attrs["value"]))
+        return By.XPATH, self.xpath(tag)
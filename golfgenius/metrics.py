@@ -0,0 +1,169 @@
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+from golfgenius.capture import atomic_write
+from golfgenius.timing import StepTimer
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class _NullPhase(object):
+    """ Context manager used for every phase when metrics are disabled """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = _NullPhase()
+
+
+class RunMetrics(object):
+    """
+    Phase timers, counters and tracing hooks of a parser run.
+
+    Phases are timed with a StepTimer and counters are plain integers under a lock, both safe to share
+    with worker threads. Tracing hooks are called as hook(event, phase, elapsed) with event "start" (elapsed
+    None) or "end". When disabled, phase() returns a shared no-op context manager and count() returns at once.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = StepTimer()
+        self.counters = {}
+        self.hooks = []
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        :param hook: callable(event, phase, elapsed), e.g. to forward phases to a tracer
+        """
+        self.hooks.append(hook)
+
+    def phase(self, name):
+        """
+        :param name: phase name
+        :return: context manager timing the phase
+        """
+        if not self.enabled:
+            return NULL_PHASE
+        return self._phase(name)
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        self._call_hooks("start", name, None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases.add(name, elapsed)
+            self._call_hooks("end", name, elapsed)
+
+    def _call_hooks(self, event, name, elapsed):
+        for hook in self.hooks:
+            try:
+                hook(event, name, elapsed)
+            except Exception:
+                logger.error("Metrics hook failed", exc_info=True)
+
+    def count(self, name, n=1):
+        """
+        :param name: counter name
+        :param n: amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self, **sections):
+        """
+        :param sections: further dicts to include, e.g. waits or cache statistics
+        :return: json-serializable dict of the run
+        """
+        with self._lock:
+            counters = dict(self.counters)
+        summary = {
+            "started": self.started,
+            "elapsed_seconds": time.perf_counter() - self._start,
+            "phases": dict(self.phases.report()),
+            "counters": counters
+        }
+        summary.update(sections)
+        return summary
+
+
+def timed_phase(name):
+    """ Decorator timing a whole method as a phase of its object's metrics
+    :param name: phase name
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_json(summary, path):
+    """ Writes a run summary as json
+    :param summary: dict from RunMetrics.summary
+    :param path: file to write
+    """
+    atomic_write(path, json.dumps(summary, indent=4, default=str).encode("utf-8"))
+
+
+def prometheus_text(summary, prefix="golfgenius"):
+    """
+    :param summary: dict from RunMetrics.summary
+    :param prefix: metric name prefix
+    :return: run summary in the Prometheus text exposition format
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        name = "%s_%s" % (prefix, name)
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for labels, value in samples:
+            label_text = ",".join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                                  for k, v in labels)
+            lines.append("%s%s %s" % (name, "{%s}" % label_text if label_text else "", repr(float(value))))
+
+    metric("run_start_timestamp_seconds", "gauge", "Start of the run", [((), summary["started"])])
+    metric("run_duration_seconds", "gauge", "Wall clock duration of the run", [((), summary["elapsed_seconds"])])
+    phases = sorted(summary["phases"].items())
+    metric("phase_seconds_total", "counter", "Wall clock seconds spent in a phase",
+           [((("phase", name),), step["total"]) for name, step in phases])
+    metric("phase_calls_total", "counter", "Number of times a phase ran",
+           [((("phase", name),), step["count"]) for name, step in phases])
+    metric("phase_max_seconds", "gauge", "Longest single run of a phase",
+           [((("phase", name),), step["max"]) for name, step in phases])
+    waits = sorted(summary.get("waits", {}).items())
+    if waits:
+        metric("wait_seconds_total", "counter", "Seconds spent waiting for page conditions",
+               [((("step", name),), step["total"]) for name, step in waits])
+        metric("wait_calls_total", "counter", "Number of waits for page conditions",
+               [((("step", name),), step["count"]) for name, step in waits])
+    for name, value in sorted(summary["counters"].items()):
+        metric("%s_total" % name, "counter", name.replace("_", " ").capitalize(), [((), value)])
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(summary, path, prefix="golfgenius"):
+    """ Writes a run summary as a Prometheus textfile, atomically so the textfile collector never reads a
+    partial file
+    :param summary: dict from RunMetrics.summary
+    :param path: .prom file to write
+    """
+    atomic_write(path, prometheus_text(summary, prefix).encode("utf-8"))
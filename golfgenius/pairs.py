@@ -0,0 +1,132 @@
+import numpy as np
+from golfgenius.cube import HOLES
+
+
+class PairIndex(object):
+    """
+    Partner and head-to-head matrices of the team players of a ScoreCube.
+
+    Pair counts and stroke differentials are matrix products of the players x rounds complete-round mask,
+    round totals and a one-hot players x teams membership matrix, so the work grows with the number of pairs
+    only through BLAS calls. Matrices are indexed like players.
+    """
+
+    def __init__(self, index):
+        """
+        :param index: PlayerIndex
+        """
+        self.index = index
+        self.cube = index.cube
+        self.players = index.players
+        self.positions = index.positions
+        self.complete = index.complete.astype(np.float64)
+        self.totals = np.where(index.complete, index.totals, 0).astype(np.float64)
+        # One column per team of every round
+        self.teams = []
+        self.team_rounds = []
+        self.team_members = []
+        for j, round_teams in enumerate(self.cube.teams):
+            for team in round_teams:
+                self.teams.append((self.cube.rounds[j], team))
+                self.team_rounds.append(j)
+                self.team_members.append([self.positions[player] for player in team])
+        self.team_rounds = np.array(self.team_rounds, dtype=np.int64)
+        self.membership = np.zeros((len(self.players), len(self.team_members)), dtype=np.float64)
+        for k, members in enumerate(self.team_members):
+            self.membership[members, k] = 1.0
+
+    def partners(self):
+        """
+        :return: int matrix players x players of the rounds each pair played on the same team
+        """
+        together = np.rint(self.membership @ self.membership.T).astype(np.int64)
+        np.fill_diagonal(together, 0)
+        return together
+
+    def shared_rounds(self):
+        """
+        :return: int matrix players x players of the rounds both players completed
+        """
+        shared = np.rint(self.complete @ self.complete.T).astype(np.int64)
+        np.fill_diagonal(shared, 0)
+        return shared
+
+    def head_to_head(self):
+        """
+        :return: float matrix players x players of the row player's average strokes minus the column player's
+            over the rounds both completed, nan for pairs without a shared round
+        """
+        differential = self.totals @ self.complete.T - self.complete @ self.totals.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = differential / (self.complete @ self.complete.T)
+        np.fill_diagonal(averages, np.nan)
+        return averages
+
+    def wins(self):
+        """
+        :return: int matrix players x players of the shared rounds the row player scored lower in
+        """
+        complete = self.complete.astype(bool)
+        totals = self.index.totals
+        wins = np.zeros((len(self.players), len(self.players)), dtype=np.int64)
+        for j in range(complete.shape[1]):
+            played = np.flatnonzero(complete[:, j])
+            scores = totals[played, j]
+            wins[np.ix_(played, played)] += scores[:, None] < scores[None, :]
+        return wins
+
+    def team_best_ball(self):
+        """ Best-ball score of every team on every hole, the lowest recorded member score
+        :return: (teams, scores, mask) where teams lists (round name, team) per team, scores is an int array
+            teams x 18 and mask marks the holes where a member recorded a score
+        """
+        members = [(i, k) for k, team in enumerate(self.team_members) for i in team]
+        scores = np.zeros((len(self.team_members), HOLES), dtype=np.int64)
+        mask = np.zeros((len(self.team_members), HOLES), dtype=bool)
+        if not members:
+            return self.teams, scores, mask
+        rows = self.index.rows[[i for i, k in members]]
+        team_of = np.array([k for i, k in members], dtype=np.int64)
+        rounds = self.team_rounds[team_of]
+        played = self.cube.mask[rows, rounds]
+        member_scores = np.where(played, self.cube.scores[rows, rounds], np.iinfo(np.int8).max).astype(np.int64)
+        best = np.full((len(self.team_members), HOLES), np.iinfo(np.int8).max, dtype=np.int64)
+        np.minimum.at(best, team_of, member_scores)
+        np.logical_or.at(mask, team_of, played)
+        scores[mask] = best[mask]
+        return self.teams, scores, mask
+
+    def best_ball_pairs(self):
+        """
+        :return: float matrix players x players of the pair's average best-ball total over the rounds both
+            completed, as if they had played as a team, nan for pairs without a shared round
+        """
+        complete = self.complete.astype(bool)
+        n = len(self.players)
+        sums = np.zeros((n, n), dtype=np.int64)
+        for j in range(complete.shape[1]):
+            played = np.flatnonzero(complete[:, j])
+            scores = self.cube.scores[self.index.rows[played], j].astype(np.int64)
+            sums[np.ix_(played, played)] += np.minimum(scores[:, None, :], scores[None, :, :]).sum(axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = sums / (self.complete @ self.complete.T)
+        np.fill_diagonal(averages, np.nan)
+        return averages
+
+    def record(self, player, opponent):
+        """
+        :param player: player name
+        :param opponent: player name
+        :return: dict with the shared rounds, wins, losses and average stroke differential of player against
+            opponent
+        """
+        a, b = self.positions[player], self.positions[opponent]
+        complete = self.complete.astype(bool)
+        shared = complete[a] & complete[b]
+        totals = self.index.totals
+        return {
+            "rounds": int(shared.sum()),
+            "wins": int((totals[a, shared] < totals[b, shared]).sum()),
+            "losses": int((totals[a, shared] > totals[b, shared]).sum()),
+            "differential": float((totals[a, shared] - totals[b, shared]).mean()) if shared.any() else float("nan")
+        }
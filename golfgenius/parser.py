@@ -1,71 +1,145 @@
-from selenium import webdriver
-from bs4 import BeautifulSoup
+import importlib
 import os
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-import itertools
-import time
 import re
 import logging
 import json
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
+from concurrent.futures import ThreadPoolExecutor
+from golfgenius.pool import DriverPool
+from golfgenius.coverage import RoundCoverage
+from golfgenius.timing import StepTimer, DEFAULT_TIMEOUTS
+from golfgenius.capture import CaptureIndex, atomic_write
+from golfgenius.streams import RoundStreamWriter, STREAM_NAMES
+from golfgenius.screenshots import ScreenshotPolicy, ScreenshotWriter
+from golfgenius.metrics import RunMetrics, timed_phase, write_json, write_prometheus
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 logger.addHandler(logging.NullHandler())
 
+class _LazyModule(object):
+    """ Stands in for a module that is imported on its first attribute access """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, name)
+
+
+# Imported when the first GGParser is created, so importing the package or the parser stays cheap
+scraping = _LazyModule("golfgenius.scraping")
+
 
 class GGParser(object):
     def __init__(self, width=1920, height=1080, headless=False, driver_path=None,
-                 screenshots_enabled=True, screenshot_directory='.screenshots', existing_results=None):
+                 screenshots_enabled=True, screenshot_directory='.screenshots', existing_results=None,
+                 soup_features=None, fetch_backend="selenium", http_base_url=None, workers=1,
+                 strict=False, timeouts=None, screenshot_policy=None, screenshot_scale=None,
+                 screenshot_max_bytes=None, metrics=True, journal=None, retries=2):
+        """
+        :param soup_features: BeautifulSoup tree builder, defaults to scorecard.DEFAULT_FEATURES ("html.parser")
+        :param fetch_backend: "selenium" loads scorecards in Firefox, "http" fetches them over plain HTTP and
+            only uses Firefox for round discovery
+        :param http_base_url: Site root used by the http backend, defaults to the golf genius site
+        :param workers: Number of scorecard pages to load concurrently. With the selenium backend each worker
+            runs its own Firefox session.
+        :param strict: Load every bet scorecard of a round. By default the remaining bets of a round are skipped
+            once every team player has a score for all 18 holes.
+        :param timeouts: dict overriding the seconds to wait for each step, see timing.DEFAULT_TIMEOUTS
+        :param screenshot_policy: ScreenshotPolicy sampling which screenshots are captured, defaults to all
+        :param screenshot_scale: factor to downscale screenshots by before saving (requires Pillow)
+        :param screenshot_max_bytes: drop screenshots larger than this many bytes
+        :param metrics: time the parser phases and count pages, scorecards and bytes written, see run_summary()
+        :param journal: checkpoint file every parsed scorecard is appended to. Scorecards already in it are
+            replayed instead of loaded, so a scrape interrupted by a crash resumes where it stopped. A round's
+            scorecards are dropped from it once to_json or iter_to_json writes the round.
+        :param retries: times a page load that timed out, failed over http or whose browser crashed is retried,
+            a crashed Firefox session is restarted first
+        """
+        assert fetch_backend in ("selenium", "http"), "fetch_backend must be 'selenium' or 'http'"
         if driver_path is None:
             driver_path = os.path.join(os.path.dirname(__file__), "drivers", "firefox", "0.28", "geckodriver")
         self.screenshots_enabled = screenshots_enabled
+        self.metrics = RunMetrics(enabled=metrics)
         self.screenshot_directory = os.path.abspath(screenshot_directory)
         self.screenshot_count = 0
+        self.screenshot_policy = screenshot_policy or ScreenshotPolicy()
+        self.screenshot_writer = None
         if screenshots_enabled:
             if not os.path.isdir(self.screenshot_directory):
                 os.makedirs(self.screenshot_directory)
+            self.screenshot_writer = ScreenshotWriter(
+                self.screenshot_directory, scale=screenshot_scale, max_bytes=screenshot_max_bytes)
+        self.capture_index = None
         self._captured_rounds = set()
         if existing_results is not None:
             logger.info("Loading previously collected rounds from %s" % existing_results)
-            for root, dirs, files in os.walk(existing_results):
-                for f in files:
-                    fpath = os.path.join(root, f)
-                    if fpath.endswith(".json"):
-                        with open(fpath) as fp:
-                            data = json.load(fp)
-                        self._captured_rounds.add(data.get("name"))
+            self.capture_index = CaptureIndex(existing_results).load()
+            self._captured_rounds = self.capture_index.complete_rounds()
             logger.info("Loaded %d previously collected rounds" % len(self._captured_rounds))
 
-        options = FirefoxOptions()
-        if headless:
-            options.add_argument("--headless")
-        self.driver = webdriver.Firefox(
-            service_log_path=os.path.devnull,
-            options=options,
-            executable_path=os.path.abspath(driver_path))
-        self.driver.set_window_size(width, height)
-        self.base_url = 'https://www.golfgenius.com/'
+        self.soup_cache = scraping.SoupCache(features=soup_features or scraping.DEFAULT_FEATURES)
+        self.width = width
+        self.height = height
+        self.headless = headless
+        self.driver_path = os.path.abspath(driver_path)
+        self.workers = workers
+        self.strict = strict
+        self.retries = retries
+        self.scorecards_skipped = 0
+        self.journal = None
+        if journal is not None:
+            self.journal = scraping.ScrapeJournal(journal)
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.timer = StepTimer()
+        self.driver = scraping.EventFiringWebDriver(self._create_driver(),
+                                                    scraping.SoupInvalidator(self.soup_cache, self.metrics))
+        self.base_url = scraping.BASE_URL
+        self.fetcher = None
+        if fetch_backend == "http":
+            self.fetcher = scraping.HTTPFetcher(base_url=http_base_url or self.base_url, maxsize=max(4, workers),
+                                                features=self.soup_cache.features)
         self.login_url = self.base_url + "golfgenius"
         self.landing_page = "https://www.golfgenius.com/leagues/7021866105153037134/widgets/tournament_results"
         self.tournament_regex = re.compile('\/v2tournaments\/(\d+)')
         logger.debug("opened FireFox driver")
 
-    def screenshot(self, name=None):
+    def _create_driver(self):
+        options = scraping.FirefoxOptions()
+        if self.headless:
+            options.add_argument("--headless")
+        driver = scraping.webdriver.Firefox(
+            service_log_path=os.path.devnull,
+            options=options,
+            executable_path=self.driver_path)
+        driver.set_window_size(self.width, self.height)
+        return driver
+
+    def screenshot(self, name=None, error=False):
+        """ Captures the current page, the png is written to screenshot_directory by a background thread
+        :param name: file name without extension, defaults to the screenshot number
+        :param error: the screenshot documents an error and is captured regardless of the sampling policy
+        """
         if self.screenshots_enabled:
             self.screenshot_count += 1
+            if not self.screenshot_policy.should_capture(self.screenshot_count, error=error):
+                logger.debug("Skipping screenshot #{} ({})".format(self.screenshot_count, name))
+                return
             logger.debug("Creating screenshot #{} ({})".format(self.screenshot_count, name))
             try:
-                pngdata = self.driver.get_screenshot_as_png()
+                with self.timer.step("screenshot"), self.metrics.phase("screenshot"):
+                    pngdata = self.driver.get_screenshot_as_png()
+                self.metrics.count("screenshots_captured")
                 if name is None:
-                    fname = os.path.join(self.screenshot_directory, 'screenshot-{}.png'.format(self.screenshot_count))
+                    fname = 'screenshot-{}.png'.format(self.screenshot_count)
                 else:
-                    fname = os.path.join(self.screenshot_directory, '{}.png'.format(name))
-                with open(fname, 'wb') as fp:
-                    fp.write(pngdata)
-                logger.debug("Created screenshot {}".format(fname))
+                    fname = '{}.png'.format(name)
+                self.screenshot_writer.put(fname, pngdata)
             except:
                 logger.error("Unable to save screenshot", exc_info=True)
         else:
@@ -73,29 +147,99 @@ class GGParser(object):
 
     def close(self):
         logger.debug("closing FireFox driver")
+        logger.info("Soup cache: %(parses)d parses, %(parses_saved)d parses saved" % self.soup_cache.stats())
+        if self.screenshot_writer is not None:
+            self.screenshot_writer.close()
+            logger.info("Screenshots: %(written)d written, %(dropped)d dropped, %(write_seconds).3fs writing"
+                        % self.screenshot_writer.stats())
+        logger.info("Step timings:\n%s" % self.timer.summary())
+        if self.metrics.enabled:
+            logger.info("Phase timings:\n%s" % self.metrics.phases.summary())
+        if self.fetcher is not None:
+            self.fetcher.close()
+        if self.journal is not None:
+            self.journal.close()
         return self.driver.close()
 
+    def _wait(self, step, condition, driver=None):
+        """ Waits until condition is met, at most timeouts[step] seconds
+        :param step: name of the step, used for the timeout and the timing report
+        :param condition: expected condition
+        :param driver: webdriver to wait on, defaults to the main driver
+        :return: the value returned by condition
+        """
+        with self.timer.step(step):
+            try:
+                return scraping.WebDriverWait(driver or self.driver, self.timeouts[step]).until(
+                    condition, message="Timed out waiting for %s" % step)
+            except scraping.TimeoutException:
+                self.metrics.count("wait_timeouts")
+                raise
+
+    def _restart_driver(self):
+        """ Replaces the main Firefox session after its browser crashed """
+        logger.warning("Restarting FireFox driver")
+        try:
+            self.driver.quit()
+        except Exception:
+            logger.debug("Unable to quit crashed FireFox driver", exc_info=True)
+        self.soup_cache.invalidate()
+        self.driver = scraping.EventFiringWebDriver(self._create_driver(),
+                                                    scraping.SoupInvalidator(self.soup_cache, self.metrics))
+        self.metrics.count("driver_restarts")
+
+    def _retry(self, action, load, restart):
+        """ Calls load, retrying at most self.retries times when the page times out, the browser crashes or the
+        http request fails
+        :param action: description of the page for the log
+        :param load: callable loading the page
+        :param restart: callable replacing the crashed driver, called before retrying a webdriver failure other
+            than a timeout
+        :return: the value returned by load
+        """
+        attempt = 0
+        while True:
+            try:
+                return load()
+            except scraping.PAGE_ERRORS as exc:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                self.metrics.count("retries")
+                logger.warning("Retrying %s (%d of %d): %s" % (action, attempt, self.retries, str(exc).strip()))
+                if isinstance(exc, scraping.WebDriverException) and not isinstance(exc, scraping.TimeoutException):
+                    restart()
+
+    def _switch_to_default_content(self):
+        self.driver.switch_to.default_content()
+        self.soup_cache.invalidate()
+
+    @timed_phase("sign_in")
     def sign_in(self, ggid):
         login_url = self.login_url
         logger.debug("Opening %s" % login_url)
         self.driver.get(login_url)
-        time.sleep(2)
         logger.debug("Signing in")
-        login_button = self._get_element(self.soup.find('a', text='SIGN IN'))
+        login_button = self._wait("sign_in", scraping.EC.element_to_be_clickable(
+            (scraping.By.XPATH, "//a[normalize-space(text())='SIGN IN']")))
         login_button.click()
-        time.sleep(1)
-        ggid_input = self._get_element(self.soup.find('input', {u"placeholder": u"Enter Your GGID", u"type": u"text"}))
+        ggid_input = self._wait("sign_in", scraping.EC.visibility_of_element_located(
+            (scraping.By.XPATH, "//input[@type='text' and @placeholder='Enter Your GGID']")))
         ggid_input.clear()
         ggid_input.send_keys(ggid)
-        sign_in_button = self._get_element(self.soup.find('input', type="submit", value="Sign In"))
+        sign_in_xpath = "//input[@type='submit' and @value='Sign In']"
+        sign_in_button = self._wait("sign_in", scraping.EC.element_to_be_clickable(
+            (scraping.By.XPATH, sign_in_xpath)))
         self.screenshot(name="sign_in")
         sign_in_button.click()
-        time.sleep(5)
-        sign_in_button2 = self._get_element(self.soup.find('input', type="submit", value="Sign In"))
+        self._wait("sign_in", scraping.EC.staleness_of(sign_in_button))
+        sign_in_button2 = self._wait("sign_in", scraping.EC.element_to_be_clickable(
+            (scraping.By.XPATH, sign_in_xpath)))
         self.screenshot(name="sign_in__select_name")
+        url = self.driver.current_url
         sign_in_button2.click()
-        logger.debug("Waiting 5 secs")
-        time.sleep(5)
+        logger.debug("Waiting for sign in to complete")
+        self._wait("sign_in", scraping.EC.url_changes(url))
         logger.debug("Sign In Complete")
 
     def _parse_tournaments(self):
@@ -110,12 +254,18 @@ class GGParser(object):
         self._populate_scores(tournament_ids, results)
         return results
 
+    @timed_phase("populate_scores")
     def _populate_scores(self, tournament_ids, results):
         logger.debug("Parsing all scores")
         results["scores"] = {}
         for tournament_id in tournament_ids:
             self.driver.get(self.base_url + "tournaments2/details?adjusting=false&event_id=%s" % tournament_id)
-            logger.debug("waiting 3 seconds")
+            try:
+                self._wait("scorecard", scraping.EC.visibility_of_element_located(
+                    (scraping.By.XPATH, "//table[@class='scorecard']")))
+            except scraping.TimeoutException:
+                logger.warning("No scorecard found for tournament %s" % tournament_id)
+                continue
             table = self.soup.find('table', {"class": "scorecard"})
             if table:
                 m = re.search("(\d+)\?round_index=(\d+)", tournament_id)
@@ -127,46 +277,26 @@ class GGParser(object):
                     round_index = tournament_id
                 self.screenshot("round-{}-{}".format(round_index, event_id))
 
-                for player_row in [tr for tr in table.find_all('tr', {"class": "net-line"}) if tr.attrs.get("data-net-name") is not None]:
-                    player_name = player_row.attrs["data-net-name"].strip()
-                    if player_name not in results["scores"]:
-                        logger.debug("Creating scores for %s" % player_name)
-                        results["scores"][player_name] = {}
-                    results["scores"][player_name]["scores"] = {}
-
-                    for score in player_row.find_all('td', {'class': 'score'}):
-                        hole, value_int, score_type = None, None, None
-                        hole_list = [a for a in score.attrs["class"] if a.startswith('hole')]
-                        if len(hole_list) == 1:
-                            hole = hole_list[0].replace("hole", "")
-                        value = score.find('div', {"class": "single-score"}).text.strip()
-                        if value.isdigit():
-                            value_int = int(value)
-                        type_list = [a for a in score.attrs["class"] if a.endswith('-hole')]
-                        if len(type_list) == 1:
-                            score_type = type_list[0].replace('-hole', '')
-                        if hole is not None and value_int is not None and score_type is not None:
-                            if hole not in results["scores"][player_name]["scores"]:
-                                results["scores"][player_name]["scores"][hole] = {"score": value_int, "type": score_type}
-                                logger.debug("recorded score for %s hole %s: %s" % (player_name, hole, results["scores"][player_name]["scores"][hole]))
+                scraping.extract_scorecard(table).merge_into(results)
+                self.metrics.count("scorecards_parsed")
 
     def _get_teams(self, tournaments):
         logger.debug("looking up teams..")
         teams = []
         for tournament in tournaments:
             logger.info("Waiting for tournament link...")
-            xpath = self.xpath_soup(tournament)
-            WebDriverWait(self.driver, 20).until(EC.element_to_be_clickable(
-                (By.XPATH,
-                 xpath))).click()
+            self._wait("tournament", scraping.EC.element_to_be_clickable(self._locate(tournament))).click()
             #self._get_element(tournament).click()
             logger.info("Waiting for expand-all link")
-            link = self.soup.find('a', {"class": "expand-all"})
-            xpath = self.xpath_soup(link)
-            WebDriverWait(self.driver, 20).until(EC.element_to_be_clickable(
-                (By.XPATH,
-                 xpath))).click()
-            table = self.soup.find('table', {"class": "scorecard"})
+            self._wait("tournament", scraping.EC.element_to_be_clickable(
+                (scraping.By.XPATH,
+                 "//a[contains(concat(' ', normalize-space(@class), ' '), ' expand-all ')]"))).click()
+            try:
+                self._wait("scorecard", scraping.EC.visibility_of_element_located(
+                    (scraping.By.XPATH, "//table[@class='scorecard']")))
+                table = self.soup.find('table', {"class": "scorecard"})
+            except scraping.TimeoutException:
+                table = None
             if table:
                 logger.info("Found table scorecard...looking for team rows..")
                 for tr in table.find_all("tr", {"class": "aggregate_score"}):
@@ -190,162 +320,252 @@ class GGParser(object):
 
     def iter_rounds(self, ggid, filter=None):
         """
+        Rounds are yielded as soon as their scorecards are collected. When scorecards are loaded off the main
+        driver (http backend or workers > 1) the next round is discovered and its pages prefetched while the
+        caller handles the current one.
         :param ggid: Golf Genius ID
         :param filter: Optional compiled re to match against round names to pull
-        :return: results as dict
+        :return: generator of (round_name, results) tuples
         """
+        executor, pool = self._start_workers()
+        pending = current = None
         try:
-            logger.info("Loading landing page {}".format(self.landing_page))
-            self.driver.get(self.landing_page)
-            logger.debug("Locating rounds...")
-            rounds = {}
-            links = {}
-            for o in self.soup.find(id='round').find_all('option'):
-                round_name = o.text.strip()
-                if isinstance(filter, re.Pattern):
-                    if filter.match(round_name) is None:
-                        logger.info("Skipping round %s, does not match pattern %s" % (round_name, filter.pattern))
-                        continue
-                if round_name in self._captured_rounds:
-                    logger.info("Skipping round %s, already captured" % round_name)
+            for round_name, links in self._iter_round_links(filter):
+                previous = self._previous_round(round_name)
+                if previous is not None:
+                    captured = set(e["event_id"] for e in previous.get("events", []))
+                    links = dict((bet_name, bet_info) for bet_name, bet_info in links.items()
+                                 if bet_info["event_id"] not in captured)
+                    logger.info("Resuming round %s, %d scorecards already captured" % (round_name, len(captured)))
+                journaled = self._journaled(round_name)
+                current = (round_name, links, self._submit_scorecards(executor, pool, links, journaled), previous,
+                           journaled)
+                if executor is None:
+                    yield self._collect_round(*current)
                     continue
-                rounds[round_name] = {
-                    "name": round_name,
-                    "results": {
-                        "teams": [],
-                        "scores": {}
-                    }
-                }
+                if pending is not None:
+                    yield self._collect_round(*pending)
+                pending = current
+            if pending is not None:
+                current, pending = pending, None
+                yield self._collect_round(*current)
+        finally:
+            # The round being handed out and the one prefetched behind it, when the caller stops early
+            for round_info in (pending, current):
+                if round_info is not None and round_info[2] is not None:
+                    for future in round_info[2]:
+                        if future is not None:
+                            future.cancel()
+            self._stop_workers(executor, pool)
+
+    def _iter_round_links(self, filter=None):
+        """ Discovers rounds on the landing page one at a time
+        :param filter: Optional compiled re to match against round names to pull
+        :return: generator of (round_name, links) where links maps bet names to bet_info dicts
+        """
+        landing_url, round_names = self._load_landing_page()
+        for round_name in round_names:
+            if isinstance(filter, re.Pattern):
+                if filter.match(round_name) is None:
+                    logger.info("Skipping round %s, does not match pattern %s" % (round_name, filter.pattern))
+                    continue
+            if round_name in self._captured_rounds:
+                logger.info("Skipping round %s, already captured" % round_name)
+                continue
+            with self.metrics.phase("discover_round"):
                 logger.info("Locating round %s.." % round_name)
-                links[round_name] = {}
-                self._get_element(o).click()
-                WebDriverWait(self.driver, 15).until(
-                    EC.visibility_of_element_located(
-                        (By.XPATH, "//a[@class='expand-tournament']")))
-
-                for anchor in self.soup.find_all('a', {"class": "expand-tournament", "data-tournament-spec-id": True,
-                                                       "data-tournament-event-id": True}):
-                    eid = anchor.attrs["data-tournament-event-id"]
-                    sid = anchor.attrs["data-tournament-spec-id"]
-                    # Using href from option will not work
-                    href = "https://www.golfgenius.com/tournaments2/details?adjusting=false&event_id=%s" % eid
-                    text = anchor.text.strip()
-                    links[round_name][text] = {
-                        "event_id": eid, "spec_id": sid, "href": href, "text": text
-                    }
+                links = self._retry("round %s" % round_name, lambda: self._discover_round(round_name, landing_url),
+                                    self._restart_driver)
+            yield round_name, links
 
-            logger.info("Pulling data for %s rounds" % len(rounds))
-            for round_name, round_info in rounds.items():
-                logger.info("Parsing scores for %s" % round_name)
-                for bet_name, bet_info in links[round_name].items():
-                    self.driver.get(bet_info["href"])
-                    WebDriverWait(self.driver, 15).until(
-                        EC.visibility_of_element_located(
-                            (By.XPATH, "//table[@class='scorecard']")))
-                    table = self.soup.find('table', {"class": "scorecard"})
-                    teams = [[x.strip() for x in tr.attrs["data-aggregate-name"].split("+")] for tr in table.find_all(
-                        "tr", {"class": "aggregate_score", "data-aggregate-name": True})]
-
-                    if teams and not rounds[round_name]["results"]["teams"]:
-                        rounds[round_name]["results"]["teams"] = teams
-
-                    if table:
-                        for player_row in [
-                            tr for tr in table.find_all('tr', {"class": "net-line"}) if tr.attrs.get(
-                                "data-net-name") is not None]:
-                            player_name = player_row.attrs["data-net-name"].strip()
-                            if player_name not in rounds[round_name]["results"]["scores"]:
-                                logger.debug("Creating scores for %s" % player_name)
-                                rounds[round_name]["results"]["scores"][player_name] = {}
-                            rounds[round_name]["results"]["scores"][player_name]["scores"] = {}
-
-                            for score in player_row.find_all('td', {'class': 'score'}):
-                                hole, value_int, score_type = None, None, None
-                                hole_list = [a for a in score.attrs["class"] if a.startswith('hole')]
-                                if len(hole_list) == 1:
-                                    hole = hole_list[0].replace("hole", "")
-                                value = score.find('div', {"class": "single-score"}).text.strip()
-                                if value.isdigit():
-                                    value_int = int(value)
-                                type_list = [a for a in score.attrs["class"] if a.endswith('-hole')]
-                                if len(type_list) == 1:
-                                    score_type = type_list[0].replace('-hole', '')
-                                if hole is not None and value_int is not None and score_type is not None:
-                                    if hole not in rounds[round_name]["results"]["scores"][player_name]["scores"]:
-                                        rounds[round_name]["results"]["scores"][player_name]["scores"][hole] = {
-                                            "score": value_int,
-                                            "type": score_type
-                                        }
-                                        logger.debug("recorded score for %s hole %s: %s" % (
-                                            player_name, hole, rounds[round_name]["results"]["scores"][player_name]["scores"][hole]))
-
-            logger.info("Data pulled for %s rounds" % len(rounds))
-            for round_name, results in rounds.items():
-                yield round_name, results
-
-            # for l in rounds:
-            #     self.driver.get(l)
-            #     WebDriverWait(d.driver, 15).until(
-            #         EC.visibility_of_element_located(
-            #             (By.XPATH, "//table[@class='scorecard']")))
-            #     table = d.soup.find('table', {"class": "scorecard"})
-            #     teams = [[x.strip() for x in tr.attrs["data-aggregate-name"].split("+")] for tr in
-            #              table.find_all("tr", {"class": "aggregate_score", "data-aggregate-name": True})]
-            #     results.append({"table": table, "teams": teams})
-            #
-            # self.landing_page = self.driver.current_url
-            # results_link = self.soup.find('a', text=re.compile(r"\s*Results\s*"))
-            # results_button = self._get_element(results_link)
-            # logger.debug("Clicking results_button")
-            # results_button.click()
-            # logger.debug("Waiting 5 seconds")
-            # time.sleep(5)
-            # results_landing_page = self.driver.current_url
-            # logger.debug("Switching to iframe")
-            # self.driver.switch_to.frame("page_iframe")
-            # logger.debug("Waiting for 3 seconds")
-            # time.sleep(3)
-            # logger.debug("Finding Rounds")
-            # seen = {}
-            # select_element = self.soup.find(id='round')
-            # all_options = select_element.find_all('option')
-            # if isinstance(filter, re.Pattern):
-            #     filtered_options = [option for option in all_options if filter.match(option.text.strip()) is not None]
-            #     logger.info("Discovered {} rounds matching pattern {}. ({} total)".format(
-            #         len(filtered_options), filter.pattern, len(all_options)
-            #     ))
-            # else:
-            #     filtered_options = all_options
-            #     logger.info("Discovered {} rounds.".format(
-            #         len(filtered_options)))
-            #
-            # for option in filtered_options:
-            #     round_name = option.text.strip()
-            #     round_id = option.attrs["value"]
-            #     if round_id in seen:
-            #         continue
-            #     logger.debug("Parsing round %s (%s)" % (round_name, round_id))
-            #     self._get_element(option).click()
-            #     try:
-            #         seen[round_id] = True
-            #         round_results = self._parse_tournaments()
-            #         player_count = len(round_results.get("scores", {}))
-            #         logger.info("Stored {} ({} players)".format(round_name, player_count))
-            #         yield round_name, {"name": round_name, "results": round_results}
-            #     except Exception as exc:
-            #         import traceback
-            #         logger.critical("Error parsing round %s" % round_name, exc_info=True)
-            #         seen[round_id] = True
-            #     finally:
-            #         logger.debug("Reloading results landing page")
-            #         self.driver.get(results_landing_page)
-            #         self.driver.switch_to.default_content()
-            #         logger.debug("Switching back to iframe")
-            #         self.driver.switch_to.frame("page_iframe")
+    @timed_phase("landing_page")
+    def _load_landing_page(self):
+        """
+        :return: (landing_url, round_names) of the results landing page
+        """
+        logger.info("Loading landing page {}".format(self.landing_page))
+        self.driver.get(self.landing_page)
+        landing_url = self.driver.current_url
+        if self.fetcher is not None:
+            self.fetcher.load_cookies(self.driver)
+        logger.debug("Locating rounds...")
+        return landing_url, [o.text.strip() for o in self.soup.find(id='round').find_all('option')]
 
-        finally:
-            pass
+    def _discover_round(self, round_name, landing_url):
+        """
+        :return: dict of bet name -> bet_info dict of the round
+        """
+        if self.driver.current_url != landing_url:
+            logger.debug("Reloading landing page")
+            self.driver.get(self.landing_page)
+        option = self.soup.find(id='round').find(
+            lambda tag: tag.name == 'option' and tag.text.strip() == round_name)
+        self._get_element(option).click()
+        self._wait("round", scraping.EC.visibility_of_element_located(
+            (scraping.By.XPATH, "//a[@class='expand-tournament']")))
+
+        links = {}
+        for anchor in self.soup.find_all('a', {"class": "expand-tournament", "data-tournament-spec-id": True,
+                                               "data-tournament-event-id": True}):
+            eid = anchor.attrs["data-tournament-event-id"]
+            sid = anchor.attrs["data-tournament-spec-id"]
+            # Using href from option will not work
+            href = self.base_url + scraping.SCORECARD_PATH % eid
+            text = anchor.text.strip()
+            links[text] = {
+                "event_id": eid, "spec_id": sid, "href": href, "text": text
+            }
+        return links
+
+    def _previous_round(self, round_name):
+        """
+        :return: round dict of a partially captured round from existing_results, or None. A round written
+            with an error holds no results to resume and is scraped again.
+        """
+        if self.capture_index is None:
+            return None
+        previous = self.capture_index.read(round_name)
+        if previous is None or "error" in previous or "scores" not in previous.get("results", {}):
+            return None
+        return previous
+
+    def _journaled(self, round_name):
+        """
+        :return: dict of event id -> Scorecard of the bets of the round in the journal
+        """
+        if self.journal is None:
+            return {}
+        return self.journal.scorecards(round_name)
+
+    def _collect_round(self, round_name, links, futures=None, previous=None, journaled=None):
+        """
+        :param round_name: name of the round
+        :param links: dict of bet_info dicts of the round
+        :param futures: scorecard futures of the bets when they were submitted to the workers
+        :param previous: round dict of a partial capture of the round to add the scorecards to
+        :param journaled: dict of event id -> Scorecard of the bets replayed from the journal
+        :return: (round_name, results) tuple
+        """
+        if previous is None:
+            results = {"teams": [], "scores": {}}
+            events = []
+        else:
+            results = previous["results"]
+            events = list(previous.get("events", []))
+        with self.metrics.phase("collect_round"):
+            complete = self._collect_scorecards(round_name, links, results, events, futures, journaled)
+        self.metrics.count("rounds_collected")
+        logger.info("Collected round %s (%d players)" % (round_name, len(results["scores"])))
+        return round_name, {"name": round_name, "results": results, "events": events, "complete": complete}
+
+    def _collect_scorecards(self, round_name, links, results, events, futures=None, journaled=None):
+        """ Adds the scorecards of a round's bets to results and events, newly parsed scorecards are journaled
+        :return: False if a scorecard could not be found
+        """
+        if journaled is None:
+            journaled = self._journaled(round_name)
+        coverage = RoundCoverage(results)
+        complete = True
+        bets = list(links.items())
+        for i, (bet_name, bet_info) in enumerate(bets):
+            if not self.strict and coverage.complete():
+                skipped = len(bets) - i
+                logger.info("All players of %s covered, skipping %d scorecards" % (round_name, skipped))
+                self.scorecards_skipped += skipped
+                self.metrics.count("scorecards_skipped", skipped)
+                for future in (futures or [])[i:]:
+                    if future is not None:
+                        future.cancel()
+                break
+            scorecard = journaled.get(bet_info["event_id"])
+            if scorecard is not None:
+                logger.info("Replaying scores for %s: %s from the journal" % (round_name, bet_name))
+                self.metrics.count("scorecards_replayed")
+            else:
+                table = self._get_scorecard(bet_info) if futures is None else futures[i].result()
+                if table is None:
+                    logger.warning("No scorecard found for %s (%s)" % (bet_name, bet_info["href"]))
+                    self.metrics.count("scorecards_missing")
+                    if futures is None:
+                        # Only the serial path loaded the page in the main driver, workers and http did not
+                        self.screenshot(name="error-scorecard %s %s" % (round_name, bet_info["event_id"]),
+                                        error=True)
+                    complete = False
+                    continue
+                logger.info("Parsing scores for %s: %s" % (round_name, bet_name))
+                scorecard = scraping.extract_scorecard(table)
+                self.metrics.count("scorecards_parsed")
+                if self.journal is not None:
+                    self.journal.record(round_name, bet_name, bet_info, scorecard)
+            scorecard.merge_into(results)
+            events.append({"event_id": bet_info["event_id"], "spec_id": bet_info["spec_id"], "text": bet_name})
+        return complete
+
+    def _get_scorecard(self, bet_info, pool=None):
+        """
+        :param bet_info: dict with event_id and href of a bet
+        :param pool: DriverPool of the worker drivers to load the page in, defaults to the main driver
+        :return: table.scorecard element of the bet, or None if it could not be loaded within the retries
+        """
+        def load():
+            with self.metrics.phase("scorecard"):
+                return self._load_scorecard(bet_info, None if pool is None else pool.get())
+
+        try:
+            return self._retry(bet_info["href"], load, self._restart_driver if pool is None else pool.restart)
+        except scraping.PAGE_ERRORS:
+            # Left out of the round, which stays incomplete and is resumed by the next run
+            logger.error("Unable to load %s" % bet_info["href"], exc_info=True)
+            self.metrics.count("scorecards_failed")
+            return None
+
+    def _load_scorecard(self, bet_info, driver=None):
+        if self.fetcher is not None:
+            return self.fetcher.scorecard(bet_info["event_id"])
+        main_driver = driver is None
+        if main_driver:
+            driver = self.driver
+        driver.get(bet_info["href"])
+        if not main_driver:
+            # The main driver counts its pages through the SoupInvalidator
+            self.metrics.count("pages_loaded")
+        self._wait("scorecard", scraping.EC.visibility_of_element_located(
+            (scraping.By.XPATH, "//table[@class='scorecard']")), driver)
+        if not main_driver:
+            return scraping.parse_scorecard(driver.page_source, self.soup_cache.features)
+        return self.soup.find('table', {"class": "scorecard"})
+
+    def _start_workers(self):
+        """
+        :return: (executor, pool) used to load scorecards off the main driver, (None, None) when scorecards
+            are loaded serially by the main driver
+        """
+        if self.fetcher is None and self.workers <= 1:
+            return None, None
+        pool = None
+        if self.fetcher is None:
+            pool = DriverPool(self._create_driver)
+        return ThreadPoolExecutor(max_workers=max(1, self.workers)), pool
+
+    def _stop_workers(self, executor, pool):
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if pool is not None:
+            pool.close()
+
+    def _submit_scorecards(self, executor, pool, links, journaled=None):
+        """
+        :param journaled: event ids of the bets replayed from the journal, they are not submitted
+        :return: list of scorecard futures in the same order as links, None for journaled bets, or None
+            without an executor
+        """
+        if executor is None:
+            return None
+        journaled = journaled or {}
+        return [None if bet_info["event_id"] in journaled else executor.submit(self._get_scorecard, bet_info, pool)
+                for bet_info in links.values()]
 
+    @timed_phase("parse")
     def parse(self, ggid, filter=None):
         """ 
         :param ggid: Golf Genius ID
@@ -362,14 +582,12 @@ class GGParser(object):
             results_button = self._get_element(results_link)
             logger.debug("Clicking results_button")
             results_button.click()
-            logger.debug("Waiting 5 seconds")
-            time.sleep(5)
+            logger.debug("Waiting for results page")
+            self._wait("results", scraping.EC.url_changes(self.landing_page))
             self.screenshot(name="results")
             results_landing_page = self.driver.current_url
             logger.debug("Switching to iframe")
-            self.driver.switch_to.frame("page_iframe")
-            logger.debug("Waiting for 3 seconds")
-            time.sleep(3)
+            self._wait_for_results_frame()
             logger.debug("Finding Rounds")
             results = {}
             select_element = self.soup.find(id='round')
@@ -385,6 +603,8 @@ class GGParser(object):
                 self._get_element(option).click()
                 self.screenshot(name="round %s" % round_name)
                 try:
+                    self._wait("round", scraping.EC.visibility_of_element_located(
+                        (scraping.By.XPATH, "//a[@class='expand-tournament']")))
                     results[round_id] = {
                         "name": round_name,
                         "results": self._parse_tournaments()
@@ -393,6 +613,7 @@ class GGParser(object):
                 except Exception as exc:
                     import traceback
                     logger.critical("Error parsing round %s" % round_name, exc_info=True)
+                    self.screenshot(name="error-round %s" % round_name, error=True)
                     results[round_id] = {
                         "name": round_name,
                         "results": {},
@@ -400,23 +621,38 @@ class GGParser(object):
                         "traceback": traceback.format_exc()
                     }
                 finally:
-                    logger.debug("Reloading results landing page")
-                    self.driver.get(results_landing_page)
-                    self.driver.switch_to.default_content()
-                    logger.debug("Switching back to iframe")
-                    self.driver.switch_to.frame("page_iframe")
+                    if self.driver.current_url != results_landing_page:
+                        logger.debug("Reloading results landing page")
+                        self.driver.get(results_landing_page)
+                        self._switch_to_default_content()
+                        logger.debug("Switching back to iframe")
+                        self._wait_for_results_frame()
 
             return results
         finally:
             self.screenshot("parse_final")
 
+    def _wait_for_results_frame(self):
+        self._wait("frame", scraping.EC.frame_to_be_available_and_switch_to_it("page_iframe"))
+        self.soup_cache.invalidate()
+        self._wait("frame", scraping.EC.presence_of_element_located((scraping.By.ID, "round")))
+
     def _get_element(self, e):
-        xpath = self.xpath_soup(e)
-        return self.driver.find_element_by_xpath(xpath)
+        return self.driver.find_element(*self._locate(e))
+
+    def _locate(self, element):
+        """
+        :param element: bs4 text or node
+        :return: (By, value) locator, preferring stable attributes over an absolute xpath
+        """
+        locators = self.soup_cache.locators
+        if locators is None:
+            return scraping.By.XPATH, scraping.element_xpath(element)
+        return locators.locate(element)
 
     @property
     def soup(self):
-        return BeautifulSoup(self.driver.page_source, "html.parser")
+        return self.soup_cache.get(self.driver)
 
     def xpath_soup(self, element):
         """
@@ -424,30 +660,115 @@ class GGParser(object):
         :param element: bs4 text or node
         :return: xpath as string
         """
-        components = []
-        child = element if element.name else element.parent
-        for parent in child.parents:
-            """
-            @type parent: bs4.element.Tag
-            """
-            previous = itertools.islice(parent.children, 0, parent.contents.index(child))
-            xpath_tag = child.name
-            xpath_index = sum(1 for i in previous if i.name == xpath_tag) + 1
-            components.append(xpath_tag if xpath_index == 1 else '%s[%d]' % (xpath_tag, xpath_index))
-            child = parent
-        components.reverse()
-        return '/%s' % '/'.join(components)
-
-    def to_json(self, ggid, path, filter=None):
+        locators = self.soup_cache.locators
+        if locators is None:
+            return scraping.element_xpath(element)
+        return locators.xpath(element)
+
+    def _capture_index_for(self, path):
+        if self.capture_index is not None and self.capture_index.directory == os.path.abspath(path):
+            return self.capture_index
+        return CaptureIndex(path).load()
+
+    def _write_round(self, index, path, result, save=True, stream=None):
+        with self.metrics.phase("write_round"):
+            if stream is None:
+                fpath = os.path.join(path, "%s.json" % result["name"])
+                raw = json.dumps(result, indent=4).encode("utf-8")
+                atomic_write(fpath, raw)
+                index.record(fpath, result, raw, save=save)
+            else:
+                offset, raw = stream.write(result)
+                index.record(stream.path, result, raw, save=save, offset=offset)
+        if self.journal is not None:
+            self.journal.discard(result["name"])
+        self.metrics.count("rounds_written")
+        self.metrics.count("bytes_written", len(raw))
+
+    @staticmethod
+    def _open_stream(path, output_format):
+        assert output_format in ("json", "jsonl", "binary"), "output_format must be 'json', 'jsonl' or 'binary'"
+        if output_format == "json":
+            return None
+        return RoundStreamWriter(os.path.join(path, STREAM_NAMES[output_format]))
+
+    @timed_phase("to_json")
+    def to_json(self, ggid, path, filter=None, output_format="json"):
         """ Parses results and saves as json files to output_dir.
         :param ggid: Golf Genius ID
         :param path: Directory to save json files to
         :param filter: A compiled regex filter
+        :param output_format: "json" writes a file per round, "jsonl" and "binary" append the rounds to the
+            rounds.jsonl or rounds.ggr round stream in path
         :return: None
         """
         assert os.path.isdir(path), "output_dir must be a directory"
         results = self.parse(ggid, filter=filter)
-        for round_id, result in results.items():
-            with open(os.path.join(path, "%s.json" % result["name"]), "w") as fp:
-                json.dump(result, fp, indent=4)
+        index = self._capture_index_for(path)
+        stream = self._open_stream(path, output_format)
+        try:
+            for round_id, result in results.items():
+                self._write_round(index, path, result, save=False, stream=stream)
+        finally:
+            if stream is not None:
+                stream.close()
+        index.save()
 
+    def iter_to_json(self, ggid, path, filter=None, output_format="json"):
+        """ Saves each round from iter_rounds to path as soon as it is collected.
+        :param ggid: Golf Genius ID
+        :param path: Directory to save json files to
+        :param filter: A compiled regex filter
+        :param output_format: "json" writes a file per round, "jsonl" and "binary" append each round to the
+            rounds.jsonl or rounds.ggr round stream in path
+        :return: generator of (round_name, results) tuples
+        """
+        assert os.path.isdir(path), "output_dir must be a directory"
+        index = self._capture_index_for(path)
+        stream = self._open_stream(path, output_format)
+        try:
+            for round_name, result in self.iter_rounds(ggid, filter=filter):
+                self._write_round(index, path, result, stream=stream)
+                yield round_name, result
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def run_summary(self):
+        """
+        :return: json-serializable dict of the run: phase timings, counters, waits, soup cache, screenshot
+            and http fetch statistics
+        """
+        sections = {
+            "waits": dict(self.timer.report()),
+            "soup_cache": self.soup_cache.stats()
+        }
+        if self.screenshot_writer is not None:
+            sections["screenshots"] = self.screenshot_writer.stats()
+        if self.fetcher is not None:
+            sections["http"] = self.fetcher.stats()
+        summary = self.metrics.summary(**sections)
+        counters = summary["counters"]
+        counters["soups_built"] = self.soup_cache.parses
+        counters["soups_reused"] = self.soup_cache.hits
+        if self.screenshot_writer is not None:
+            counters["screenshot_bytes_written"] = self.screenshot_writer.bytes_written
+        if self.fetcher is not None:
+            counters["http_pages_fetched"] = self.fetcher.pages_fetched
+            counters["http_bytes_fetched"] = self.fetcher.bytes_fetched
+            # Page loads retried by the parser and requests retried by urllib3
+            counters["retries"] = counters.get("retries", 0) + self.fetcher.retries
+        return summary
+
+    def write_metrics(self, json_path=None, prometheus_path=None):
+        """ Writes the run summary
+        :param json_path: json file to write
+        :param prometheus_path: Prometheus textfile (.prom) to write, e.g. in node_exporter's textfile directory
+        :return: the run summary
+        """
+        summary = self.run_summary()
+        if json_path is not None:
+            write_json(summary, json_path)
+        if prometheus_path is not None:
+            write_prometheus(summary, prometheus_path)
+        return summary
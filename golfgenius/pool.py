@@ -0,0 +1,61 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class DriverPool(object):
+    """
+    Pool of webdriver sessions with one session per worker thread.
+
+    Sessions are created lazily by the first task each worker thread runs, so starting N browsers happens
+    in parallel, and are all shut down by close().
+    """
+
+    def __init__(self, factory):
+        """
+        :param factory: callable returning a new webdriver
+        """
+        self.factory = factory
+        self.drivers = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        :return: webdriver owned by the calling thread
+        """
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            driver = self.factory()
+            self._local.driver = driver
+            with self._lock:
+                self.drivers.append(driver)
+            logger.debug("opened worker driver #%d" % len(self.drivers))
+        return driver
+
+    def restart(self):
+        """ Quits the calling thread's driver, e.g. after its browser crashed, the next get() opens a new one
+        """
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            return
+        self._local.driver = None
+        with self._lock:
+            self.drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            logger.debug("Unable to quit crashed worker driver", exc_info=True)
+        logger.debug("restarting worker driver")
+
+    def close(self):
+        with self._lock:
+            drivers, self.drivers = self.drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                logger.error("Unable to quit worker driver", exc_info=True)
+        logger.debug("closed %d worker drivers" % len(drivers))
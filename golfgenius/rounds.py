@@ -0,0 +1,24 @@
+import datetime
+import re
+
+MONTH_IDX=['january', 'february', 'march', 'april', 'may', 'june', 'july',
+           'august', 'september', 'october', 'november', 'december']
+
+ROUND_REGEXP = re.compile(
+    r'Round\s+(?P<round_id>\d+)\s+\((Fri|Sat|Sun|Mon|Tue|Wed|Thu)\,\s+(?P<month>\w+)\s+(?P<day>\d+)\)')
+
+
+def parse_round_date(name):
+    """
+    :param name: round name such as "Round 12 (Fri, July 17)"
+    :return: datetime.date of the round or None if the name has no date
+    """
+    m = ROUND_REGEXP.search(name)
+    if m is None:
+        return None
+    round_info = m.groupdict()
+    if int(round_info["round_id"]) > 60:
+        year = 2021
+    else:
+        year = 2020
+    return datetime.date(year, MONTH_IDX.index(round_info["month"].lower()) + 1, int(round_info["day"]))
@@ -0,0 +1,99 @@
+import logging
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+DEFAULT_FEATURES = "html.parser"
+FAST_FEATURES = "lxml"
+
+SCORECARD_STRAINER = SoupStrainer('table', {"class": "scorecard"})
+
+
+def parse_scorecard(page_source, features=DEFAULT_FEATURES):
+    """ Parses only the table.scorecard subtree of a page
+    :param page_source: html of a tournaments2/details page
+    :param features: BeautifulSoup tree builder
+    :return: table.scorecard element or None
+    """
+    return BeautifulSoup(page_source, features, parse_only=SCORECARD_STRAINER).find(
+        'table', {"class": "scorecard"})
+
+
+class Scorecard(object):
+    """
+    Teams and hole scores of one scorecard table.
+
+    players is a list of (player_name, [(hole, score, score_type), ...]) in table order.
+    """
+    __slots__ = ("teams", "players")
+
+    def __init__(self, teams, players):
+        self.teams = teams
+        self.players = players
+
+    def merge_into(self, results):
+        """ Records the scorecard into round results, keeping the first score recorded for a hole
+        :param results: round results dict with teams and scores
+        """
+        if self.teams and not results["teams"]:
+            results["teams"] = self.teams
+        scores = results["scores"]
+        for player_name, holes in self.players:
+            if player_name not in scores:
+                logger.debug("Creating scores for %s" % player_name)
+                scores[player_name] = {"scores": {}}
+            player_scores = scores[player_name]["scores"]
+            for hole, value, score_type in holes:
+                if hole not in player_scores:
+                    player_scores[hole] = {"score": value, "type": score_type}
+
+
+def _single_score(td):
+    # A plain descendant walk, much cheaper than td.find for these small cells
+    for node in td.descendants:
+        if node.name == 'div' and "single-score" in node.attrs.get("class", ()):
+            return node
+    return None
+
+
+def extract_scorecard(table):
+    """ Extracts teams, players and hole scores from a scorecard in a single pass over its rows
+    :param table: table.scorecard element
+    :return: Scorecard
+    """
+    teams = []
+    players = []
+    for tr in table.find_all('tr'):
+        classes = tr.attrs.get("class", ())
+        if "aggregate_score" in classes:
+            team_str = tr.attrs.get("data-aggregate-name")
+            if team_str is not None:
+                teams.append([x.strip() for x in team_str.split("+")])
+        if "net-line" in classes:
+            player_name = tr.attrs.get("data-net-name")
+            if player_name is None:
+                continue
+            holes = []
+            for td in tr.find_all('td'):
+                td_classes = td.attrs.get("class", ())
+                if "score" not in td_classes:
+                    continue
+                hole, score_type, hole_count, type_count = None, None, 0, 0
+                for a in td_classes:
+                    if a.startswith('hole'):
+                        hole = a[4:]
+                        hole_count += 1
+                    if a.endswith('-hole'):
+                        score_type = a[:-5]
+                        type_count += 1
+                if hole_count != 1 or type_count != 1:
+                    continue
+                div = _single_score(td)
+                if div is None:
+                    continue
+                value = div.get_text().strip()
+                if value.isdigit():
+                    holes.append((hole, int(value), score_type))
+            players.append((player_name.strip(), holes))
+    return Scorecard(teams, players)
@@ -0,0 +1,22 @@
+"""
+selenium, bs4, urllib3 and the golfgenius modules built on them, everything GGParser scrapes with.
+
+golfgenius.parser imports this module on first use, so importing the package or the parser does not load the
+scraping stack. Patch names here, e.g. EventFiringWebDriver, to patch them for the parser.
+"""
+from selenium import webdriver
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.event_firing_webdriver import EventFiringWebDriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from urllib3.exceptions import HTTPError
+from golfgenius.soup import SoupCache, SoupInvalidator
+from golfgenius.fetch import HTTPFetcher, FetchError, BASE_URL, SCORECARD_PATH
+from golfgenius.locators import element_xpath
+from golfgenius.scorecard import DEFAULT_FEATURES, extract_scorecard, parse_scorecard
+from golfgenius.journal import ScrapeJournal
+
+# Failures of a page load that are retried: browser errors, HTTP error statuses and urllib3 errors
+PAGE_ERRORS = (WebDriverException, FetchError, HTTPError)
@@ -0,0 +1,133 @@
+import io
+import logging
+import os
+import threading
+import time
+import queue
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class ScreenshotPolicy(object):
+    """ Decides which screenshot requests are captured """
+
+    def __init__(self, first=None, every=None, errors_only=False):
+        """
+        :param first: capture the first N screenshots
+        :param every: capture every k-th screenshot
+        :param errors_only: only capture screenshots taken because of an error
+        Without first or every all screenshots are captured. Error screenshots are always captured.
+        """
+        self.first = first
+        self.every = every
+        self.errors_only = errors_only
+
+    def should_capture(self, count, error=False):
+        """
+        :param count: 1-based number of the screenshot request
+        :param error: the screenshot documents an error
+        :return: True if the screenshot should be captured
+        """
+        if error:
+            return True
+        if self.errors_only:
+            return False
+        if self.first is None and self.every is None:
+            return True
+        if self.first is not None and count <= self.first:
+            return True
+        return self.every is not None and count % self.every == 0
+
+
+class ScreenshotWriter(object):
+    """
+    Writes screenshots to disk from a background thread.
+
+    PNG data is queued by the driver thread and written, optionally downscaled (requires Pillow),
+    by a writer thread so page processing does not wait on the disk.
+    """
+
+    def __init__(self, directory, scale=None, max_bytes=None, maxsize=32):
+        """
+        :param directory: directory to save screenshots to
+        :param scale: factor to downscale screenshots by, e.g. 0.5 (requires Pillow)
+        :param max_bytes: drop screenshots that are larger than this after scaling
+        :param maxsize: number of screenshots that may wait to be written before capturing blocks
+        """
+        self.directory = directory
+        self.scale = scale
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.write_seconds = 0.0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        if scale is not None:
+            try:
+                import PIL.Image
+            except ImportError:
+                logger.warning("Pillow is not installed, screenshots will not be downscaled")
+                self.scale = None
+
+    def put(self, fname, pngdata):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="screenshot-writer")
+            self._thread.daemon = True
+            self._thread.start()
+        self._queue.put((fname, pngdata))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception:
+                logger.error("Unable to save screenshot", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, fname, pngdata):
+        start = time.perf_counter()
+        if self.scale is not None:
+            pngdata = self._downscale(pngdata)
+        if self.max_bytes is not None and len(pngdata) > self.max_bytes:
+            logger.debug("Dropping screenshot {} ({} bytes)".format(fname, len(pngdata)))
+            self.dropped += 1
+            return
+        with open(os.path.join(self.directory, fname), 'wb') as fp:
+            fp.write(pngdata)
+        self.written += 1
+        self.bytes_written += len(pngdata)
+        self.write_seconds += time.perf_counter() - start
+        logger.debug("Created screenshot {}".format(fname))
+
+    def _downscale(self, pngdata):
+        import PIL.Image
+        image = PIL.Image.open(io.BytesIO(pngdata))
+        size = (max(1, int(image.width * self.scale)), max(1, int(image.height * self.scale)))
+        output = io.BytesIO()
+        image.resize(size).save(output, format="PNG", optimize=True)
+        return output.getvalue()
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "bytes_written": self.bytes_written,
+            "write_seconds": self.write_seconds
+        }
+
+    def flush(self):
+        """ Waits until all queued screenshots are written """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
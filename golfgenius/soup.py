@@ -0,0 +1,115 @@
+import hashlib
+import logging
+from bs4 import BeautifulSoup
+from selenium.webdriver.support.events import AbstractEventListener
+from golfgenius.locators import LocatorIndex
+from golfgenius.scorecard import DEFAULT_FEATURES, FAST_FEATURES
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class SoupCache(object):
+    """
+    Snapshot cache for the parsed DOM of a webdriver.
+
+    The current snapshot is keyed on the driver's current URL and a digest of its page source, so
+    reading the soup of an unchanged page returns the previously parsed tree instead of building a
+    new one. The snapshot is dropped whenever the driver navigates, clicks or switches frames.
+    """
+
+    def __init__(self, features=DEFAULT_FEATURES):
+        """
+        :param features: BeautifulSoup tree builder, "html.parser" (default) or "lxml" (faster, opt-in)
+        """
+        self.features = features
+        self.parses = 0
+        self.hits = 0
+        self.invalidations = 0
+        self._key = None
+        self._soup = None
+        self._locators = None
+
+    @staticmethod
+    def digest(page_source):
+        return hashlib.sha1(page_source.encode("utf-8")).hexdigest()
+
+    def get(self, driver):
+        """
+        :param driver: selenium webdriver
+        :return: BeautifulSoup of the driver's current page
+        """
+        page_source = driver.page_source
+        key = (driver.current_url, self.digest(page_source))
+        if self._soup is not None and key == self._key:
+            self.hits += 1
+            return self._soup
+        self._soup = self.parse(page_source)
+        self._key = key
+        self._locators = None
+        return self._soup
+
+    @property
+    def locators(self):
+        """
+        :return: LocatorIndex of the current snapshot built on first use, or None without a snapshot
+        """
+        if self._soup is None:
+            return None
+        if self._locators is None:
+            self._locators = LocatorIndex(self._soup)
+        return self._locators
+
+    def parse(self, page_source):
+        self.parses += 1
+        return BeautifulSoup(page_source, self.features)
+
+    def invalidate(self):
+        if self._soup is not None:
+            self.invalidations += 1
+        self._key = None
+        self._soup = None
+        self._locators = None
+
+    def stats(self):
+        """
+        :return: dict of parse counters, "parses_saved" is the number of soups served from the cache
+        """
+        return {
+            "features": self.features,
+            "parses": self.parses,
+            "parses_saved": self.hits,
+            "invalidations": self.invalidations
+        }
+
+
+class SoupInvalidator(AbstractEventListener):
+    """ Event listener that drops the cached soup whenever the page may have changed """
+
+    def __init__(self, cache, metrics=None):
+        """
+        :param cache: SoupCache
+        :param metrics: RunMetrics counting the pages loaded
+        """
+        self.cache = cache
+        self.metrics = metrics
+
+    def after_navigate_to(self, url, driver):
+        self.cache.invalidate()
+        if self.metrics is not None:
+            self.metrics.count("pages_loaded")
+
+    def after_navigate_back(self, driver):
+        self.cache.invalidate()
+
+    def after_navigate_forward(self, driver):
+        self.cache.invalidate()
+
+    def after_click(self, element, driver):
+        self.cache.invalidate()
+
+    def after_change_value_of(self, element, driver):
+        self.cache.invalidate()
+
+    def after_execute_script(self, script, driver):
+        self.cache.invalidate()
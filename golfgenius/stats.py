@@ -1,89 +1,221 @@
 import json
-import os
 from operator import itemgetter
-import re
 import datetime
 import numpy as np
-
-MONTH_IDX=['january', 'february', 'march', 'april', 'may', 'june', 'july',
-           'august', 'september', 'october', 'november', 'december']
+from golfgenius.cube import ScoreCube, PlayerIndex, right_align, recency_weights, weighted_averages
+from golfgenius.cache import load_results
+from golfgenius.archive import HoleArchive, is_archive
+from golfgenius.windows import DateIndex
+from golfgenius.holes import HoleIndex
+from golfgenius.pairs import PairIndex
+from golfgenius.bootstrap import bootstrap_averages, confidence_intervals, rank_probabilities
+from golfgenius.rounds import MONTH_IDX, ROUND_REGEXP, parse_round_date
 
 
 class Stats(object):
-    def __init__(self, results_dir='./results', timedelta=None):
+    def __init__(self, results_dir='./results', timedelta=None, cache=True, workers=None):
         """
 
-        :param results_dir: output_dir to results directory
+        :param results_dir: output_dir to results directory, a .jsonl or .ggr round stream written by
+            GGParser.iter_to_json, or a HoleArchive directory. Of an archive only the rows of the rounds within
+            timedelta are read.
         :param timedelta: a relative datetime.timedelta to limit range of results
+        :param cache: keep a compiled cache of the round files in results_dir, only changed files are re-read
+        :param workers: number of processes to decode changed round files with
         """
         self.results_dir = results_dir
-        self.results = {}
-        self.round_regexp = re.compile(r'Round\s+(?P<round_id>\d+)\s+\((Fri|Sat|Sun|Mon|Tue|Wed|Thu)\,\s+(?P<month>\w+)\s+(?P<day>\d+)\)')
-        for f in os.listdir(self.results_dir):
-            if f.endswith('.json'):
-                with open(os.path.join(self.results_dir, f), 'r') as fp:
-                    data = json.load(fp)
-                    m = self.round_regexp.search(data["name"])
-                    if m:
-                        round_info = m.groupdict()
-                        if int(round_info["round_id"]) > 60:
-                            year = 2021
-                        else:
-                            year = 2020
-                        data["results"]["date"] = datetime.date(
-                            year, MONTH_IDX.index(round_info["month"].lower()) + 1, int(round_info["day"]))
-                    elif timedelta is not None:
-                        print("Unable to find round date for round %s, skipping..." % data["name"])
-                        continue
-                    else:
-                        print("Unable to find round date for round %s, assuming today..." % data["name"])
-                        data["results"]["date"] = datetime.date.today()
-                    if timedelta is None:
-                        self.results[data["name"]] = data["results"]
-                    else:
-                        cutoff_date = datetime.date.today() - timedelta
-                        if data["results"]["date"] > cutoff_date:
-                            self.results[data["name"]] = data["results"]
+        self.round_regexp = ROUND_REGEXP
+        self.cache = cache
+        self.workers = workers
+        self.cutoff_date = None
+        if timedelta is not None:
+            self.cutoff_date = (datetime.date.today() - timedelta).toordinal()
+        self.archive = HoleArchive(results_dir) if is_archive(results_dir) else None
+        table = self._load_table()
+        rounds = []
+        dates = []
+        self._files = {}
+        for k, name in enumerate(table.names):
+            self._files[table.files[k]] = (table.mtimes[k], table.sizes[k], name)
+            date = self._round_date(name, int(table.dates[k]))
+            if date is not None:
+                rounds.append(k)
+                dates.append(date)
+        self.cube = ScoreCube.from_table(table, rounds, dates)
+        self._results = None
+        self._index = None
+        self._date_index = None
+        self._hole_index = None
+        self._pair_index = None
+
+    def _load_table(self):
+        """
+        :return: RoundTable of results_dir, of an archive only the rounds after the cutoff date
+        """
+        if self.archive is None:
+            return load_results(self.results_dir, cache=self.cache, workers=self.workers)
+        # Re-reads the sidecar index to follow appends
+        self.archive = HoleArchive(self.results_dir)
+        return self.archive.table(self.archive.window(
+            start=self.cutoff_date + 1 if self.cutoff_date is not None else None))
+
+    def _round_date(self, name, date):
+        """
+        :param name: round name
+        :param date: round date ordinal, 0 if the name has no date
+        :return: date ordinal to file the round under, None if the round is outside the timedelta
+        """
+        if not date:
+            if self.cutoff_date is not None:
+                print("Unable to find round date for round %s, skipping..." % name)
+                return None
+            print("Unable to find round date for round %s, assuming today..." % name)
+            date = datetime.date.today().toordinal()
+        if self.cutoff_date is not None and date <= self.cutoff_date:
+            return None
+        return date
+
+    def add_round(self, round_data):
+        """ Adds a round or replaces the round of the same name, updating the running aggregates
+        :param round_data: round dict with name and results, as yielded by GGParser.iter_rounds or saved by
+            GGParser.to_json
+        :return: True if the round was added, False if it is outside the timedelta
+        """
+        name = round_data["name"]
+        date = parse_round_date(name)
+        date = self._round_date(name, date.toordinal() if date is not None else 0)
+        if date is None:
+            if name in self.cube.round_index:
+                self.remove_round(name)
+            return False
+        results = round_data["results"]
+        self.cube.add_round(name, date, results.get("teams", []), results["scores"])
+        self.invalidate()
+        return True
+
+    def add_rounds(self, rounds):
+        """ Adds rounds as they arrive, e.g. from GGParser.iter_rounds or GGParser.iter_to_json
+        :param rounds: iterable of round dicts or (round name, round dict) pairs
+        :return: number of rounds added
+        """
+        added = 0
+        for round_data in rounds:
+            if isinstance(round_data, tuple):
+                round_data = round_data[1]
+            if "error" in round_data or "results" not in round_data:
+                continue
+            added += self.add_round(round_data)
+        return added
+
+    def remove_round(self, name):
+        """
+        :param name: name of the round to remove
+        """
+        self.cube.remove_round(name)
+        self.invalidate()
+
+    def refresh(self):
+        """ Follows results_dir, adding round files that appeared or changed and removing deleted ones, or the
+        rounds appended to an archive
+        :return: number of rounds added or removed
+        """
+        table = self._load_table()
+        changed = 0
+        files = {}
+        for k, fname in enumerate(table.files):
+            files[fname] = (table.mtimes[k], table.sizes[k], table.names[k])
+            if self._files.get(fname) == files[fname]:
+                continue
+            previous = self._files.get(fname)
+            if previous is not None and previous[2] != table.names[k] and previous[2] in self.cube.round_index:
+                self.cube.remove_round(previous[2])
+            date = self._round_date(table.names[k], int(table.dates[k]))
+            if date is not None:
+                self.cube.add_round(table.names[k], date, table.teams[k], table.round_scores(k))
+            elif table.names[k] in self.cube.round_index:
+                self.cube.remove_round(table.names[k])
+            changed += 1
+        for fname, (mtime, size, name) in self._files.items():
+            if fname not in files and name in self.cube.round_index:
+                self.cube.remove_round(name)
+                changed += 1
+        self._files = files
+        if changed:
+            self.invalidate()
+        return changed
+
+    @property
+    def index(self):
+        """
+        :return: PlayerIndex of the score cube, built on first use and shared by all rankings
+        """
+        if self._index is None:
+            self._index = PlayerIndex(self.cube)
+        return self._index
+
+    @property
+    def date_index(self):
+        """
+        :return: DateIndex answering date window and rolling queries, built on first use
+        """
+        if self._date_index is None:
+            self._date_index = DateIndex(self.index)
+        return self._date_index
+
+    @property
+    def hole_index(self):
+        """
+        :return: HoleIndex answering per-hole field and player queries, built on first use
+        """
+        if self._hole_index is None:
+            self._hole_index = HoleIndex(self.cube)
+        return self._hole_index
+
+    @property
+    def pair_index(self):
+        """
+        :return: PairIndex of partner and head-to-head matrices, built on first use
+        """
+        if self._pair_index is None:
+            self._pair_index = PairIndex(self.index)
+        return self._pair_index
+
+    def invalidate(self):
+        """ Drops the derived results and indexes, call after changing the score cube """
+        self._results = None
+        self._index = None
+        self._date_index = None
+        self._hole_index = None
+        self._pair_index = None
+
+    @property
+    def results(self):
+        """
+        :return: dict of round name -> round results with teams, scores and date, built from the score cube
+        """
+        if self._results is None:
+            self._results = self.cube.to_results()
+        return self._results
 
     def player_scores(self):
+        cube = self.cube
+        index = self.index
         scoring = {}
-        for player in self.all_players():
-            scoring[player] = []
-            for round_name, results in self.results.items():
-                round_date = results["date"]
-                player_data = results["scores"].get(player)
-                if player_data:
-                    round_scores = [h["score"] for h in player_data["scores"].values()]
-                    if len(round_scores) == 18:
-                        eagles = [
-                            hole for hole, val in player_data["scores"].items() if val["type"] == "eagle"
-                        ]
-                        birdies = [
-                            hole for hole, val in player_data["scores"].items() if val["type"] == "birdie"
-                        ]
-                        pars = [
-                            hole for hole, val in player_data["scores"].items() if val["type"] == "par"
-                        ]
-                        bogeys = [
-                            hole for hole, val in player_data["scores"].items() if val["type"] == "plus1"
-                        ]
-                        double_bogeys = [
-                            hole for hole, val in player_data["scores"].items() if val["type"] == "plus2"
-                        ]
-                        scoring[player].append(
-                            {
-                                "date": round_date,
-                                "round": round_name,
-                                "score": sum(round_scores),
-                                "eagles": eagles,
-                                "birdies": birdies,
-                                "pars": pars,
-                                "bogeys": bogeys,
-                                "double_bogeys": double_bogeys,
-                                "hole_data": player_data["scores"]
-                            }
-                        )
-            scoring[player] = sorted(scoring[player], key=itemgetter("date"))
+        for n, i in enumerate(index.rows):
+            scoring[cube.players[i]] = [
+                {
+                    "date": cube.date(j),
+                    "round": cube.rounds[j],
+                    "score": int(index.totals[n, j]),
+                    "eagles": cube.holes_of_type(i, j, "eagle"),
+                    "birdies": cube.holes_of_type(i, j, "birdie"),
+                    "pars": cube.holes_of_type(i, j, "par"),
+                    "bogeys": cube.holes_of_type(i, j, "plus1"),
+                    "double_bogeys": cube.holes_of_type(i, j, "plus2"),
+                    "hole_data": cube.hole_data(i, j)
+                }
+                for j in index.rounds(cube.players[i])
+            ]
         return scoring
 
     @staticmethod
@@ -94,73 +226,88 @@ class Stats(object):
         return scores_list
 
     def iter_player_data(self):
-        for player in self.all_players():
+        cube = self.cube
+        index = self.index
+        for n, i in enumerate(index.rows):
+            player = cube.players[i]
             stats = {"rounds": [], "name": player}
-            for round_name, results in self.results.items():
+            for j in index.rounds(player):
+                round_date = cube.date(j)
+                score_list = self.scores_tolist(cube.hole_data(i, j))
+                hole_scores = cube.scores[i, j].tolist()
                 round_data = {}
-                round_date = results["date"]
-                player_data = results["scores"].get(player)
-                if player_data:
-                    round_scores = [h["score"] for h in player_data["scores"].values()]
-                    if len(round_scores) == 18:
-                        score_list = self.scores_tolist(player_data["scores"])
-                        round_data["score"] = sum(round_scores)
-                        round_data["total"] = sum(round_scores)
-                        round_data["front"] = score_list[0:9]
-                        round_data["back"] = score_list[9:18]
-                        round_data["out"] = sum(round_scores[0:9])
-                        round_data["in"] = sum(round_scores[9:18])
-                        round_data["name"] = round_name
-                        round_data["date"] = round_date
-                        round_data["date_timestamp"] = round_date.toordinal()
-                        stats["rounds"].append(round_data)
-            if len(stats["rounds"]) > 0:
-                stats["rounds"] = sorted(stats["rounds"], key=itemgetter("date"))
+                round_data["score"] = int(index.totals[n, j])
+                round_data["total"] = int(index.totals[n, j])
+                round_data["front"] = score_list[0:9]
+                round_data["back"] = score_list[9:18]
+                round_data["out"] = sum(hole_scores[0:9])
+                round_data["in"] = sum(hole_scores[9:18])
+                round_data["name"] = cube.rounds[j]
+                round_data["date"] = round_date
+                round_data["date_timestamp"] = round_date.toordinal()
+                stats["rounds"].append(round_data)
             stats["scoring_average"] = np.average([r["score"] for r in stats["rounds"] if "score" in r])
             stats["scoring_average"] = float("%.3f" % stats["scoring_average"])
             yield player, stats
 
     def all_players(self):
-        players = set()
-        for result in self.results.values():
-            for team in result["teams"]:
-                for player in team:
-                    players.add(player)
-        return list(players)
+        return list(self.index.players)
+
+    @staticmethod
+    def _last_rounds(counts, valid, n_rounds):
+        """ Restricts right aligned rows to their last n_rounds entries
+        :return: (eligible, valid) where eligible marks rows with at least n_rounds entries
+        """
+        eligible = counts > 0
+        if n_rounds:
+            eligible &= counts >= n_rounds
+            valid = valid.copy()
+            valid[:, :max(valid.shape[1] - n_rounds, 0)] = False
+        return eligible, valid
+
+    def _ranked(self, averages, ranked_rows, reverse=False):
+        """
+        :param averages: array of averages of the index players
+        :param ranked_rows: bool array of the players to rank
+        :return: list of (player, average) sorted by average
+        """
+        rows = np.flatnonzero(ranked_rows)
+        players = self.index.players
+        values = averages[rows]
+        if np.isnan(values).any():
+            # Keep sorted()'s placement of nan averages
+            return sorted(zip([players[i] for i in rows], values), key=itemgetter(1), reverse=reverse)
+        order = np.argsort(-values if reverse else values, kind="stable")
+        return list(zip([players[i] for i in rows[order].tolist()], map(np.float64, values[order].tolist())))
 
     def _hole_score_averages(self, n_rounds=None, min_rounds=0, weighted_rounds=0, types=["birdie", "eagle"]):
+        sweep = self.hole_score_averages_sweep(types, n_rounds=[n_rounds], min_rounds=[min_rounds],
+                                               weighted_rounds=[weighted_rounds])
+        return sweep[(n_rounds, min_rounds, weighted_rounds)]
+
+    def hole_score_averages_sweep(self, types, n_rounds=(None,), min_rounds=(0,), weighted_rounds=(0,)):
+        """ Rankings of _hole_score_averages for every combination of the parameter values. The type counts are
+        aligned once and the weights once per n_rounds and weighted_rounds.
+        :param types: score type name or names
+        :param n_rounds: values of n_rounds
+        :param min_rounds: values of min_rounds
+        :param weighted_rounds: values of weighted_rounds
+        :return: dict of (n_rounds, min_rounds, weighted_rounds) -> rankings
+        """
         if isinstance(types, str):
             types = [types]
-        scoring = {}
-        averages = {}
-        for player in self.all_players():
-            scoring[player] = []
-            for results in self.results.values():
-                player_data = results["scores"].get(player)
-                if player_data:
-                    if len(player_data["scores"]) == 18:
-                        birdies_or_better_scores = [h["type"] for h in player_data["scores"].values() if h["type"] in types]
-                        scoring[player].append(len(birdies_or_better_scores))
-            if scoring[player] and len(scoring[player]) >= min_rounds:
-                if n_rounds is not None:
-                    if len(scoring[player]) < n_rounds:
-                        continue
-                    scoring[player] = scoring[player][-n_rounds:]
-                if weighted_rounds is None:
-                    averages[player] = np.average(scoring[player])
-                elif len(scoring[player]) > weighted_rounds:
-                    diff = len(scoring[player]) - weighted_rounds
-                    weights = []
-                    w = 1
-                    for i in range(diff):
-                        weights.append(w)
-                    for i in range(len(scoring[player]) - diff):
-                        w = w * 1.5
-                        weights.append(w)
-                    averages[player] = np.average(scoring[player], weights=weights)
-                else:
-                    averages[player] = np.average(scoring[player])
-        return sorted(averages.items(), key=itemgetter(1), reverse=True)
+        index = self.index
+        values, aligned = right_align(index.type_counts(types)[:, index.order], index.complete[:, index.order])
+        counts = aligned.sum(axis=1)
+        rankings = {}
+        for n in n_rounds:
+            eligible, valid = self._last_rounds(counts, aligned, n)
+            for w in weighted_rounds:
+                weights = valid.astype(float) if w is None else recency_weights(valid, w)
+                averages = weighted_averages(values, weights)
+                for m in min_rounds:
+                    rankings[(n, m, w)] = self._ranked(averages, eligible & (counts >= m), reverse=True)
+        return rankings
 
     def birdies_or_better_averages(self, n_rounds=None, min_rounds=0, weighted_rounds=0):
         return self._hole_score_averages(n_rounds=n_rounds, min_rounds=min_rounds, weighted_rounds=weighted_rounds,
@@ -171,51 +318,102 @@ class Stats(object):
                                          types="par")
     
     def scoring_averages(self, min_rounds=0):
-        scoring = {}
-        averages = {}
-        for player in self.all_players():
-            scoring[player] = []
-            for results in self.results.values():
-                player_data = results["scores"].get(player)
-                if player_data:
-                    round_scores = [h["score"] for h in player_data["scores"].values()]
-                    if len(round_scores) == 18:
-                        scoring[player].append(sum(round_scores))
-            if scoring[player] and len(scoring[player]) >= min_rounds:
-                averages[player] = sum(scoring[player]) / len(scoring[player])
-        return sorted(averages.items(), key=itemgetter(1))
+        index = self.index
+        counts = index.complete.sum(axis=1)
+        sums = np.where(index.complete, index.totals, 0).sum(axis=1)
+        averages = [(index.players[i], float(sums[i]) / counts[i])
+                    for i in np.flatnonzero((counts > 0) & (counts >= min_rounds))]
+        return sorted(averages, key=itemgetter(1))
 
     def reject_outliers(self, raw_data, m=2.):
         data = np.array(raw_data)
         return list(data[abs(data - np.mean(data)) < m * np.std(data)])
 
+    @staticmethod
+    def _outlier_mask(values, valid, m):
+        """ Vectorized reject_outliers over the valid entries of each row
+        :param m: distance in standard deviations, or a sequence of distances
+        :return: bool array of the valid entries within m standard deviations of their row mean, stacked along a
+            first axis when m is a sequence
+        """
+        n = valid.sum(axis=1)[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(valid, values, 0).sum(axis=1)[:, None] / n
+            std = np.sqrt(np.where(valid, (values - mean) ** 2, 0).sum(axis=1)[:, None] / n)
+        m = np.asarray(m, dtype=float)
+        return valid & (abs(values - mean) < m.reshape(m.shape + (1, 1)) * std)
+
     def weighted_sanitized_scoring_averages(self, n_rounds=None, weighted_rounds=3, outlier_distance=2.):
-        player_scores = self.player_scores()
-        rankings = []
-        for player_name, data in player_scores.items():
-            # Filter to list of scores
-            scores = [d["score"] for d in data if d.get("score")]
-            if len(scores) == 0:
-                continue
-            if n_rounds is not None:
-                if len(scores) < n_rounds:
-                    continue
-                scores = scores[-n_rounds:]
-            if outlier_distance is not None:
-                scores = self.reject_outliers(scores, m=outlier_distance)
-            if weighted_rounds is None:
-                rankings.append((player_name, np.average(scores)))
-            elif len(scores) > weighted_rounds:
-                diff = len(scores) - weighted_rounds
-                weights = []
-                w = 1
-                for i in range(diff):
-                    weights.append(w)
-                for i in range(len(scores) - diff):
-                    w = w * 1.5
-                    weights.append(w)
-                rankings.append((player_name, np.average(scores, weights=weights)))
-        return sorted(rankings, key=itemgetter(1))
+        sweep = self.weighted_sanitized_scoring_averages_sweep(n_rounds=[n_rounds], weighted_rounds=[weighted_rounds],
+                                                               outlier_distance=[outlier_distance])
+        return sweep[(n_rounds, weighted_rounds, outlier_distance)]
+
+    def weighted_sanitized_scoring_averages_sweep(self, n_rounds=(None,), weighted_rounds=(3,),
+                                                  outlier_distance=(2.,)):
+        """ Rankings of weighted_sanitized_scoring_averages for every combination of the parameter values. The
+        round totals are aligned once and the outlier masks of all distances computed together per n_rounds.
+        :param n_rounds: values of n_rounds
+        :param weighted_rounds: values of weighted_rounds
+        :param outlier_distance: values of outlier_distance
+        :return: dict of (n_rounds, weighted_rounds, outlier_distance) -> rankings
+        """
+        rankings = {}
+        for key, values, weights, ranked_rows in self._weighted_sanitized(n_rounds, weighted_rounds,
+                                                                          outlier_distance):
+            rankings[key] = self._ranked(weighted_averages(values, weights), ranked_rows)
+        return rankings
+
+    def _weighted_sanitized(self, n_rounds, weighted_rounds, outlier_distance):
+        """ Yields the inputs of weighted_sanitized_scoring_averages for every parameter combination
+        :return: iterator of ((n_rounds, weighted_rounds, outlier_distance), values, weights, ranked_rows) with
+            the index players' right aligned round totals, their weights and the players to rank
+        """
+        index = self.index
+        totals = index.totals[:, index.order]
+        values, aligned = right_align(totals, index.complete[:, index.order] & (totals != 0))
+        distances = [d for d in outlier_distance if d is not None]
+        for n in n_rounds:
+            eligible, valid = self._last_rounds(aligned.sum(axis=1), aligned, n)
+            masks = dict(zip(distances, self._outlier_mask(values, valid, distances))) if distances else {}
+            if None in outlier_distance:
+                masks[None] = valid
+            for d, kept in masks.items():
+                counts = kept.sum(axis=1)
+                for w in weighted_rounds:
+                    if w is None:
+                        yield (n, w, d), values, kept.astype(float), eligible
+                    else:
+                        yield (n, w, d), values, recency_weights(kept, w), eligible & (counts > w)
+
+    def bootstrap_scoring_averages(self, n_rounds=None, weighted_rounds=3, outlier_distance=2., n_resamples=1000,
+                                   confidence=0.95, top=(1, 3, 10), seed=None, workers=None):
+        """ weighted_sanitized_scoring_averages with bootstrap confidence intervals and rank probabilities. Each
+        resample redraws every ranked player's kept rounds with replacement, all players at once.
+        :param n_resamples: number of resamples
+        :param confidence: coverage of the intervals
+        :param top: values of k to report the probability of ranking in the top k for
+        :param seed: seed for reproducible results
+        :param workers: number of processes to spread the resamples over
+        :return: list of (player, {"average", "low", "high", "top": {k: probability}}) sorted by average
+        """
+        key, values, weights, ranked_rows = next(self._weighted_sanitized([n_rounds], [weighted_rounds],
+                                                                          [outlier_distance]))
+        rows = np.flatnonzero(ranked_rows)
+        averages = weighted_averages(values, weights)[rows]
+        samples = bootstrap_averages(values[rows], weights[rows], n_resamples=n_resamples, seed=seed,
+                                     workers=workers)
+        sampled = np.flatnonzero(weights[rows].sum(axis=1) > 0)
+        low, high = np.full(len(rows), np.nan), np.full(len(rows), np.nan)
+        if len(sampled):
+            low[sampled], high[sampled] = confidence_intervals(samples[:, sampled], confidence)
+        probabilities = rank_probabilities(samples, top)
+        ranked = [(self.index.players[i], {
+            "average": averages[k],
+            "low": float(low[k]),
+            "high": float(high[k]),
+            "top": dict((t, float(probabilities[t][k])) for t in top)
+        }) for k, i in enumerate(rows)]
+        return sorted(ranked, key=lambda item: item[1]["average"])
 
 
 if __name__ == '__main__':
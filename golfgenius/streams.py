@@ -0,0 +1,350 @@
+import contextlib
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+from golfgenius.capture import atomic_write
+from golfgenius.cache import round_record
+from golfgenius.rounds import parse_round_date
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+JSONL_NAME = "rounds.jsonl"
+BINARY_NAME = "rounds.ggr"
+STREAM_NAMES = {"jsonl": JSONL_NAME, "binary": BINARY_NAME}
+STREAM_SUFFIXES = (".jsonl", ".ggr")
+# magic, metadata bytes, hole rows; followed by the metadata json, the hole, score and type columns as int8
+# and the crc32 of everything before it
+RECORD_MAGIC = b"GGR1"
+RECORD_HEADER = struct.Struct("<4sII")
+RECORD_CRC = struct.Struct("<I")
+_INT8 = (np.iinfo(np.int8).min, np.iinfo(np.int8).max)
+
+
+def stream_format(path):
+    """
+    :param path: round stream file
+    :return: "jsonl" or "binary"
+    """
+    if path.endswith(".jsonl"):
+        return "jsonl"
+    if path.endswith(".ggr"):
+        return "binary"
+    raise ValueError("Not a round stream, expected a .jsonl or .ggr file: %s" % path)
+
+
+def is_stream(path):
+    return path.endswith(STREAM_SUFFIXES)
+
+
+def _score_columns(scores):
+    """
+    :param scores: dict of player -> {"scores": {hole: {"score", "type"}}}
+    :return: (players, counts, holes, values, types, type_names) like round_record, or None if a score
+        does not fit the int8 columns and the scores have to be stored as json
+    """
+    players, counts, holes, values, types = [], [], [], [], []
+    type_names, type_codes = [], {}
+    for player, player_data in scores.items():
+        if not isinstance(player_data, dict) or list(player_data) != ["scores"]:
+            return None
+        players.append(player)
+        recorded = 0
+        for hole, h in player_data["scores"].items():
+            if not hole.isdigit() or str(int(hole)) != hole or not 0 < int(hole) <= _INT8[1]:
+                return None
+            if not isinstance(h, dict) or set(h) != {"score", "type"} or not isinstance(h["type"], str):
+                return None
+            score = h["score"]
+            if isinstance(score, bool) or not isinstance(score, int) or not _INT8[0] <= score <= _INT8[1]:
+                return None
+            code = type_codes.get(h["type"])
+            if code is None:
+                code = type_codes[h["type"]] = len(type_names)
+                type_names.append(h["type"])
+            holes.append(int(hole))
+            values.append(score)
+            types.append(code)
+            recorded += 1
+        if not recorded:
+            holes.append(0)
+            values.append(0)
+            types.append(-1)
+            recorded = 1
+        counts.append(recorded)
+    return players, counts, holes, values, types, type_names
+
+
+def _encode_binary(result):
+    meta = dict(result)
+    results = dict(result.get("results", {}))
+    columns = _score_columns(results["scores"]) if isinstance(results.get("scores"), dict) else None
+    n_rows = 0
+    body = b""
+    if columns is not None:
+        players, counts, holes, values, types, type_names = columns
+        del results["scores"]
+        meta["_rows"] = {"players": players, "counts": counts, "type_names": type_names}
+        n_rows = len(holes)
+        body = b"".join(np.array(column, dtype=np.int8).tobytes() for column in (holes, values, types))
+    if "results" in meta:
+        meta["results"] = results
+    header = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    record = RECORD_HEADER.pack(RECORD_MAGIC, len(header), n_rows) + header + body
+    return record + RECORD_CRC.pack(zlib.crc32(record))
+
+
+def encode_round(result, fmt):
+    """
+    :param result: round dict as yielded by GGParser.iter_rounds
+    :param fmt: "jsonl" or "binary"
+    :return: bytes of one stream record
+    """
+    if fmt == "jsonl":
+        return json.dumps(result, separators=(",", ":")).encode("utf-8") + b"\n"
+    return _encode_binary(result)
+
+
+def _scan_binary(buf):
+    """ Walks the complete, intact records of a binary stream
+    :param buf: bytes or mmap of the stream
+    :return: generator of (offset, end, meta, columns) where columns is an int8 array 3 x rows of the holes,
+        scores and types of the record
+    """
+    offset = 0
+    size = len(buf)
+    while offset + RECORD_HEADER.size <= size:
+        magic, meta_size, n_rows = RECORD_HEADER.unpack_from(buf, offset)
+        data_end = offset + RECORD_HEADER.size + meta_size + 3 * n_rows
+        end = data_end + RECORD_CRC.size
+        if magic != RECORD_MAGIC or end > size or \
+                RECORD_CRC.unpack_from(buf, data_end)[0] != zlib.crc32(buf[offset:data_end]):
+            logger.warning("Ignoring %d bytes of a torn or corrupt record at the end of a round stream"
+                           % (size - offset))
+            return
+        start = offset + RECORD_HEADER.size
+        meta = json.loads(bytes(buf[start:start + meta_size]).decode("utf-8"))
+        start += meta_size
+        # Sliced out of the map so no array keeps the map from closing
+        columns = np.frombuffer(buf[start:data_end], dtype=np.int8).reshape(3, n_rows)
+        yield offset, end, meta, columns
+        offset = end
+
+
+def _scan_jsonl(buf):
+    """ Walks the complete lines of a json lines stream
+    :return: generator of (offset, end, round dict)
+    """
+    offset = 0
+    size = len(buf)
+    while offset < size:
+        end = buf.find(b"\n", offset)
+        if end < 0:
+            logger.warning("Ignoring %d bytes of a torn line at the end of a round stream" % (size - offset))
+            return
+        end += 1
+        line = bytes(buf[offset:end])
+        if line.strip():
+            try:
+                yield offset, end, json.loads(line.decode("utf-8"))
+            except ValueError:
+                logger.warning("Ignoring unreadable line at byte %d of a round stream" % offset)
+        offset = end
+
+
+@contextlib.contextmanager
+def _mapped(path):
+    """ Maps a stream read-only, an empty file maps to empty bytes """
+    with open(path, "rb") as fp:
+        if not os.fstat(fp.fileno()).st_size:
+            yield b""
+            return
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def _round_from_binary(meta, columns):
+    result = dict(meta)
+    rows = result.pop("_rows", None)
+    if rows is None:
+        return result
+    holes, values, types = (column.tolist() for column in columns)
+    scores = {}
+    row = 0
+    for player, count in zip(rows["players"], rows["counts"]):
+        player_scores = scores[player] = {"scores": {}}
+        for r in range(row, row + count):
+            if holes[r] > 0:
+                player_scores["scores"][str(holes[r])] = {"score": values[r], "type": rows["type_names"][types[r]]}
+        row += count
+    result["results"]["scores"] = scores
+    return result
+
+
+def _record_from_binary(meta, columns):
+    """
+    :return: round_record dict of a binary record, decoded without going through the scores dicts
+    """
+    rows = meta.get("_rows")
+    if rows is None:
+        return round_record(meta)
+    date = parse_round_date(meta["name"])
+    holes, values, types = columns
+    return {
+        "name": meta["name"],
+        "date": date.toordinal() if date is not None else 0,
+        "teams": meta["results"].get("teams", []),
+        "players": rows["players"],
+        "counts": rows["counts"],
+        "holes": holes,
+        "scores": values,
+        "types": types,
+        "type_names": rows["type_names"]
+    }
+
+
+def iter_stream(path, fmt=None):
+    """ Reads every intact record of a round stream in file order, a round written several times appears
+    several times
+    :param path: .jsonl or .ggr round stream
+    :param fmt: "jsonl" or "binary", defaults to the format of the extension
+    :return: generator of (offset, raw bytes, round dict)
+    """
+    fmt = fmt or stream_format(path)
+    with _mapped(path) as buf:
+        if fmt == "jsonl":
+            for offset, end, result in _scan_jsonl(buf):
+                yield offset, bytes(buf[offset:end]), result
+        else:
+            for offset, end, meta, columns in _scan_binary(buf):
+                yield offset, bytes(buf[offset:end]), _round_from_binary(meta, columns)
+
+
+def read_round(path, offset):
+    """
+    :param path: .jsonl or .ggr round stream
+    :param offset: offset of the record, as recorded by RoundStreamWriter.write
+    :return: round dict of the record
+    """
+    with open(path, "rb") as fp:
+        fp.seek(offset)
+        if stream_format(path) == "jsonl":
+            return json.loads(fp.readline().decode("utf-8"))
+        head = fp.read(RECORD_HEADER.size)
+        magic, meta_size, n_rows = RECORD_HEADER.unpack(head)
+        data = head + fp.read(meta_size + 3 * n_rows + RECORD_CRC.size)
+    for record_offset, end, meta, columns in _scan_binary(data):
+        return _round_from_binary(meta, columns)
+    raise ValueError("No intact round record at byte %d of %s" % (offset, path))
+
+
+def stream_records(path):
+    """ Reads the rounds of a stream for Stats, the last record of a round supersedes earlier ones.
+    Binary records are decoded from a memory map straight into columns.
+    :param path: .jsonl or .ggr round stream
+    :return: list of (offset, length, round_record dict) in the order rounds first appear, rounds without
+        scores (e.g. errors) are skipped
+    """
+    latest = {}
+    with _mapped(path) as buf:
+        if stream_format(path) == "jsonl":
+            for offset, end, result in _scan_jsonl(buf):
+                if "scores" in result.get("results", {}):
+                    latest[result["name"]] = (offset, end - offset, round_record(result))
+                else:
+                    latest.pop(result.get("name"), None)
+        else:
+            for offset, end, meta, columns in _scan_binary(buf):
+                if "_rows" in meta or "scores" in meta.get("results", {}):
+                    latest[meta["name"]] = (offset, end - offset, _record_from_binary(meta, columns))
+                else:
+                    latest.pop(meta.get("name"), None)
+    return list(latest.values())
+
+
+def valid_length(path, fmt=None):
+    """
+    :return: bytes of the stream up to the end of its last intact record
+    """
+    length = 0
+    with _mapped(path) as buf:
+        if (fmt or stream_format(path)) == "jsonl":
+            length = buf.rfind(b"\n") + 1
+        else:
+            for offset, end, meta, columns in _scan_binary(buf):
+                length = end
+    return length
+
+
+def compact(path):
+    """ Rewrites a stream with only the last record of each round, atomically
+    :param path: .jsonl or .ggr round stream
+    :return: number of rounds kept
+    """
+    latest = {}
+    for offset, raw, result in iter_stream(path):
+        latest[result.get("name")] = raw
+    atomic_write(path, b"".join(latest.values()))
+    return len(latest)
+
+
+class RoundStreamWriter(object):
+    """
+    Appends rounds to a json lines (.jsonl) or binary (.ggr) round stream.
+
+    Each round is encoded in memory and appended with one write to a file opened in append mode, then
+    fsynced, so a record is either complete or a torn tail left by a crash. Readers ignore a torn tail and the
+    writer truncates it when the stream is reopened. A round written again supersedes its earlier records,
+    compact() drops the superseded ones.
+    """
+
+    def __init__(self, path, fsync=True, fmt=None):
+        """
+        :param path: stream file
+        :param fsync: flush every record to disk before write returns
+        :param fmt: "jsonl" or "binary", defaults to the format of the extension
+        """
+        self.path = os.path.abspath(path)
+        self.format = fmt or stream_format(self.path)
+        self.fsync = fsync
+        self.rounds_written = 0
+        self.bytes_written = 0
+        if os.path.isfile(self.path):
+            length = valid_length(self.path, self.format)
+            size = os.path.getsize(self.path)
+            if size > length:
+                logger.warning("Truncating %d bytes of a torn record at the end of %s" % (size - length, self.path))
+                os.truncate(self.path, length)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def write(self, result):
+        """
+        :param result: round dict as yielded by GGParser.iter_rounds
+        :return: (offset, raw) of the appended record
+        """
+        raw = encode_round(result, self.format)
+        offset = os.lseek(self._fd, 0, os.SEEK_END)
+        view = memoryview(raw)
+        while view:
+            view = view[os.write(self._fd, view):]
+        if self.fsync:
+            os.fsync(self._fd)
+        self.rounds_written += 1
+        self.bytes_written += len(raw)
+        return offset, raw
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
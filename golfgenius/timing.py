@@ -0,0 +1,47 @@
+import contextlib
+import threading
+import time
+
+DEFAULT_TIMEOUTS = {
+    "sign_in": 20,
+    "results": 20,
+    "frame": 20,
+    "round": 15,
+    "tournament": 20,
+    "scorecard": 15
+}
+
+
+class StepTimer(object):
+    """ Accumulates wall clock time spent in named steps, safe to share between worker threads """
+
+    def __init__(self):
+        self.steps = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, elapsed):
+        with self._lock:
+            step = self.steps.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            step["count"] += 1
+            step["total"] += elapsed
+            step["max"] = max(step["max"], elapsed)
+
+    def report(self):
+        """
+        :return: list of (step, {"count", "total", "max"}) sorted by total time, slowest first
+        """
+        with self._lock:
+            steps = [(name, dict(step)) for name, step in self.steps.items()]
+        return sorted(steps, key=lambda s: s[1]["total"], reverse=True)
+
+    def summary(self):
+        return "\n".join("%-12s %5d x %8.3fs (max %.3fs)" % (name, step["count"], step["total"], step["max"])
+                         for name, step in self.report())
@@ -0,0 +1,168 @@
+import datetime
+import json
+from operator import itemgetter
+import numpy as np
+from golfgenius.capture import atomic_write
+
+
+def _ordinal(date):
+    if isinstance(date, datetime.date):
+        return date.toordinal()
+    return int(date)
+
+
+class DateIndex(object):
+    """
+    Date-sorted view of the complete rounds of the team players.
+
+    Prefix sums over the rounds in date order hold, per player, the number of complete rounds, their summed
+    totals and (computed once per set of score types) their type counts. A date window is located with two
+    binary searches, so any window statistic costs O(log R) per player.
+    """
+
+    def __init__(self, index):
+        """
+        :param index: PlayerIndex
+        """
+        self.index = index
+        self.players = index.players
+        self.order = index.order
+        self.dates = index.cube.dates[self.order]
+        complete = index.complete[:, self.order]
+        self.rounds = self._prefix(complete)
+        self.totals = self._prefix(np.where(complete, index.totals[:, self.order], 0))
+        self._complete = complete
+        self._type_counts = {}
+
+    @staticmethod
+    def _prefix(values):
+        """
+        :return: int array rows x (columns + 1) of the running sums of values, starting at 0
+        """
+        prefix = np.zeros((values.shape[0], values.shape[1] + 1), dtype=np.int64)
+        np.cumsum(values, axis=1, out=prefix[:, 1:])
+        return prefix
+
+    def type_counts(self, types):
+        """
+        :param types: score type names
+        :return: prefix sums of the types counted over the complete rounds
+        """
+        key = tuple(sorted(types))
+        if key not in self._type_counts:
+            counts = self.index.type_counts(key)[:, self.order]
+            self._type_counts[key] = self._prefix(np.where(self._complete, counts, 0))
+        return self._type_counts[key]
+
+    def window(self, start=None, end=None):
+        """
+        :param start: first date (date or ordinal) of the window, None for the first round
+        :param end: last date (date or ordinal) of the window, None for the last round
+        :return: (lo, hi) positions of the window in date order
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.dates, _ordinal(start), side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, _ordinal(end), side="right"))
+        return lo, max(lo, hi)
+
+    def _window_sums(self, prefix, start, end, player=None):
+        lo, hi = self.window(start, end)
+        rows = slice(None) if player is None else self.index.positions[player]
+        return prefix[rows, hi] - prefix[rows, lo]
+
+    def round_counts(self, start=None, end=None):
+        """
+        :return: int array of the complete rounds of each player within the window
+        """
+        return self._window_sums(self.rounds, start, end)
+
+    def scoring_average(self, player, start=None, end=None):
+        """
+        :param player: player name
+        :param start: first date of the window
+        :param end: last date of the window
+        :return: average total of the player's complete rounds within the window, nan if there are none
+        """
+        rounds = self._window_sums(self.rounds, start, end, player)
+        return float(self._window_sums(self.totals, start, end, player)) / rounds if rounds else float("nan")
+
+    def type_average(self, player, types, start=None, end=None):
+        """
+        :param player: player name
+        :param types: score type name or names, e.g. ["birdie", "eagle"]
+        :return: average number of holes of the types per complete round within the window, nan if there are none
+        """
+        if isinstance(types, str):
+            types = [types]
+        rounds = self._window_sums(self.rounds, start, end, player)
+        counts = self._window_sums(self.type_counts(types), start, end, player)
+        return float(counts) / rounds if rounds else float("nan")
+
+    def scoring_averages(self, start=None, end=None, min_rounds=1):
+        """
+        :return: list of (player, scoring average) within the window, lowest first
+        """
+        rounds = self.round_counts(start, end)
+        totals = self._window_sums(self.totals, start, end)
+        ranked = [(self.players[i], float(totals[i]) / rounds[i])
+                  for i in np.flatnonzero((rounds > 0) & (rounds >= min_rounds))]
+        return sorted(ranked, key=itemgetter(1))
+
+    def type_averages(self, types, start=None, end=None, min_rounds=1):
+        """
+        :return: list of (player, holes of the types per round) within the window, highest first
+        """
+        if isinstance(types, str):
+            types = [types]
+        rounds = self.round_counts(start, end)
+        counts = self._window_sums(self.type_counts(types), start, end)
+        ranked = [(self.players[i], float(counts[i]) / rounds[i])
+                  for i in np.flatnonzero((rounds > 0) & (rounds >= min_rounds))]
+        return sorted(ranked, key=itemgetter(1), reverse=True)
+
+    def rolling(self, player, n_rounds, types=None):
+        """ Rolling average over the player's last n_rounds complete rounds, one point per complete round
+        :param player: player name
+        :param n_rounds: number of rounds to average
+        :param types: score type names to average the counts of instead of the round totals
+        :return: list of {"date", "round", "value"} starting at the player's n_rounds-th complete round
+        """
+        if isinstance(types, str):
+            types = [types]
+        i = self.index.positions[player]
+        prefix = self.totals[i] if types is None else self.type_counts(types)[i]
+        positions = np.flatnonzero(self._complete[i])
+        if len(positions) < n_rounds:
+            return []
+        sums = prefix[positions + 1]
+        sums = sums[n_rounds - 1:] - np.concatenate([[0], sums[:-n_rounds]])
+        cube = self.index.cube
+        return [
+            {
+                "date": cube.date(self.order[p]),
+                "round": cube.rounds[self.order[p]],
+                "value": float(total) / n_rounds
+            }
+            for p, total in zip(positions[n_rounds - 1:], sums)
+        ]
+
+    def rolling_series(self, n_rounds, types=None, players=None):
+        """
+        :param n_rounds: number of rounds to average
+        :param types: score type names to average the counts of instead of the round totals
+        :param players: players to include, defaults to all team players
+        :return: dict of player -> rolling points
+        """
+        return dict((player, self.rolling(player, n_rounds, types)) for player in (players or self.players))
+
+    def export_series(self, path, n_rounds, types=None, players=None):
+        """ Writes rolling series as json for charting, dates as ISO strings
+        :param path: file to write
+        """
+        series = self.rolling_series(n_rounds, types, players)
+        data = {
+            "n_rounds": n_rounds,
+            "types": types,
+            "series": dict((player, [dict(point, date=point["date"].isoformat()) for point in points])
+                           for player, points in series.items())
+        }
+        atomic_write(path, json.dumps(data, indent=4).encode("utf-8"))
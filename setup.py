@@ -11,6 +11,7 @@ setuptools.setup(
     install_requires=[
         'selenium==3.141.0',
         'beautifulsoup4==4.9.0',
+        'urllib3',
         'numpy>=1.19.4'
     ],
     long_description=long_description,
@@ -22,7 +23,7 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     license='MIT',
     include_package_data=True,
     test_suite='nose.collector',
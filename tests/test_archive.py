@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from golfgenius.archive import ROW_DTYPE, HoleArchive, is_archive
+from golfgenius.cache import load_results
+from golfgenius.stats import Stats
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LEAGUE = os.path.join(FIXTURES, "league")
+
+
+def rounds(table):
+    """
+    :return: dict of round name -> sorted (player, hole, score, type) rows of a RoundTable
+    """
+    result = {}
+    for k, name in enumerate(table.names):
+        rows = range(table.offsets[k], table.offsets[k + 1])
+        result[name] = sorted((table.players[table.player[i]], int(table.hole[i]), int(table.score[i]),
+                               table.type_names[table.type[i]]) for i in rows)
+    return result
+
+
+class HoleArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "archive")
+        self.files = sorted(os.listdir(LEAGUE))
+        self.expected = rounds(load_results(LEAGUE, cache=False))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def results(self, name, files):
+        results_dir = os.path.join(self.directory, name)
+        os.makedirs(results_dir)
+        for fname in files:
+            shutil.copy(os.path.join(LEAGUE, fname), results_dir)
+        return results_dir
+
+    def rows_size(self, archive):
+        return os.path.getsize(os.path.join(archive.path, archive.rows_file))
+
+    def test_append_and_reopen(self):
+        archive = HoleArchive(self.path)
+        self.assertFalse(is_archive(self.path))
+        self.assertEqual(archive.append_results(self.results("first", self.files[:5]), cache=False), 5)
+        self.assertEqual(archive.append_results(self.results("rest", self.files[5:]), cache=False), 3)
+        self.assertTrue(is_archive(self.path))
+
+        reopened = HoleArchive(self.path)
+        self.assertEqual(len(reopened), len(self.files))
+        self.assertEqual(reopened.n_rows, sum(len(rows) for rows in self.expected.values()))
+        self.assertEqual(self.rows_size(reopened), reopened.n_rows * ROW_DTYPE.itemsize)
+        self.assertEqual(rounds(reopened.table()), self.expected)
+        for k, name in enumerate(reopened.names):
+            self.assertTrue((reopened.round_rows(k)["round"] == reopened.ids[k]).all())
+
+        player = reopened.players[0]
+        last = reopened.last_rounds(player, 2)
+        self.assertEqual(len(last), 2)
+        self.assertLessEqual(last[0][1], last[1][1])
+        for name, date, rows in last:
+            self.assertEqual(sorted((int(row["hole"]), int(row["score"])) for row in rows),
+                             sorted((hole, score) for p, hole, score, t in self.expected[name] if p == player))
+
+    def test_stats_of_archive_match_the_json_files(self):
+        HoleArchive(self.path).append_results(LEAGUE, cache=False)
+        expected = Stats(LEAGUE, cache=False)
+        stats = Stats(self.path)
+        self.assertIsNotNone(stats.archive)
+        self.assertEqual(stats.player_scores(), expected.player_scores())
+        self.assertEqual(stats.weighted_sanitized_scoring_averages(n_rounds=4, weighted_rounds=2),
+                         expected.weighted_sanitized_scoring_averages(n_rounds=4, weighted_rounds=2))
+
+    def test_superseded_round_and_compact(self):
+        archive = HoleArchive(self.path)
+        archive.append_results(LEAGUE, cache=False)
+        with open(os.path.join(LEAGUE, self.files[1])) as fp:
+            changed = json.load(fp)
+        player = sorted(changed["results"]["scores"])[0]
+        del changed["results"]["scores"][player]
+        changed_dir = os.path.join(self.directory, "changed")
+        os.makedirs(changed_dir)
+        with open(os.path.join(changed_dir, self.files[1]), "w") as fp:
+            json.dump(changed, fp)
+        self.assertEqual(archive.append_results(changed_dir, cache=False), 1)
+        name = changed["name"]
+        self.expected[name] = [row for row in self.expected[name] if row[0] != player]
+        self.assertEqual(rounds(HoleArchive(self.path).table()), self.expected)
+
+        superseded = archive.n_rows - int(archive.counts.sum())
+        self.assertGreater(superseded, 0)
+        self.assertEqual(archive.compact(), superseded)
+        self.assertEqual(archive.compact(), 0)
+        self.assertEqual(archive.rows_file, "holes-1.bin")
+        self.assertFalse(os.path.exists(os.path.join(self.path, "holes-0.bin")))
+
+        reopened = HoleArchive(self.path)
+        self.assertEqual(reopened.rows_file, "holes-1.bin")
+        self.assertEqual(reopened.n_rows, int(reopened.counts.sum()))
+        self.assertEqual(self.rows_size(reopened), reopened.n_rows * ROW_DTYPE.itemsize)
+        self.assertEqual(rounds(reopened.table()), self.expected)
+        self.assertNotIn(player, [reopened.players[i] for i in reopened.round_rows(reopened.round_index[name])
+                                  ["player"]])
+
+    def test_interrupted_append_is_overwritten(self):
+        archive = HoleArchive(self.path)
+        archive.append_results(self.results("first", self.files[:4]), cache=False)
+        n_rows = archive.n_rows
+        # An append that wrote part of its rows but crashed before replacing the sidecar
+        with open(os.path.join(self.path, archive.rows_file), "ab") as fp:
+            fp.write(b"\x7f" * (ROW_DTYPE.itemsize * 3 + 5))
+
+        reopened = HoleArchive(self.path)
+        self.assertEqual(reopened.n_rows, n_rows)
+        self.assertEqual(rounds(reopened.table()), dict((name, self.expected[name]) for name in reopened.names))
+
+        self.assertEqual(reopened.append_results(self.results("rest", self.files[4:]), cache=False), 4)
+        self.assertEqual(self.rows_size(reopened), reopened.n_rows * ROW_DTYPE.itemsize)
+        self.assertEqual(rounds(HoleArchive(self.path).table()), self.expected)
+
+    def test_truncated_rows_file_is_reported(self):
+        archive = HoleArchive(self.path)
+        archive.append_results(LEAGUE, cache=False)
+        os.truncate(os.path.join(self.path, archive.rows_file), self.rows_size(archive) - ROW_DTYPE.itemsize - 3)
+        reopened = HoleArchive(self.path)
+        self.assertEqual(len(reopened), len(self.files))
+        with self.assertRaises(ValueError):
+            reopened.table()
@@ -0,0 +1,31 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks.synthetic import write_league
+from golfgenius.cache import CACHE_NAME, load_results
+
+
+class LoadResultsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        write_league(self.directory, players=8, rounds=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cache_is_written_and_reused(self):
+        table = load_results(self.directory)
+        self.assertTrue(os.path.isfile(os.path.join(self.directory, CACHE_NAME)))
+        self.assertEqual(load_results(self.directory).names, table.names)
+
+    def test_unwritable_cache_is_skipped(self):
+        denied = OSError(errno.EROFS, "Read-only file system")
+        with mock.patch("golfgenius.cache.atomic_write", side_effect=denied), \
+                self.assertLogs("golfgenius.cache", "WARNING"):
+            table = load_results(self.directory)
+        self.assertEqual(len(table), 3)
+        self.assertFalse(os.path.isfile(os.path.join(self.directory, CACHE_NAME)))
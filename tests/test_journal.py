@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+from golfgenius.journal import ScrapeJournal
+from golfgenius.scorecard import Scorecard
+
+
+def bet(event_id):
+    return {"event_id": event_id, "spec_id": "1"}
+
+
+def scorecard(player, score):
+    return Scorecard([[player, "Partner"]], [(player, [("1", score, "par"), ("2", score, "par")])])
+
+
+class ScrapeJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self, journal, round_name, event_id, player, score=4):
+        journal.record(round_name, "Bet %s" % event_id, bet(event_id), scorecard(player, score))
+
+    def test_scorecards_are_replayed(self):
+        journal = ScrapeJournal(self.path)
+        self.record(journal, "Round 1", "10", "Alice")
+        self.record(journal, "Round 1", "11", "Bob", 5)
+        self.record(journal, "Round 2", "20", "Carol")
+        journal.close()
+
+        replayed = ScrapeJournal(self.path)
+        self.assertEqual(len(replayed), 3)
+        cards = replayed.scorecards("Round 1")
+        self.assertEqual(sorted(cards), ["10", "11"])
+        results = {"teams": [], "scores": {}}
+        cards["11"].merge_into(results)
+        self.assertEqual(results["teams"], [["Bob", "Partner"]])
+        self.assertEqual(results["scores"]["Bob"]["scores"]["2"], {"score": 5, "type": "par"})
+        self.assertEqual(replayed.scorecards("Round 3"), {})
+
+    def test_torn_line_is_ignored_and_truncated(self):
+        journal = ScrapeJournal(self.path)
+        self.record(journal, "Round 1", "10", "Alice")
+        journal.close()
+        with open(self.path, "ab") as fp:
+            fp.write(b'{"round":"Round 1","event_')
+
+        journal = ScrapeJournal(self.path)
+        self.assertEqual(len(journal), 1)
+        self.record(journal, "Round 1", "11", "Bob")
+        journal.close()
+        self.assertEqual(sorted(ScrapeJournal(self.path).scorecards("Round 1")), ["10", "11"])
+
+    def test_discard_drops_a_round(self):
+        journal = ScrapeJournal(self.path)
+        self.record(journal, "Round 1", "10", "Alice")
+        self.record(journal, "Round 2", "20", "Carol")
+        self.assertEqual(journal.discard("Round 1"), 1)
+        self.assertEqual(journal.discard("Round 1"), 0)
+        self.record(journal, "Round 2", "21", "Dan")
+        journal.close()
+
+        replayed = ScrapeJournal(self.path)
+        self.assertEqual(replayed.scorecards("Round 1"), {})
+        self.assertEqual(sorted(replayed.scorecards("Round 2")), ["20", "21"])
+        replayed.discard("Round 2")
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+from golfgenius import parser, scraping
+from golfgenius.capture import CaptureIndex
+from golfgenius.fetch import HTTPFetcher
+from golfgenius.scorecard import extract_scorecard
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class FakeDriver(object):
+    """ Stands in for Firefox, these tests load every scorecard over http """
+    current_url = "about:blank"
+    page_source = "<html></html>"
+
+    def get_cookies(self):
+        return []
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ScorecardHandler(BaseHTTPRequestHandler):
+    """ Serves the saved scorecard page for every event id but 404 and 503, which return that status """
+    requests = []
+    delay = 0
+
+    def do_GET(self):
+        event_id = self.path.rsplit("=", 1)[-1]
+        self.requests.append(event_id)
+        time.sleep(self.delay)
+        status = int(event_id) if event_id in ("404", "503") else 200
+        with open(os.path.join(FIXTURES, "scorecard_bet1.html"), "rb") as fp:
+            body = fp.read()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bet(event_id):
+    return {"event_id": event_id, "spec_id": "1", "href": "details?event_id=%s" % event_id, "text": event_id}
+
+
+class StandInServerTestCase(unittest.TestCase):
+    """ A parser with the http backend pointed at a local stand-in server """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(("127.0.0.1", 0), ScorecardHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        ScorecardHandler.requests = []
+        ScorecardHandler.delay = 0
+        self.directory = tempfile.mkdtemp()
+        with mock.patch.object(parser.GGParser, "_create_driver", return_value=FakeDriver()), \
+                mock.patch.object(scraping, "EventFiringWebDriver", lambda driver, listener: driver):
+            self.parser = parser.GGParser(screenshots_enabled=False, fetch_backend="http", retries=2,
+                                          http_base_url="http://127.0.0.1:%d/" % self.server.server_port,
+                                          journal=os.path.join(self.directory, "journal"))
+        # No urllib3 retries, so every failure reaches the parser's retries at once
+        self.parser.fetcher = HTTPFetcher(base_url=self.parser.fetcher.base_url, retries=0)
+
+    def tearDown(self):
+        self.parser.close()
+        shutil.rmtree(self.directory)
+
+    def counters(self):
+        return self.parser.metrics.counters
+
+
+class HTTPBackendRetryTest(StandInServerTestCase):
+
+    def test_error_status_is_retried_then_missing(self):
+        self.assertIsNone(self.parser._get_scorecard(bet("404")))
+        self.assertEqual(ScorecardHandler.requests, ["404"] * 3)
+        self.assertEqual(self.counters()["retries"], 2)
+        self.assertEqual(self.counters()["scorecards_failed"], 1)
+        self.assertNotIn("driver_restarts", self.counters())
+
+    def test_urllib3_error_is_retried_then_missing(self):
+        self.assertIsNone(self.parser._get_scorecard(bet("503")))
+        self.assertEqual(ScorecardHandler.requests, ["503"] * 3)
+        self.assertEqual(self.counters()["scorecards_failed"], 1)
+
+    def test_connection_refused_is_retried_then_missing(self):
+        closed = HTTPServer(("127.0.0.1", 0), ScorecardHandler)
+        port = closed.server_port
+        closed.server_close()
+        self.parser.fetcher = HTTPFetcher(base_url="http://127.0.0.1:%d/" % port, retries=0)
+        self.assertIsNone(self.parser._get_scorecard(bet("1")))
+        self.assertEqual(self.counters()["retries"], 2)
+        self.assertEqual(self.counters()["scorecards_failed"], 1)
+
+    def test_failed_scorecard_leaves_round_incomplete(self):
+        links = dict((b["text"], b) for b in [bet("1"), bet("404"), bet("2")])
+        self.parser.strict = True
+        with mock.patch.object(self.parser, "_iter_round_links", return_value=iter([("Round 1", links)])):
+            rounds = list(self.parser.iter_rounds("ggid"))
+        self.assertEqual(len(rounds), 1)
+        round_name, result = rounds[0]
+        self.assertFalse(result["complete"])
+        self.assertEqual([e["event_id"] for e in result["events"]], ["1", "2"])
+        self.assertEqual(sorted(result["results"]["scores"]), ["Alice Able", "Bob Baker"])
+        self.assertEqual(self.counters()["scorecards_missing"], 1)
+
+
+class IterRoundsTest(StandInServerTestCase):
+
+    def test_stopping_early_cancels_the_prefetched_round(self):
+        ScorecardHandler.delay = 0.2
+        rounds = [("Round %d" % r, dict(("%d%d" % (r, b), bet("%d%d" % (r, b))) for b in range(4)))
+                  for r in (1, 2)]
+        self.parser.strict = True
+        with mock.patch.object(self.parser, "_iter_round_links", return_value=iter(rounds)):
+            generator = self.parser.iter_rounds("ggid")
+            round_name, result = next(generator)
+            start = time.perf_counter()
+            generator.close()
+            elapsed = time.perf_counter() - start
+        self.assertEqual(round_name, "Round 1")
+        # At most the page in flight when the caller stopped is still loaded
+        self.assertLessEqual(len([e for e in ScorecardHandler.requests if e.startswith("2")]), 2)
+        self.assertLess(elapsed, 0.5)
+
+
+class ResumeTest(StandInServerTestCase):
+
+    def test_round_written_with_an_error_is_scraped_again(self):
+        output = os.path.join(self.directory, "results")
+        os.makedirs(output)
+        # A round parse() failed on, as to_json writes it
+        with open(os.path.join(output, "Round 1.json"), "w") as fp:
+            json.dump({"name": "Round 1", "results": {}, "error": "Timed out", "traceback": "..."}, fp)
+        self.parser.capture_index = CaptureIndex(output).load()
+        self.parser._captured_rounds = self.parser.capture_index.complete_rounds()
+        links = dict((b["text"], b) for b in [bet("1"), bet("2")])
+        self.parser.strict = True
+        with mock.patch.object(self.parser, "_iter_round_links", return_value=iter([("Round 1", links)])):
+            rounds = list(self.parser.iter_rounds("ggid"))
+        self.assertEqual(ScorecardHandler.requests, ["1", "2"])
+        result = rounds[0][1]
+        self.assertTrue(result["complete"])
+        self.assertEqual(result["results"]["teams"], [["Alice Able", "Bob Baker"]])
+        self.assertEqual(sorted(result["results"]["scores"]), ["Alice Able", "Bob Baker"])
+
+
+class JournalTest(StandInServerTestCase):
+
+    def test_journaled_scorecards_are_replayed_and_dropped_once_written(self):
+        journal = self.parser.journal
+        journal.record("Round 1", "1", bet("1"), extract_scorecard(self.parser.fetcher.scorecard("1")))
+        ScorecardHandler.requests = []
+        links = dict((b["text"], b) for b in [bet("1"), bet("2")])
+        output = os.path.join(self.directory, "results")
+        os.makedirs(output)
+        self.parser.strict = True
+        with mock.patch.object(self.parser, "_iter_round_links", return_value=iter([("Round 1", links)])):
+            rounds = list(self.parser.iter_to_json("ggid", output))
+        self.assertEqual(ScorecardHandler.requests, ["2"])
+        self.assertEqual(self.counters()["scorecards_replayed"], 1)
+        self.assertTrue(rounds[0][1]["complete"])
+        self.assertTrue(os.path.isfile(os.path.join(output, "Round 1.json")))
+        self.assertEqual(len(journal), 0)
+        self.assertFalse(os.path.exists(journal.path))
@@ -0,0 +1,83 @@
+import os
+import unittest
+from benchmarks.synthetic import SCORE_TYPES
+from golfgenius.scorecard import Scorecard, extract_scorecard, parse_scorecard
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as fp:
+        return fp.read()
+
+
+class ScorecardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bet1 = extract_scorecard(parse_scorecard(read_fixture("scorecard_bet1.html")))
+        self.bet2 = extract_scorecard(parse_scorecard(read_fixture("scorecard_bet2.html")))
+
+    def holes(self, scorecard, player):
+        return dict(scorecard.players)[player]
+
+    def test_parse_scorecard_restricts_to_the_scorecard_table(self):
+        table = parse_scorecard(read_fixture("scorecard_bet1.html"))
+        self.assertEqual(table.name, "table")
+        self.assertEqual(table.attrs["class"], ["scorecard"])
+        self.assertIsNone(table.find("a", {"class": "expand-all"}))
+        self.assertIsNone(parse_scorecard("<html><body><table class='leaderboard'></table></body></html>"))
+
+    def test_team_rows(self):
+        self.assertEqual(self.bet1.teams, [["Alice Able", "Bob Baker"]])
+        self.assertEqual(self.bet2.teams, [["Carol Cole", "Dan Dunn"], ["Alice Able", "Bob Baker"]])
+
+    def test_players_in_table_order(self):
+        # The net-line row without data-net-name and the leaderboard outside the scorecard are ignored
+        self.assertEqual([name for name, holes in self.bet1.players], ["Alice Able", "Bob Baker"])
+        self.assertEqual(self.holes(self.bet1, "Bob Baker"), [(str(h), 4, "par") for h in range(1, 10)])
+
+    def test_missing_single_score_div_is_skipped(self):
+        self.assertNotIn("3", [hole for hole, value, score_type in self.holes(self.bet1, "Alice Able")])
+
+    def test_non_digit_values_are_skipped(self):
+        holes = self.holes(self.bet1, "Alice Able")
+        self.assertEqual([hole for hole, value, score_type in holes], ["1", "2", "5", "6", "8", "9"])
+        self.assertEqual(holes[2], ("5", 5, "par"))
+        self.assertEqual(holes[1], ("2", 3, "birdie"))
+        self.assertEqual(holes[-1], ("9", 2, "eagle"))
+
+    def test_duplicate_holes_across_bets_keep_the_first_score(self):
+        results = {"teams": [], "scores": {}}
+        self.bet1.merge_into(results)
+        self.bet2.merge_into(results)
+        self.assertEqual(results["teams"], [["Alice Able", "Bob Baker"]])
+        alice = results["scores"]["Alice Able"]["scores"]
+        self.assertEqual(alice["1"], {"score": 4, "type": "par"})
+        self.assertEqual(alice["2"], {"score": 3, "type": "birdie"})
+        # Holes missing or unreadable in the first bet are filled by the second
+        self.assertEqual(alice["3"], {"score": 4, "type": "par"})
+        self.assertEqual(alice["4"], {"score": 3, "type": "birdie"})
+        self.assertEqual(alice["10"], {"score": 4, "type": "par"})
+        self.assertEqual(sorted(results["scores"]), ["Alice Able", "Bob Baker", "Carol Cole"])
+        self.assertEqual(results["scores"]["Carol Cole"]["scores"]["1"], {"score": 5, "type": "plus1"})
+
+    def test_score_types_are_the_ones_stats_counts(self):
+        types = set(score_type for card in (self.bet1, self.bet2) for name, holes in card.players
+                    for hole, value, score_type in holes)
+        self.assertEqual(types, {"eagle", "birdie", "par", "plus1", "plus2"})
+        self.assertTrue(types.issubset(SCORE_TYPES.values()))
+
+    def test_tree_builders_agree(self):
+        page = read_fixture("scorecard_bet2.html")
+        lxml = extract_scorecard(parse_scorecard(page, "lxml"))
+        self.assertEqual(lxml.teams, self.bet2.teams)
+        self.assertEqual(lxml.players, self.bet2.players)
+
+    def test_merge_into_keeps_existing_teams(self):
+        results = {"teams": [["X", "Y"]], "scores": {}}
+        Scorecard([["A", "B"]], []).merge_into(results)
+        self.assertEqual(results["teams"], [["X", "Y"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
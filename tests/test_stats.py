@@ -0,0 +1,101 @@
+import json
+import math
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.synthetic import league_rounds
+from golfgenius.stats import Stats
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class IncrementalStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rounds = list(league_rounds(players=12, rounds=8, attendance=0.6))
+        for name, result in self.rounds:
+            with open(os.path.join(self.directory, "%s.json" % name), "w") as fp:
+                json.dump(result, fp)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def incremental(self):
+        # Start from the later half and add the earlier rounds, so the cube order is not the date order
+        partial = tempfile.mkdtemp()
+        try:
+            for name, result in self.rounds[4:]:
+                shutil.copy(os.path.join(self.directory, "%s.json" % name), partial)
+            stats = Stats(partial, cache=False)
+        finally:
+            shutil.rmtree(partial)
+        stats.add_rounds(self.rounds[:4])
+        return stats
+
+    def test_add_rounds_ranks_like_a_reload(self):
+        fresh = Stats(self.directory, cache=False)
+        stats = self.incremental()
+        for kwargs in [{}, {"n_rounds": 4, "weighted_rounds": 2}, {"n_rounds": 3, "min_rounds": 2}]:
+            self.assertEqual(stats.birdies_or_better_averages(**kwargs), fresh.birdies_or_better_averages(**kwargs))
+            self.assertEqual(stats.par_averages(**kwargs), fresh.par_averages(**kwargs))
+        self.assertEqual(stats.weighted_sanitized_scoring_averages(n_rounds=4, weighted_rounds=2),
+                         fresh.weighted_sanitized_scoring_averages(n_rounds=4, weighted_rounds=2))
+
+
+class BaselineResultsTest(unittest.TestCase):
+    """
+    Rankings and player scores of the fixture league against league_expected.json, the values the original
+    dict-based Stats produced for it with its rounds oldest first
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        shutil.rmtree(cls.directory)
+        shutil.copytree(os.path.join(FIXTURES, "league"), cls.directory)
+        with open(os.path.join(FIXTURES, "league_expected.json")) as fp:
+            cls.expected = json.load(fp)
+        cls.stats = Stats(cls.directory, cache=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def assertRankings(self, rankings, expected):
+        # Compared as the ranked values and each player's value, players tied on a value may come in either order
+        self.assertEqual(len(rankings), len(expected))
+        actual = dict(rankings)
+        for (player, value), (expected_player, expected_value) in zip(rankings, expected):
+            for a, b in ((value, expected_value), (actual.get(expected_player), expected_value)):
+                if b is None:
+                    self.assertTrue(math.isnan(a), expected_player)
+                else:
+                    self.assertAlmostEqual(a, b, places=9, msg=expected_player)
+
+    def check(self, method):
+        for args, expected in self.expected[method].items():
+            with self.subTest(method=method, args=args):
+                args = json.loads(args)
+                self.assertRankings(getattr(self.stats, method)(*(args if isinstance(args, list) else [args])),
+                                    expected)
+
+    def test_scoring_averages(self):
+        self.check("scoring_averages")
+
+    def test_weighted_sanitized_scoring_averages(self):
+        self.check("weighted_sanitized_scoring_averages")
+
+    def test_birdies_or_better_averages(self):
+        self.check("birdies_or_better_averages")
+
+    def test_par_averages(self):
+        self.check("par_averages")
+
+    def test_player_scores(self):
+        player_scores = self.stats.player_scores()
+        self.assertEqual(sorted(player_scores), sorted(self.expected["player_scores"]))
+        for player, rounds in self.expected["player_scores"].items():
+            actual = [dict(r, date=r["date"].isoformat()) for r in player_scores[player]]
+            self.assertEqual(actual, rounds, player)
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from golfgenius.stats import Stats
+from golfgenius.streams import (BINARY_NAME, JSONL_NAME, RoundStreamWriter, compact, iter_stream, read_round,
+                                stream_records)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LEAGUE = os.path.join(FIXTURES, "league")
+
+
+def league():
+    rounds = []
+    for fname in sorted(os.listdir(LEAGUE)):
+        with open(os.path.join(LEAGUE, fname)) as fp:
+            rounds.append(json.load(fp))
+    return rounds
+
+
+class RoundStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rounds = league()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, rounds):
+        path = os.path.join(self.directory, name)
+        with RoundStreamWriter(path, fsync=False) as writer:
+            offsets = [writer.write(result)[0] for result in rounds]
+        return path, offsets
+
+    def test_round_trip(self):
+        for name in (JSONL_NAME, BINARY_NAME):
+            with self.subTest(stream=name):
+                path, offsets = self.write(name, self.rounds)
+                records = list(iter_stream(path))
+                self.assertEqual([result for offset, raw, result in records], self.rounds)
+                self.assertEqual([offset for offset, raw, result in records], offsets)
+                self.assertEqual(read_round(path, offsets[3]), self.rounds[3])
+
+    def test_error_round_round_trip(self):
+        error = {"name": "Round 9 (Fri, May 1)", "results": {}, "error": "Timed out"}
+        for name in (JSONL_NAME, BINARY_NAME):
+            with self.subTest(stream=name):
+                path, offsets = self.write(name, [self.rounds[0], error])
+                self.assertEqual([result for offset, raw, result in iter_stream(path)], [self.rounds[0], error])
+                self.assertEqual(len(stream_records(path)), 1)
+
+    def test_torn_last_record_is_ignored_and_truncated(self):
+        for name in (JSONL_NAME, BINARY_NAME):
+            with self.subTest(stream=name):
+                path, offsets = self.write(name, self.rounds[:3])
+                os.truncate(path, os.path.getsize(path) - 5)
+                self.assertEqual([result for offset, raw, result in iter_stream(path)], self.rounds[:2])
+                # Reopening the writer drops the torn record, the next append follows the last intact one
+                path, appended = self.write(name, self.rounds[3:4])
+                self.assertEqual(appended, offsets[2:3])
+                self.assertEqual([result for offset, raw, result in iter_stream(path)],
+                                 self.rounds[:2] + self.rounds[3:4])
+
+    def test_crc_mismatch_is_ignored(self):
+        path, offsets = self.write(BINARY_NAME, self.rounds[:3])
+        with open(path, "r+b") as fp:
+            # A score byte of the last record
+            fp.seek(os.path.getsize(path) - 10)
+            value = fp.read(1)
+            fp.seek(-1, os.SEEK_CUR)
+            fp.write(bytes([value[0] ^ 0x7f]))
+        self.assertEqual([result for offset, raw, result in iter_stream(path)], self.rounds[:2])
+        self.assertEqual([record["name"] for offset, length, record in stream_records(path)],
+                         [result["name"] for result in self.rounds[:2]])
+
+    def test_rewritten_round_supersedes_and_compacts(self):
+        changed = json.loads(json.dumps(self.rounds[1]))
+        changed["results"]["scores"].popitem()
+        for name in (JSONL_NAME, BINARY_NAME):
+            with self.subTest(stream=name):
+                path, offsets = self.write(name, self.rounds[:3] + [changed])
+                records = stream_records(path)
+                self.assertEqual([record["name"] for offset, length, record in records],
+                                 [result["name"] for result in self.rounds[:3]])
+                self.assertEqual(records[1][0], offsets[3])
+                self.assertEqual(compact(path), 3)
+                self.assertEqual([result for offset, raw, result in iter_stream(path)],
+                                 [self.rounds[0], changed, self.rounds[2]])
+
+    def test_stream_loads_into_stats_like_the_json_files(self):
+        expected = Stats(LEAGUE, cache=False)
+        for name in (JSONL_NAME, BINARY_NAME):
+            with self.subTest(stream=name):
+                path, offsets = self.write(name, self.rounds)
+                for source in (path, self.directory):
+                    stats = Stats(source, cache=False)
+                    self.assertEqual(stats.player_scores(), expected.player_scores())
+                    self.assertEqual(stats.weighted_sanitized_scoring_averages(n_rounds=4, weighted_rounds=2),
+                                     expected.weighted_sanitized_scoring_averages(n_rounds=4, weighted_rounds=2))
+                    self.assertEqual(stats.birdies_or_better_averages(n_rounds=3, weighted_rounds=1),
+                                     expected.birdies_or_better_averages(n_rounds=3, weighted_rounds=1))
+                os.remove(path)